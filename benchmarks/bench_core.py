@@ -0,0 +1,238 @@
+"""
+Offline benchmark of opengeo's core raster and vector paths.
+
+Synthetic COG scenes are generated once per scene size (under --workdir) and
+served with a local STAC API stand-in and HTTP range server
+(stac_standin.py), so runs need no network access and are comparable
+across releases. For every scene count and AOI size the script times a
+search (cold, then from the search cache), building the stack, a median
+composite, reduceRegion, normalizedDifference, clip and a GeoTIFF export,
+then FeatureCollection.filterBounds and map on --features synthetic
+polygons. Each step reports wall time, throughput, peak RSS during the step
+and the bytes read from the range server. GDAL's HTTP cache is disabled for
+the stand-in unless --warm is given, so every raster step reads its inputs.
+
+    python benchmarks/bench_core.py --scenes 8 32 --aoi-km 2 10 --json results.json
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from stac_standin import StacStandIn, make_scenes
+
+# Benchmark the checkout this script lives in
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TILES = 2
+RES = 10.0
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError):
+        # No /proc: the process-wide peak is the best available figure
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / 1024 ** 2 if sys.platform == "darwin" else rss / 1024
+
+
+class Meter:
+    """Times a block and records the peak RSS and range-server traffic during it."""
+
+    def __init__(self, server=None, interval=0.01):
+        self.server = server
+        self.interval = interval
+        self.seconds = self.peak_mb = 0.0
+        self.bytes_read = self.requests = 0
+
+    def _sample(self):
+        while not self._done.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, _rss_mb())
+
+    def __enter__(self):
+        if self.server is not None:
+            self.server.reset_counters()
+        self.peak_mb = _rss_mb()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+        self._done.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, _rss_mb())
+        if self.server is not None:
+            self.bytes_read = self.server.raster_bytes
+            self.requests = self.server.requests
+
+
+def _row(name, meter, count, unit, **params):
+    return dict(params, step=name, seconds=meter.seconds, count=count, unit=unit,
+                rate=count / max(meter.seconds, 1e-9), peak_mb=meter.peak_mb,
+                mb_read=meter.bytes_read / 1e6, requests=meter.requests)
+
+
+def _aoi(scenes, km):
+    """og.Geometry square of `km` per side at the center of the scene grid."""
+    import math
+    import opengeo as og
+
+    minx = min(s["bbox"][0] for s in scenes)
+    miny = min(s["bbox"][1] for s in scenes)
+    maxx = max(s["bbox"][2] for s in scenes)
+    maxy = max(s["bbox"][3] for s in scenes)
+    cx, cy = (minx + maxx) / 2, (miny + maxy) / 2
+    dy = km / 2 / 111.32
+    dx = dy / math.cos(math.radians(cy))
+    return og.Geometry.Rectangle(cx - dx, cy - dy, cx + dx, cy + dy)
+
+
+def bench_raster(server, scenes, km, workdir, **params):
+    import opengeo as og
+
+    rows = []
+    aoi = _aoi(scenes, km)
+
+    def _collection():
+        return og.ImageCollection("synthetic").filterBounds(aoi).select(["red", "nir"])
+
+    col = _collection()
+    with Meter(server) as m:
+        n = len(col.refresh()._search())
+    rows.append(_row("search (cold)", m, n, "items", **params))
+    with Meter(server) as m:
+        _collection()._search()
+    rows.append(_row("search (cached)", m, n, "items", **params))
+
+    with Meter(server) as m:
+        da = col._to_xarray()
+    rows.append(_row("_to_xarray", m, da.size, "px", **params))
+
+    # Image steps start from the median composite, as a typical script would
+    median = col.median().clip(aoi)
+    with Meter(server) as m:
+        values = median._da.values
+    rows.append(_row("median", m, da.size, "px", **params))
+
+    with Meter(server) as m:
+        median.reduceRegion("mean", geometry=aoi, scale=RES)
+    rows.append(_row("reduceRegion", m, da.size, "px", **params))
+
+    with Meter(server) as m:
+        ndvi = median.normalizedDifference(["nir", "red"])
+        ndvi._da.values
+    rows.append(_row("normalizedDifference", m, values.size, "px", **params))
+
+    with Meter(server) as m:
+        col.first().clip(aoi)._da.values
+    rows.append(_row("clip (first)", m, values.size, "px", **params))
+
+    path = os.path.join(workdir, "export.tif")
+    with Meter(server) as m:
+        ndvi.to_file(path, progress=False)
+    rows.append(_row("to_file (COG)", m, values[0].size, "px", **params))
+    os.remove(path)
+    return rows
+
+
+def _add_area(feature):
+    return feature.set("area", feature.geometry().shapely.area)
+
+
+def _add_area_batched(part):
+    import shapely
+    return part.assign(area=shapely.area(part.geometry.values))
+
+
+def bench_vector(scenes, n_features, km, **params):
+    import geopandas as gpd
+    import numpy as np
+    import opengeo as og
+    import shapely
+
+    rows = []
+    minx = min(s["bbox"][0] for s in scenes)
+    miny = min(s["bbox"][1] for s in scenes)
+    maxx = max(s["bbox"][2] for s in scenes)
+    maxy = max(s["bbox"][3] for s in scenes)
+    rng = np.random.default_rng(0)
+    x = rng.uniform(minx, maxx, n_features)
+    y = rng.uniform(miny, maxy, n_features)
+    gdf = gpd.GeoDataFrame({"value": rng.random(n_features)},
+                           geometry=shapely.box(x, y, x + 0.001, y + 0.001), crs="EPSG:4326")
+    fc = og.FeatureCollection(gdf)
+    aoi = _aoi(scenes, km)
+
+    with Meter() as m:
+        fc.filterBounds(aoi)
+    rows.append(_row("FeatureCollection.filterBounds", m, n_features, "features", **params))
+    with Meter() as m:
+        fc.map(_add_area)
+    rows.append(_row("FeatureCollection.map", m, n_features, "features", **params))
+    with Meter() as m:
+        fc.map(_add_area_batched, batched=True)
+    rows.append(_row("FeatureCollection.map (batched)", m, n_features, "features", **params))
+    return rows
+
+
+def _print(rows):
+    print(f"{'step':<34} {'scenes':>6} {'aoi km':>6} {'seconds':>8} {'throughput':>18} {'peak MB':>8} {'MB read':>8}")
+    for r in rows:
+        rate = f"{r['rate']:,.0f} {r['unit']}/s"
+        print(f"{r['step']:<34} {r.get('n_scenes', ''):>6} {r.get('aoi_km', ''):>6} {r['seconds']:>8.3f} "
+              f"{rate:>18} {r['peak_mb']:>8.0f} {r['mb_read']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenes", type=int, nargs="+", default=[8, 32], help="Scene counts to benchmark.")
+    parser.add_argument("--aoi-km", type=float, nargs="+", default=[2, 10], help="AOI side lengths in km.")
+    parser.add_argument("--size", type=int, default=1024, help="Scene width and height in pixels.")
+    parser.add_argument("--features", type=int, default=100_000, help="Features for the vector steps (0 to skip).")
+    parser.add_argument("--workdir", default=None, help="Where scenes are generated and kept (default: a temp dir).")
+    parser.add_argument("--warm", action="store_true",
+                        help="Let raster steps reuse GDAL's HTTP block cache, as in an interactive session.")
+    parser.add_argument("--json", default=None, help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    import opengeo as og
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="opengeo-bench-")
+    rows = []
+    try:
+        for n_scenes in args.scenes:
+            scenes = make_scenes(os.path.join(workdir, f"scenes_{args.size}"), n_scenes=n_scenes,
+                                 size=args.size, tiles=TILES, res=RES)
+            with StacStandIn(os.path.join(workdir, f"scenes_{args.size}"), scenes) as server:
+                # A private search cache, so earlier runs cannot serve the cold searches
+                og.Initialize(server.url, cache_dir=os.path.join(workdir, "cache"))
+                if not args.warm:
+                    # GDAL reads config options from the environment, also in dask's threads
+                    os.environ["CPL_VSIL_CURL_NON_CACHED"] = f"/vsicurl/{server.url}"
+                for km in args.aoi_km:
+                    rows += bench_raster(server, scenes, km, workdir, n_scenes=n_scenes, aoi_km=km)
+        if args.features:
+            for km in args.aoi_km:
+                rows += bench_vector(scenes, args.features, km, aoi_km=km)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    _print(rows)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"size": args.size, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
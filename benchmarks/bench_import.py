@@ -0,0 +1,71 @@
+"""
+Import-time benchmark for `import opengeo`.
+
+Each run imports the package in a fresh interpreter and reports wall time,
+peak RSS and which heavy dependencies were pulled in. The script exits
+non-zero if the median time exceeds --max-seconds or if any heavy module is
+imported eagerly, so it can guard against regressions in CI.
+
+    python benchmarks/bench_import.py --runs 5 --max-seconds 0.5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY = ["leafmap", "ipyleaflet", "folium", "xarray", "dask", "geopandas", "stackstac", "rioxarray",
+         "rasterio", "pystac_client", "pandas", "shapely"]
+
+_PROBE = """
+import json, resource, sys, time
+t = time.perf_counter()
+import opengeo
+elapsed = time.perf_counter() - t
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+rss = rss / 1024 ** 2 if sys.platform == "darwin" else rss / 1024
+print(json.dumps({"seconds": elapsed, "rss_mb": rss, "modules": sorted(set(m.split(".")[0] for m in sys.modules))}))
+"""
+
+
+def run_once(attribute=None):
+    code = _PROBE if attribute is None else _PROBE.replace(
+        "elapsed = time.perf_counter() - t", f"getattr(opengeo, {attribute!r})\nelapsed = time.perf_counter() - t")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, os.environ.get("PYTHONPATH", "")]))
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=None, help="Fail if the median import time is higher.")
+    parser.add_argument("--attribute", action="append", default=[],
+                        help="Also time first access to og.<attribute> (e.g. Image, Map). Repeatable.")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    median = statistics.median(r["seconds"] for r in runs)
+    rss = max(r["rss_mb"] for r in runs)
+    eager = [m for m in HEAVY if m in runs[0]["modules"]]
+    print(f"import opengeo: median {median * 1000:.1f} ms over {args.runs} runs, peak RSS {rss:.0f} MB")
+    print(f"heavy modules imported eagerly: {', '.join(eager) or 'none'}")
+
+    for attribute in args.attribute:
+        result = run_once(attribute)
+        print(f"import opengeo + og.{attribute}: {result['seconds'] * 1000:.1f} ms, peak RSS {result['rss_mb']:.0f} MB")
+
+    failed = False
+    if eager:
+        print("FAIL: heavy dependencies are imported at package import time")
+        failed = True
+    if args.max_seconds is not None and median > args.max_seconds:
+        print(f"FAIL: median import time above {args.max_seconds} s")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Local STAC API stand-in and HTTP range server for offline benchmarks.
+
+Generates synthetic Cloud-Optimized GeoTIFF scenes and serves them together
+with a minimal STAC API (landing page, conformance, collections, item search
+with paging, sortby and numberMatched) from a background thread.
+"""
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+CONFORMANCE = [
+    "https://api.stacspec.org/v1.0.0/core",
+    "https://api.stacspec.org/v1.0.0/item-search",
+    "https://api.stacspec.org/v1.0.0/item-search#sort",
+    "https://api.stacspec.org/v1.0.0/item-search#query",
+    "https://api.stacspec.org/v1.0.0/collections",
+    "https://api.stacspec.org/v1.0.0/ogcapi-features",
+    "http://www.opengis.net/spec/ogcapi-features-1/1.0/conf/geojson",
+]
+
+BANDS = ["blue", "red", "nir"]
+
+
+def make_scenes(root, n_scenes=8, size=1024, tiles=2, res=10.0, epsg=32643,
+                origin=(500000.0, 1450000.0), start="2023-01-01", seed=0):
+    """
+    Writes `n_scenes` synthetic multi-asset COG scenes under `root`.
+
+    Scenes cycle over a `tiles` x `tiles` grid of adjacent footprints, one day
+    apart, each with one uint16 COG per band plus a 'cloud' property.
+    Returns a list of scene descriptors used to build STAC items.
+    """
+    import rasterio
+    from rasterio.transform import from_origin
+    from rasterio.warp import transform_bounds
+
+    os.makedirs(root, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    t0 = datetime.fromisoformat(start).replace(tzinfo=timezone.utc)
+    scenes = []
+    for i in range(n_scenes):
+        tx, ty = i % tiles, (i // tiles) % tiles
+        x0 = origin[0] + tx * size * res
+        y0 = origin[1] - ty * size * res
+        transform = from_origin(x0, y0, res, res)
+        bounds = (x0, y0 - size * res, x0 + size * res, y0)
+        assets = {}
+        for b, band in enumerate(BANDS):
+            path = os.path.join(root, f"scene{i:04d}_{band}.tif")
+            if not os.path.exists(path):
+                base = 500 + 1000 * b
+                yy, xx = np.mgrid[0:size, 0:size]
+                data = (base + (xx + yy) % 1000 + rng.integers(0, 200, (size, size))).astype("uint16")
+                # Every other pass gets a nodata swath edge, like partial tiles
+                if (i // (tiles * tiles)) % 2:
+                    data[:, : size // 4] = 0
+                profile = dict(
+                    driver="COG", width=size, height=size, count=1, dtype="uint16",
+                    crs=f"EPSG:{epsg}", transform=transform, nodata=0,
+                    compress="deflate", blocksize=256, overview_resampling="average"
+                )
+                with rasterio.open(path, "w", **profile) as dst:
+                    dst.write(data, 1)
+            assets[band] = os.path.basename(path)
+        ll = transform_bounds(f"EPSG:{epsg}", "EPSG:4326", *bounds)
+        scenes.append({
+            "id": f"scene{i:04d}",
+            "datetime": (t0 + timedelta(days=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "bbox": list(ll),
+            "proj_bbox": list(bounds),
+            "shape": [size, size],
+            "transform": list(transform)[:6],
+            "epsg": epsg,
+            "cloud": float(rng.uniform(0, 100)),
+            "tile": f"T{tx}{ty}",
+            "assets": assets,
+        })
+    return scenes
+
+
+def _item(scene, base_url, collection):
+    minx, miny, maxx, maxy = scene["bbox"]
+    return {
+        "type": "Feature",
+        "stac_version": "1.0.0",
+        "stac_extensions": ["https://stac-extensions.github.io/projection/v2.0.0/schema.json"],
+        "id": scene["id"],
+        "collection": collection,
+        "bbox": scene["bbox"],
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [[[minx, miny], [maxx, miny], [maxx, maxy], [minx, maxy], [minx, miny]]],
+        },
+        "properties": {
+            "datetime": scene["datetime"],
+            "eo:cloud_cover": scene["cloud"],
+            "platform": "synthetic-1",
+            "grid:code": scene["tile"],
+            "proj:code": f"EPSG:{scene['epsg']}",
+            "proj:epsg": scene["epsg"],
+            "proj:bbox": scene["proj_bbox"],
+            "proj:shape": scene["shape"],
+            "proj:transform": scene["transform"],
+        },
+        "assets": {
+            band: {
+                "href": f"{base_url}/data/{name}",
+                "type": "image/tiff; application=geotiff; profile=cloud-optimized",
+                "roles": ["data"],
+                "eo:bands": [{"name": band, "common_name": band}],
+            }
+            for band, name in scene["assets"].items()
+        },
+        "links": [],
+    }
+
+
+def _intersects(a, b):
+    return not (a[2] < b[0] or a[0] > b[2] or a[3] < b[1] or a[1] > b[3])
+
+
+def _geom_bbox(geom):
+    coords = np.array(re.findall(r"-?\d+\.?\d*(?:e-?\d+)?", json.dumps(geom["coordinates"])), dtype=float)
+    xs, ys = coords[0::2], coords[1::2]
+    return [xs.min(), ys.min(), xs.max(), ys.max()]
+
+
+class StacStandIn:
+    """Serves synthetic scenes as a STAC API plus HTTP range requests."""
+
+    def __init__(self, root, scenes, collection="synthetic", host="127.0.0.1", port=0):
+        self.root = root
+        self.scenes = scenes
+        self.collection = collection
+        self.bytes_served = 0
+        self.raster_bytes = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, obj, status=200):
+                body = json.dumps(obj).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/geo+json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                stand_in._count(len(body))
+
+            def do_HEAD(self):
+                self._serve_file(head=True)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.startswith("/data/"):
+                    return self._serve_file()
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                return self._route(url.path.rstrip("/"), params)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                return self._route(urlparse(self.path).path.rstrip("/"), body)
+
+            def _route(self, path, params):
+                base = stand_in.url
+                if path == "":
+                    return self._send_json({
+                        "type": "Catalog", "id": "stand-in", "stac_version": "1.0.0",
+                        "description": "Local STAC stand-in", "conformsTo": CONFORMANCE,
+                        "links": [
+                            {"rel": "self", "href": base},
+                            {"rel": "root", "href": base},
+                            {"rel": "data", "href": f"{base}/collections"},
+                            {"rel": "search", "href": f"{base}/search", "method": "GET",
+                             "type": "application/geo+json"},
+                            {"rel": "search", "href": f"{base}/search", "method": "POST",
+                             "type": "application/geo+json"},
+                            {"rel": "child", "href": f"{base}/collections/{stand_in.collection}"},
+                        ],
+                    })
+                if path == "/conformance":
+                    return self._send_json({"conformsTo": CONFORMANCE})
+                if path == "/collections":
+                    return self._send_json({"collections": [stand_in._collection()], "links": []})
+                if path == f"/collections/{stand_in.collection}":
+                    return self._send_json(stand_in._collection())
+                m = re.match(rf"^/collections/{stand_in.collection}/items/(.+)$", path)
+                if m:
+                    for s in stand_in.scenes:
+                        if s["id"] == m.group(1):
+                            return self._send_json(_item(s, base, stand_in.collection))
+                    return self._send_json({"code": "NotFound"}, 404)
+                if path in ("/search", f"/collections/{stand_in.collection}/items"):
+                    return self._send_json(stand_in._search(params))
+                return self._send_json({"code": "NotFound"}, 404)
+
+            def _serve_file(self, head=False):
+                path = os.path.join(stand_in.root, os.path.basename(urlparse(self.path).path))
+                if not os.path.exists(path):
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                size = os.path.getsize(path)
+                start, end = 0, size - 1
+                rng = self.headers.get("Range")
+                if rng:
+                    m = re.match(r"bytes=(\d+)-(\d*)", rng)
+                    start = int(m.group(1))
+                    end = min(int(m.group(2)) if m.group(2) else size - 1, size - 1)
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                else:
+                    self.send_response(200)
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Type", "image/tiff")
+                self.send_header("Content-Length", str(end - start + 1))
+                self.end_headers()
+                if head:
+                    return
+                with open(path, "rb") as f:
+                    f.seek(start)
+                    chunk = f.read(end - start + 1)
+                self.wfile.write(chunk)
+                stand_in._count(len(chunk), raster=True)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://{host}:{self._server.server_address[1]}"
+        self._thread = None
+
+    def _count(self, n, raster=False):
+        with self._lock:
+            self.bytes_served += n
+            self.requests += 1
+            if raster:
+                self.raster_bytes += n
+
+    def reset_counters(self):
+        with self._lock:
+            self.bytes_served = 0
+            self.raster_bytes = 0
+            self.requests = 0
+
+    def _collection(self):
+        return {
+            "type": "Collection", "id": self.collection, "stac_version": "1.0.0",
+            "description": "Synthetic scenes", "license": "proprietary",
+            "extent": {"spatial": {"bbox": [[-180, -90, 180, 90]]},
+                       "temporal": {"interval": [[None, None]]}},
+            "item_assets": {b: {"type": "image/tiff", "roles": ["data"]} for b in BANDS},
+            "links": [
+                {"rel": "self", "href": f"{self.url}/collections/{self.collection}"},
+                {"rel": "root", "href": self.url},
+                {"rel": "items", "href": f"{self.url}/collections/{self.collection}/items",
+                 "type": "application/geo+json"},
+            ],
+        }
+
+    def _search(self, params):
+        matches = list(self.scenes)
+        bbox = params.get("bbox")
+        if isinstance(bbox, str):
+            bbox = [float(v) for v in bbox.split(",")]
+        intersects = params.get("intersects")
+        if isinstance(intersects, str):
+            intersects = json.loads(intersects)
+        if intersects:
+            bbox = _geom_bbox(intersects)
+        if bbox:
+            matches = [s for s in matches if _intersects(s["bbox"], bbox)]
+        dt = params.get("datetime")
+        if dt:
+            start, _, end = dt.partition("/")
+            if not end:
+                end = start
+            lo = start if start not in ("", "..") else "0000"
+            hi = end if end not in ("", "..") else "9999"
+            if len(hi) == 10:
+                hi = hi + "T23:59:59Z"
+            matches = [s for s in matches if lo <= s["datetime"] <= hi]
+        sortby = params.get("sortby")
+        if sortby:
+            if isinstance(sortby, str):
+                sortby = [{"field": p.lstrip("+-"), "direction": "desc" if p.startswith("-") else "asc"}
+                          for p in sortby.split(",")]
+            for rule in reversed(sortby):
+                field = rule["field"].replace("properties.", "")
+                key = {"datetime": "datetime", "eo:cloud_cover": "cloud", "id": "id"}.get(field, "datetime")
+                matches.sort(key=lambda s: s[key], reverse=rule.get("direction") == "desc")
+        limit = int(params.get("limit") or 10)
+        token = int(params.get("token") or 0)
+        page = matches[token:token + limit]
+        links = []
+        if token + limit < len(matches):
+            nxt = dict(params)
+            nxt["token"] = token + limit
+            links.append({"rel": "next", "href": f"{self.url}/search", "method": "POST", "body": nxt})
+        return {
+            "type": "FeatureCollection",
+            "features": [_item(s, self.url, self.collection) for s in page],
+            "numberMatched": len(matches),
+            "numberReturned": len(page),
+            "links": links,
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
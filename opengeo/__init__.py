@@ -1,4 +1,5 @@
 import os
+from typing import TYPE_CHECKING
 
 # Set PROJ_LIB for Windows conda environments if needed
 # This must be done before pyproj is imported by any submodule
@@ -13,20 +14,68 @@ if 'PROJ_LIB' not in os.environ:
         except ImportError:
             pass
 
-from .image import Image
-from .image_collection import ImageCollection
-from .feature import Feature
-from .feature_collection import FeatureCollection
-from .geometry import Geometry
-from .map import Map
-from .config import Initialize, STAC_API, DisplayCatalogs, Catalogs, Catalog, Urls, Aliases, Collections, Items, Assets, Item, AssetUrls, DisplayItem
+# Public names are imported on first use, so `import opengeo` stays cheap for
+# jobs that never touch maps or rasters (leafmap, stackstac, rioxarray and
+# geopandas take seconds and hundreds of MB to import)
+_LAZY = {
+    "Image": ".image",
+    "ImageCollection": ".image_collection",
+    "FederatedImageCollection": ".federated",
+    "Feature": ".feature",
+    "FeatureCollection": ".feature_collection",
+    "Geometry": ".geometry",
+    "Reducer": ".reducer",
+    "Map": ".map",
+    "Initialize": ".config",
+    "STAC_API": ".config",
+    "DisplayCatalogs": ".config",
+    "Catalogs": ".config",
+    "Catalog": ".config",
+    "Urls": ".config",
+    "Aliases": ".config",
+    "Collections": ".config",
+    "Items": ".config",
+    "Assets": ".config",
+    "Item": ".config",
+    "AssetUrls": ".config",
+    "DisplayItem": ".config",
+    "ClearCache": ".config",
+    "ProbeCatalogs": ".probe",
+}
+
+if TYPE_CHECKING:
+    from .image import Image
+    from .image_collection import ImageCollection
+    from .federated import FederatedImageCollection
+    from .feature import Feature
+    from .feature_collection import FeatureCollection
+    from .geometry import Geometry
+    from .reducer import Reducer
+    from .map import Map
+    from .config import Initialize, STAC_API, DisplayCatalogs, Catalogs, Catalog, Urls, Aliases, Collections, Items, Assets, Item, AssetUrls, DisplayItem, ClearCache
+    from .probe import ProbeCatalogs
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module 'opengeo' has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
 
 __all__ = [
     "Image",
     "ImageCollection", 
+    "FederatedImageCollection",
     "Feature",
     "FeatureCollection",
     "Geometry",
+    "Reducer",
     "Initialize",
     "Map",
     "STAC_API",
@@ -40,5 +89,7 @@ __all__ = [
     "Assets",
     "Item",
     "AssetUrls",
-    "DisplayItem"
+    "DisplayItem",
+    "ClearCache",
+    "ProbeCatalogs"
 ]
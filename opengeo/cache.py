@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_DEFAULT_DIR = os.environ.get(
+    "OPENGEO_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "opengeo")
+)
+
+# Cached searches hide scenes ingested after them, so entries expire quickly
+# unless a longer TTL is asked for
+DEFAULT_TTL = 300
+
+
+def canonical_json(obj):
+    """
+    Serializes search parameters deterministically so equal searches share a key.
+    Geometries (shapely, og.Geometry, GeoJSON) are reduced to GeoJSON mappings.
+    """
+    def _normalize(value):
+        if hasattr(value, "__geo_interface__"):
+            return value.__geo_interface__
+        if hasattr(value, "shapely"):
+            return value.shapely.__geo_interface__
+        if isinstance(value, (set, frozenset)):
+            return sorted(value)
+        return str(value)
+
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), default=_normalize)
+
+
+class SearchCache:
+    """
+    Persistent SQLite cache for STAC API responses.
+
+    Entries are keyed by API URL, request kind and canonicalized parameters.
+    They expire after `ttl` seconds and the least recently used entries are
+    evicted once the stored payloads exceed `max_size` bytes. In offline mode
+    expired entries are still served and misses raise instead of hitting the
+    network.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, max_size=512 * 1024 ** 2, offline=False, enabled=True):
+        self.path = path or os.path.join(_DEFAULT_DIR, "stac_cache.sqlite")
+        self.ttl = ttl
+        self.max_size = max_size
+        self.offline = offline
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " api TEXT,"
+                " payload TEXT,"
+                " size INTEGER,"
+                " created REAL,"
+                " accessed REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def key(api, kind, params):
+        raw = canonical_json({"api": api.rstrip("/"), "kind": kind, "params": params})
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Returns the cached value for `key`, or None if missing or expired."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT payload, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            payload, created = row
+            now = time.time()
+            if not self.offline and self.ttl is not None and now - created > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            conn.commit()
+        return json.loads(payload)
+
+    def set(self, key, value, api=None):
+        if not self.enabled:
+            return
+        payload = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, api, payload, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, api, payload, len(payload), now, now)
+            )
+            conn.commit()
+            self._evict(conn)
+
+    def _evict(self, conn):
+        if self.max_size is None:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_size:
+            return
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed ASC").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_size:
+                break
+            stale.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        conn.commit()
+
+    def fetch(self, api, kind, params, query):
+        """
+        Returns the cached response for this request, calling `query()` on a miss.
+        `query` must return a JSON-serializable value.
+        """
+        key = self.key(api, kind, params)
+        value = self.get(key)
+        if value is not None:
+            return value
+        if self.offline:
+            raise ConnectionError(f"Offline mode: no cached '{kind}' response for {api}.")
+        value = query()
+        self.set(key, value, api=api)
+        return value
+
+    def invalidate(self, api, kind, params):
+        """Removes the entry for a single request, if present."""
+        if not self.enabled:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses WHERE key = ?", (self.key(api, kind, params),))
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+    def __repr__(self):
+        return (f"og.SearchCache(path={self.path!r}, ttl={self.ttl}, max_size={self.max_size}, "
+                f"offline={self.offline}, enabled={self.enabled})")
+
+
+_CACHE = SearchCache()
+
+
+def get_cache():
+    """Internal helper returning the process-wide search cache."""
+    return _CACHE
+
+
+def configure_cache(enabled=True, path=None, ttl=DEFAULT_TTL, max_size=512 * 1024 ** 2, offline=False):
+    """Replaces the process-wide search cache with one using the given settings."""
+    global _CACHE
+    _CACHE = SearchCache(path=path, ttl=ttl, max_size=max_size, offline=offline, enabled=enabled)
+    return _CACHE
@@ -0,0 +1,110 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Connection settings, controlled through og.Initialize()
+_POOL_SIZE = 10
+_TIMEOUT = 30
+_MAX_RETRIES = 3
+
+_LOCK = threading.Lock()
+_SESSION = None
+_CLIENTS = {}
+_OPENING = {}
+_MODIFIERS = {}
+
+
+def configure_clients(pool_size=10, timeout=30, max_retries=3):
+    """Sets the connection pool size, timeout and retries and drops open clients."""
+    global _POOL_SIZE, _TIMEOUT, _MAX_RETRIES, _SESSION
+    with _LOCK:
+        _POOL_SIZE = pool_size
+        _TIMEOUT = timeout
+        _MAX_RETRIES = max_retries
+        if _SESSION is not None:
+            _SESSION.close()
+        _SESSION = None
+        _CLIENTS.clear()
+
+
+def get_session():
+    """Returns the shared keep-alive HTTP session used for all STAC requests."""
+    global _SESSION
+    with _LOCK:
+        if _SESSION is None:
+            retry = Retry(
+                total=_MAX_RETRIES,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=None
+            )
+            adapter = HTTPAdapter(pool_connections=_POOL_SIZE, pool_maxsize=_POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _SESSION = session
+        return _SESSION
+
+
+def get_timeout():
+    return _TIMEOUT
+
+
+def get_modifier(api_url):
+    """
+    Returns the item signing modifier required by `api_url`, or None.
+    Microsoft Planetary Computer assets need SAS-signed hrefs; tokens are
+    cached per storage container by og.signing.
+    """
+    if api_url not in _MODIFIERS:
+        modifier = None
+        if "planetarycomputer" in api_url:
+            from .signing import sign_inplace
+            modifier = sign_inplace
+        _MODIFIERS[api_url] = modifier
+    return _MODIFIERS[api_url]
+
+
+def get_client(api_url, signed=False):
+    """
+    Returns an open pystac_client.Client for `api_url` from the process-wide registry.
+
+    Clients are keyed by URL and modifier and share one pooled HTTP session,
+    so the landing page and conformance classes are only fetched once.
+    With `signed=True` returned items are signed by the catalog's modifier.
+    """
+    from pystac_client import Client
+    from pystac_client.stac_api_io import StacApiIO
+
+    modifier = get_modifier(api_url) if signed else None
+    key = (api_url, modifier)
+    with _LOCK:
+        client = _CLIENTS.get(key)
+        if client is not None:
+            return client
+        # One lock per catalog: concurrent callers wait for the client being
+        # opened instead of each fetching the landing page
+        opening = _OPENING.setdefault(key, threading.Lock())
+
+    with opening:
+        with _LOCK:
+            client = _CLIENTS.get(key)
+        if client is None:
+            stac_io = StacApiIO(max_retries=None)
+            stac_io.session = get_session()
+            # Client.open applies headers, parameters, request modifier and
+            # timeout through stac_io.update(), now on the shared session
+            client = Client.open(api_url, modifier=modifier, stac_io=stac_io, timeout=_TIMEOUT)
+            with _LOCK:
+                _CLIENTS[key] = client
+    return client
+
+
+def sign(api_url, obj):
+    """Signs a pystac Item/ItemCollection or item dictionary in place if `api_url` requires it."""
+    modifier = get_modifier(api_url)
+    if modifier is not None:
+        modifier(obj)
+    return obj
@@ -9,9 +9,14 @@ if 'PROJ_LIB' not in os.environ:
     if os.path.exists(os.path.join(potential_path, "proj.db")):
         os.environ['PROJ_LIB'] = potential_path
 
+import numpy as np
+
 from .catalogs import STAC_CATALOGS
+from .cache import DEFAULT_TTL, get_cache, configure_cache
+from .client import get_client, get_modifier, configure_clients, sign
 
 _STAC_API = "https://earth-search.aws.element84.com/v1"
+_DTYPE = np.dtype("float32")
 
 def Catalogs():
     """
@@ -44,91 +49,81 @@ def Collections():
     """
     Returns a list of collection IDs from the currently initialized STAC API.
     """
-    from pystac_client import Client
-    # Handle Microsoft signing if needed
-    modifier = None
-    if "planetarycomputer" in _STAC_API:
-        try:
-            import planetary_computer
-            modifier = planetary_computer.sign_inplace
-        except ImportError:
-            pass
-            
-    client = Client.open(_STAC_API, modifier=modifier)
-    return [c.id for c in client.get_all_collections()]
+    def _query():
+        client = get_client(_STAC_API)
+        return [c.id for c in client.get_all_collections()]
+
+    return get_cache().fetch(_STAC_API, "collections", {}, _query)
 
 def Items(collection_id, limit=10):
     """
     Returns a list of items from a specific collection in the currently initialized STAC API.
     """
-    from pystac_client import Client
-    modifier = None
-    if "planetarycomputer" in _STAC_API:
-        try:
-            import planetary_computer
-            modifier = planetary_computer.sign_inplace
-        except ImportError:
-            pass
-            
-    client = Client.open(_STAC_API, modifier=modifier)
-    search = client.search(collections=[collection_id], max_items=limit)
-    return [item.to_dict() for item in search.items()]
+    def _query():
+        client = get_client(_STAC_API)
+        search = client.search(collections=[collection_id], max_items=limit)
+        return [item.to_dict() for item in search.items()]
+
+    items = get_cache().fetch(_STAC_API, "items", {"collection": collection_id, "limit": limit}, _query)
+    return [_sign_item_dict(item) for item in items]
 
 def Assets(collection_id):
     """
     Returns a list of available assets (bands/keys) for a specific collection.
     """
-    from pystac_client import Client
-    modifier = None
-    if "planetarycomputer" in _STAC_API:
-        try:
-            import planetary_computer
-            modifier = planetary_computer.sign_inplace
-        except ImportError:
-            pass
-            
-    client = Client.open(_STAC_API, modifier=modifier)
-    collection = client.get_collection(collection_id)
-    
-    # Try getting from item_assets extension first
-    if collection.extra_fields and "item_assets" in collection.extra_fields:
-        return list(collection.extra_fields["item_assets"].keys())
-    
-    # Fallback: get assets from the first item
-    search = client.search(collections=[collection_id], max_items=1)
-    items = list(search.items())
-    if items:
-        return list(items[0].assets.keys())
-    
-    return []
+    def _query():
+        client = get_client(_STAC_API)
+        collection = client.get_collection(collection_id)
+        
+        # Try getting from item_assets extension first
+        if collection.extra_fields and "item_assets" in collection.extra_fields:
+            return list(collection.extra_fields["item_assets"].keys())
+        
+        # Fallback: get assets from the first item
+        search = client.search(collections=[collection_id], max_items=1)
+        items = list(search.items())
+        if items:
+            return list(items[0].assets.keys())
+        
+        return []
+
+    return get_cache().fetch(_STAC_API, "assets", {"collection": collection_id}, _query)
 
 def Item(collection_id, item_id):
     """
     Returns a specific item from a collection.
     """
-    from pystac_client import Client
-    modifier = None
-    if "planetarycomputer" in _STAC_API:
-        try:
-            import planetary_computer
-            modifier = planetary_computer.sign_inplace
-        except ImportError:
-            pass
-            
-    client = Client.open(_STAC_API, modifier=modifier)
-    collection = client.get_collection(collection_id)
-    if collection:
-        item = collection.get_item(item_id)
-        return item.to_dict() if item else None
-    return None
+    def _query():
+        client = get_client(_STAC_API)
+        collection = client.get_collection(collection_id)
+        if collection:
+            item = collection.get_item(item_id)
+            return item.to_dict() if item else None
+        return None
+
+    params = {"collection": collection_id, "item": item_id}
+    item = get_cache().fetch(_STAC_API, "item", params, _query)
+    return _sign_item_dict(item) if item else None
+
+def _sign_item_dict(item):
+    """Signs a copy of a cached (unsigned) item dictionary if the current API requires it."""
+    if get_modifier(_STAC_API) is None:
+        return item
+    item = dict(item, assets={k: dict(v) for k, v in item.get("assets", {}).items()})
+    return sign(_STAC_API, item)
 
 def AssetUrls(item):
     """
     Returns a dictionary mapping asset names to their download/access URLs.
-    Pass either an item dictionary or a Pystac Item.
+    Pass either an item dictionary or a Pystac Item. Planetary Computer hrefs
+    are signed with cached tokens.
     """
     assets = item.get('assets', {}) if isinstance(item, dict) else item.assets
-    return {k: v.get('href') if isinstance(v, dict) else v.href for k, v in assets.items()}
+    urls = {k: v.get('href') if isinstance(v, dict) else v.href for k, v in assets.items()}
+    if get_modifier(_STAC_API) is None:
+        return urls
+    from .signing import sign_href
+    return {k: sign_href(href) for k, href in urls.items()}
 
 def DisplayItem(item):
     """
@@ -156,33 +151,95 @@ def Catalog(alias):
     """
     return STAC_CATALOGS.get(alias.upper())
 
-def Initialize(url=None):
+def ClearCache():
+    """
+    Removes all cached STAC responses from the local search cache.
+    """
+    get_cache().clear()
+
+_LEGACY_ALIASES = {
+    'PLANETARY_COMPUTER': "https://planetarycomputer.microsoft.com/api/stac/v1",
+    'CMR': "https://cmr.earthdata.nasa.gov/stac",
+    'LANDSATLOOK': "https://landsatlook.usgs.gov/stac-server",
+    'GEE': "https://earthengine-stac.storage.googleapis.com/catalog/catalog.json",
+    'GOOGLE': "https://earthengine-stac.storage.googleapis.com/catalog/catalog.json",
+    'EARTH_SEARCH': "https://earth-search.aws.element84.com/v1",
+}
+
+def resolve_url(url):
+    """Internal helper turning a catalog alias (or URL) into a STAC API URL."""
+    alias_info = Catalog(url)
+    if alias_info:
+        return alias_info['url']
+    # Fallback for some legacy or common aliases not in the list or custom URL
+    return _LEGACY_ALIASES.get(url.upper(), url)
+
+def Initialize(url=None, cache=True, cache_dir=None, cache_ttl=DEFAULT_TTL, cache_size=512 * 1024 ** 2, offline=False,
+               pool_size=10, timeout=30, max_retries=3, dtype="float32", prefer=None, collection=None,
+               refresh=False):
     """
     Initialize the OpenGeo module, optionally setting the default STAC API URL.
     Supports aliases from STAC_CATALOGS.
+
+    Args:
+        url: STAC API URL or catalog alias. With `prefer='fastest'`, a list
+            of candidates (default: all public catalogs).
+        cache: Whether to cache STAC search results on disk. The cache is
+            on by default, also when Initialize is never called.
+        cache_dir: Directory of the cache database (default: ~/.cache/opengeo).
+        cache_ttl: Seconds before a cached response is considered stale
+            (default 300). Until then a repeated search returns the cached
+            items and misses scenes ingested since, so raise it only for
+            archives that no longer change; `collection.refresh()` or
+            og.ClearCache() force a fresh search.
+        cache_size: Maximum size of cached payloads in bytes, least recently
+            used entries are evicted first.
+        offline: Serve only cached responses, ignoring their age.
+        pool_size: Number of keep-alive connections per host shared by all
+            STAC clients.
+        timeout: Seconds before a STAC request times out.
+        max_retries: Retries for failed or throttled STAC requests.
+        dtype: Floating point type used to load and compute images
+            ('float32' or 'float64'). Inputs of a wider type are never
+            narrowed.
+        prefer: 'fastest' to probe the candidate catalogs (see
+            og.ProbeCatalogs) and use the lowest-latency one that is up,
+            supports item search and, if given, serves `collection`.
+        collection: Collection the chosen catalog must serve.
+        refresh: With `prefer='fastest'`, probe every candidate again
+            instead of reusing cached probe results.
     """
-    global _STAC_API
+    global _STAC_API, _DTYPE
+
+    if np.dtype(dtype).kind != "f":
+        raise ValueError(f"dtype must be a floating point type, got '{dtype}'.")
+    if prefer not in (None, "fastest"):
+        raise ValueError(f"prefer must be None or 'fastest', got '{prefer}'.")
+    _DTYPE = np.dtype(dtype)
     
-    if url:
-        alias_info = Catalog(url)
-        if alias_info:
-            _STAC_API = alias_info['url']
-        else:
-            # Fallback for some legacy or common aliases not in the list or custom URL
-            legacy_aliases = {
-                'PLANETARY_COMPUTER': "https://planetarycomputer.microsoft.com/api/stac/v1",
-                'CMR': "https://cmr.earthdata.nasa.gov/stac",
-                'LANDSATLOOK': "https://landsatlook.usgs.gov/stac-server",
-                'GEE': "https://earthengine-stac.storage.googleapis.com/catalog/catalog.json",
-                'GOOGLE': "https://earthengine-stac.storage.googleapis.com/catalog/catalog.json",
-                'EARTH_SEARCH': "https://earth-search.aws.element84.com/v1",
-            }
-            if url.upper() in legacy_aliases:
-                _STAC_API = legacy_aliases[url.upper()]
-            else:
-                _STAC_API = url
+    if url and prefer is None:
+        _STAC_API = resolve_url(url)
     
     os.environ['AWS_NO_SIGN_REQUEST'] = 'YES'
+
+    configure_cache(
+        enabled=cache,
+        path=os.path.join(cache_dir, "stac_cache.sqlite") if cache_dir else None,
+        ttl=cache_ttl,
+        max_size=cache_size,
+        offline=offline
+    )
+    configure_clients(pool_size=pool_size, timeout=timeout, max_retries=max_retries)
+
+    if prefer == "fastest":
+        from .probe import fastest_catalog
+        candidates = [url] if isinstance(url, str) else url
+        best = fastest_catalog(candidates, collection=collection, refresh=refresh)
+        if best is None:
+            what = f" serving '{collection}'" if collection else ""
+            raise ConnectionError(f"No reachable STAC API{what} among the candidate catalogs.")
+        _STAC_API = best['url']
+        print(f"Fastest catalog: {best['alias'] or best['url']} ({best['latency'] * 1000:.0f} ms)")
             
     print(f"OpenGeo initialized with STAC API: {_STAC_API}")
 
@@ -192,3 +249,20 @@ def STAC_API():
 def get_stac_api():
     """Internal helper to return the current STAC API URL."""
     return _STAC_API
+
+def get_dtype():
+    """Internal helper to return the floating point dtype images are computed in."""
+    return _DTYPE
+
+def compute_dtype(*dtypes, dtype=None):
+    """
+    Floating dtype for a computation on inputs of `dtypes`: the configured
+    dtype (or `dtype`), widened to any floating input that is wider so
+    precision is never dropped silently. Integer inputs do not widen it.
+    """
+    result = np.dtype(dtype or _DTYPE)
+    for d in dtypes:
+        d = np.dtype(d)
+        if d.kind in "fc":
+            result = np.promote_types(result, d)
+    return result
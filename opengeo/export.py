@@ -0,0 +1,319 @@
+"""
+Chunk-streamed raster export.
+
+Dask chunks are computed in parallel and written as windows of a tiled,
+compressed GeoTIFF as soon as each one is ready, so memory stays at a few
+chunks whatever the size of the image. Chunks are aligned to the TIFF tiles
+so every tile is compressed exactly once. Overviews are then built from the
+written file and it is copied into a Cloud-Optimized GeoTIFF.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+import dask.array as dsa
+
+from .streaming import grid_transform
+
+
+class _WindowWriter:
+    """dask.array.store target writing each block as a window of an open rasterio dataset."""
+
+    def __init__(self, dst, total_bytes, progress):
+        self._dst = dst
+        self._total = total_bytes
+        self._progress = progress
+        self._start = time.perf_counter()
+        self._last = 0.0
+        self.written = 0
+
+    def __setitem__(self, key, value):
+        from rasterio.windows import Window
+
+        bands, ys, xs = key
+        window = Window.from_slices(ys, xs)
+        self._dst.write(value, window=window, indexes=list(range(bands.start + 1, bands.stop + 1)))
+        self.written += value.nbytes
+        if self._progress:
+            now = time.perf_counter()
+            if now - self._last > 1 or self.written >= self._total:
+                self._last = now
+                elapsed = max(now - self._start, 1e-9)
+                print(
+                    f"\rWriting: {100 * self.written / self._total:5.1f}% "
+                    f"({self.written / 1e6:.1f} of {self._total / 1e6:.1f} MB, {self.written / 1e6 / elapsed:.1f} MB/s)",
+                    end="", flush=True
+                )
+
+
+def _overview_factors(height, width, blocksize):
+    factors = []
+    factor = 2
+    while max(height, width) / factor >= blocksize / 2:
+        factors.append(factor)
+        factor *= 2
+    return factors
+
+
+def _aligned_chunks(arr, blocksize):
+    """Rechunks to whole bands and spatial chunks that are multiples of the tile size."""
+    def _size(chunks):
+        return max(blocksize, int(round(max(chunks) / blocksize)) * blocksize)
+    return arr.rechunk((-1, _size(arr.chunks[1]), _size(arr.chunks[2])))
+
+
+def write_geotiff(da, path, cog=True, compress="deflate", blocksize=512, overviews="auto",
+                  resampling="average", nodata=None, progress=True, **creation_options):
+    """
+    Writes a (band, y, x) or (y, x) DataArray to a tiled, compressed GeoTIFF.
+
+    Chunks are computed on dask's threaded scheduler and written through a
+    lock as they complete, so the image is never materialized in memory:
+    peak memory is a chunk per worker thread plus GDAL's block cache
+    (GDAL_CACHEMAX). For COGs the tiles are staged uncompressed next to
+    `path` and compressed once while copying into the COG layout.
+
+    Args:
+        da: DataArray with a CRS.
+        path: Output file.
+        cog: Produce a Cloud-Optimized GeoTIFF (tiled, internal overviews,
+            header first). Otherwise a tiled GeoTIFF with overviews.
+        compress: GDAL compression ('deflate', 'lzw', 'zstd', ...), or None.
+        blocksize: Tile size in pixels.
+        overviews: 'auto' for powers of two down to one tile, a list of
+            factors, or None.
+        resampling: Overview resampling method.
+        nodata: Nodata value; defaults to the array's (NaN for floats).
+        progress: Print progress and throughput.
+        **creation_options: Extra GDAL creation options.
+
+    Returns:
+        Dict with the number of bytes written, seconds elapsed and MB/s.
+    """
+    import rasterio
+    import rasterio.shutil
+    from rasterio.enums import Resampling
+
+    if da.ndim == 2:
+        da = da.expand_dims("band")
+    band_dim = next(d for d in da.dims if d not in ("y", "x"))
+    da = da.transpose(band_dim, "y", "x")
+
+    arr = da.data
+    if not isinstance(arr, dsa.Array):
+        arr = dsa.from_array(arr, chunks=(-1, blocksize * 4, blocksize * 4))
+    if arr.dtype == bool:
+        arr = arr.astype(np.uint8)
+    elif arr.dtype == np.float16:
+        arr = arr.astype(np.float32)
+    arr = _aligned_chunks(arr, blocksize)
+
+    if nodata is None:
+        nodata = da.rio.nodata
+        if nodata is None and arr.dtype.kind == "f":
+            nodata = np.nan
+
+    n_band, height, width = arr.shape
+    profile = dict(
+        driver="GTiff", width=width, height=height, count=n_band, dtype=arr.dtype.name,
+        crs=da.rio.crs, transform=grid_transform(da), nodata=nodata,
+        tiled=True, blockxsize=blocksize, blockysize=blocksize,
+        BIGTIFF="IF_SAFER", **creation_options
+    )
+    if compress:
+        profile["compress"] = compress
+        if arr.dtype.kind in "iu" and compress.lower() in ("deflate", "lzw", "zstd"):
+            # Horizontal differencing shrinks integer imagery considerably
+            profile.setdefault("predictor", 2)
+
+    target = f"{path}.partial.tif" if cog else path
+    # The COG copy compresses every tile once; compressing the staging file
+    # as well would double the CPU cost
+    staging = {k: v for k, v in profile.items() if k not in ("compress", "predictor")} if cog else profile
+    start = time.perf_counter()
+    try:
+        with rasterio.open(target, "w", **staging) as dst:
+            if band_dim in da.coords:
+                for i, name in enumerate(da[band_dim].values.tolist()):
+                    dst.set_band_description(i + 1, str(name))
+            writer = _WindowWriter(dst, arr.nbytes, progress)
+            dsa.store(arr, writer, lock=threading.Lock(), scheduler="threads")
+            if progress:
+                print()
+
+            if overviews == "auto":
+                overviews = _overview_factors(height, width, blocksize)
+            if overviews:
+                dst.build_overviews(overviews, Resampling[resampling])
+                dst.update_tags(ns="rio_overview", resampling=resampling)
+
+        if cog:
+            options = {k: v for k, v in profile.items() if k.upper() in ("COMPRESS", "PREDICTOR", "BIGTIFF")}
+            with rasterio.Env() as env:
+                has_cog_driver = "COG" in env.drivers()
+            if has_cog_driver:
+                rasterio.shutil.copy(target, path, driver="COG", blocksize=blocksize, num_threads="ALL_CPUS",
+                                     overviews="FORCE_USE_EXISTING" if overviews else "NONE", **options)
+            else:
+                rasterio.shutil.copy(target, path, driver="GTiff", tiled=True, blockxsize=blocksize,
+                                     blockysize=blocksize, copy_src_overviews=True, **options)
+    finally:
+        if cog and os.path.exists(target):
+            os.remove(target)
+
+    elapsed = time.perf_counter() - start
+    stats = {"bytes": arr.nbytes, "seconds": elapsed, "MB/s": arr.nbytes / 1e6 / max(elapsed, 1e-9)}
+    if progress:
+        print(f"Exported {path}: {arr.nbytes / 1e6:.1f} MB in {elapsed:.1f} s ({stats['MB/s']:.1f} MB/s)")
+    return stats
+
+
+def _zarr_codec(compression, level):
+    import numcodecs
+
+    if compression is None:
+        return None
+    if not isinstance(compression, str):
+        return compression
+    name = compression.lower()
+    if name == "gzip":
+        return numcodecs.GZip(level=level)
+    if name in ("zstd", "lz4", "lz4hc", "zlib", "blosclz"):
+        return numcodecs.Blosc(cname=name, clevel=level, shuffle=numcodecs.Blosc.BITSHUFFLE)
+    raise ValueError(f"Unknown compression '{compression}'. Use 'zstd', 'lz4', 'zlib', 'gzip', a numcodecs codec or None.")
+
+
+def _zarr_dataset(da, name):
+    """Converts a stack into a Dataset zarr can store: plain attributes, serializable coordinates and a CRS."""
+    crs = da.rio.crs
+    transform = grid_transform(da) if crs is not None else None
+
+    # The grid is stored as the CF grid mapping; other metadata must be plain values
+    attrs = {k: v for k, v in da.attrs.items() if isinstance(v, (str, int, float, bool))}
+
+    drop = []
+    for coord in da.coords:
+        if coord in da.dims or coord == "spatial_ref":
+            continue
+        values = da[coord].values
+        if values.dtype == object:
+            flat = values.ravel().tolist()
+            if all(isinstance(v, str) for v in flat):
+                da = da.assign_coords({coord: da[coord].astype(str)})
+            elif all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in flat):
+                da = da.assign_coords({coord: da[coord].astype(float)})
+            else:
+                drop.append(coord)
+    da = da.drop_vars(drop + ["spatial_ref"], errors="ignore").copy(deep=False)
+    if transform is not None and transform.b == 0 and transform.d == 0:
+        # Label pixels by their centers, as CF readers (and rioxarray) expect
+        da = da.assign_coords(
+            x=transform.c + transform.a * (np.arange(da.sizes["x"]) + 0.5),
+            y=transform.f + transform.e * (np.arange(da.sizes["y"]) + 0.5),
+        )
+    da.attrs = attrs
+    ds = da.to_dataset(name=name)
+    if crs is not None:
+        ds = ds.rio.write_crs(crs).rio.write_transform(transform)
+    return ds
+
+
+def write_zarr(da, store, name=None, mode="w-", compression="zstd", level=5, consolidated=True):
+    """
+    Writes a (time, band, y, x) or (band, y, x) DataArray to a Zarr store.
+
+    Zarr chunks follow the dask chunks (one time step per chunk), chunks are
+    written in parallel without materializing the array, and the store gets
+    consolidated metadata so readers open it with a single request.
+
+    Args:
+        da: DataArray to write.
+        store: Path or zarr store.
+        name: Variable name; defaults to 'data'.
+        mode: 'w-' to create (fail if the store exists), 'w' to overwrite,
+            or 'a' to append time steps not yet in the store (creating it if
+            needed). Steps are matched by their 'id' coordinate (STAC item
+            id) when present, else by time; existing steps are never
+            rewritten, and new steps older than the store's last one raise
+            a ValueError so the time axis stays sorted.
+        compression: 'zstd', 'lz4', 'zlib', 'gzip', a numcodecs codec or None.
+        level: Compression level.
+        consolidated: Write consolidated metadata.
+
+    Returns:
+        Number of time steps written (1 for images without time).
+    """
+    import xarray as xr
+    import zarr
+
+    name = name or "data"
+    if mode not in ("w-", "w", "a"):
+        raise ValueError("mode must be 'w-', 'w' or 'a'.")
+
+    existing = None
+    if mode == "a":
+        if "time" not in da.dims:
+            raise ValueError("Appending requires a 'time' dimension.")
+        try:
+            existing = xr.open_zarr(store, consolidated=None)
+        except FileNotFoundError:
+            pass
+
+    if existing is not None:
+        if name not in existing:
+            raise ValueError(f"Store has no variable '{name}' to append to.")
+        ds = _zarr_dataset(da, name)
+        for dim in ("y", "x"):
+            if existing.sizes.get(dim) != ds.sizes[dim] or not np.allclose(existing[dim].values, ds[dim].values):
+                raise ValueError(f"Cannot append: the '{dim}' grid differs from the store's.")
+        # Scenes are told apart by item id where both sides have one: adjacent
+        # tiles of one datatake share their timestamp
+        key = "id" if all("id" in d.coords and d["id"].dims == ("time",) for d in (ds, existing)) else "time"
+        new = ~np.isin(ds[key].values, existing[key].values)
+        if not new.any():
+            print("All time steps are already in the store, nothing to append.")
+            return 0
+        ds = ds.isel(time=np.flatnonzero(new)).sortby("time")
+        last = existing["time"].values.max()
+        if ds["time"].values[0] < last:
+            older = [str(v) for v in ds[key].values[ds["time"].values < last]]
+            raise ValueError(
+                f"Cannot append {older}: older than the store's last time step ({last}), which would leave "
+                "the time axis out of order. Filter the new scenes by date or rewrite the store with mode='w'."
+            )
+        # Keep per-time metadata aligned with the store's
+        ds = ds.drop_vars([v for v in ds.variables if v not in existing.variables])
+        for coord in existing.coords:
+            if "time" in existing[coord].dims and coord not in ds.coords and coord != "time":
+                fill = "" if existing[coord].dtype.kind in "US" else np.nan
+                ds = ds.assign_coords({coord: ("time", np.full(ds.sizes["time"], fill))})
+        ds[name] = ds[name].chunk(existing[name].encoding.get("preferred_chunks", {}))
+        ds.to_zarr(store, append_dim="time", consolidated=consolidated)
+        return ds.sizes["time"]
+
+    ds = _zarr_dataset(da, name)
+    var = ds[name]
+    # Regular chunks matching the dask layout; single time steps so appends stay cheap
+    chunks = {}
+    for dim in var.dims:
+        if dim == "time":
+            chunks[dim] = 1
+        elif var.chunks is not None and dim in ("y", "x"):
+            chunks[dim] = var.chunksizes[dim][0]
+        else:
+            chunks[dim] = var.sizes[dim]
+    ds[name] = var.chunk(chunks)
+
+    encoding = {"chunks": tuple(chunks[d] for d in var.dims)}
+    codec = _zarr_codec(compression, level)
+    options = {}
+    if int(zarr.__version__.split(".")[0]) >= 3:
+        # Zarr format 2 keeps consolidated metadata within the spec
+        encoding["compressors"] = (codec,) if codec is not None else None
+        options["zarr_format"] = 2
+    else:
+        encoding["compressor"] = codec
+    ds.to_zarr(store, mode="w" if mode == "w" else "w-", consolidated=consolidated,
+               encoding={name: encoding}, **options)
+    return ds.sizes.get("time", 1)
@@ -0,0 +1,192 @@
+"""
+Band-math expressions compiled into one blockwise kernel.
+
+`Image.expression` parses the formula once with `ast`, resolves its
+variables to arrays and applies the whole formula per chunk with a single
+`xarray.apply_ufunc`, so an index like EVI adds one graph layer instead of
+one per operator and its temporaries only ever live at chunk size.
+"""
+import ast
+import operator
+
+import numpy as np
+import xarray as xr
+
+_BINARY = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.Mod: operator.mod,
+}
+_UNARY = {ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Not: np.logical_not}
+_COMPARE = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+_FUNCTIONS = {
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "exp": np.exp,
+    "log": np.log,
+    "log10": np.log10,
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    "arctan2": np.arctan2,
+    "where": np.where,
+    "min": np.fmin,
+    "max": np.fmax,
+}
+
+
+class Expression:
+    """
+    A parsed band-math formula. Variables are names bound by the caller;
+    `b('name')` or `b(0)` refers to a band of the image the expression is
+    evaluated on. Conditionals use Python syntax: `a if cond else b`.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        try:
+            self._tree = ast.parse(source.strip(), mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"Invalid expression '{source}': {e.msg}") from None
+        self.names = []
+        self._check(self._tree.body)
+
+    def _check(self, node):
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+            self._check(node.left)
+            self._check(node.right)
+        elif isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY:
+            self._check(node.operand)
+        elif isinstance(node, ast.Compare) and all(type(op) in _COMPARE for op in node.ops):
+            for child in [node.left] + node.comparators:
+                self._check(child)
+        elif isinstance(node, ast.BoolOp):
+            for child in node.values:
+                self._check(child)
+        elif isinstance(node, ast.IfExp):
+            for child in (node.test, node.body, node.orelse):
+                self._check(child)
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if node.func.id == "b":
+                if len(node.args) != 1 or not isinstance(node.args[0], ast.Constant):
+                    raise ValueError("b() takes a single band name or index.")
+                self._add_name(("b", node.args[0].value))
+            elif node.func.id in _FUNCTIONS and not node.keywords:
+                for child in node.args:
+                    self._check(child)
+            else:
+                raise ValueError(f"Unsupported function '{node.func.id}' in expression.")
+        elif isinstance(node, ast.Name):
+            self._add_name(node.id)
+        elif isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            pass
+        else:
+            raise ValueError(f"Unsupported syntax in expression: {ast.unparse(node)}")
+
+    def _add_name(self, name):
+        if name not in self.names:
+            self.names.append(name)
+
+    def kernel(self):
+        """Returns a function evaluating the formula on NumPy arrays given in `names` order."""
+        names, body = self.names, self._tree.body
+
+        def _eval(node, env):
+            if isinstance(node, ast.BinOp):
+                return _BINARY[type(node.op)](_eval(node.left, env), _eval(node.right, env))
+            if isinstance(node, ast.UnaryOp):
+                return _UNARY[type(node.op)](_eval(node.operand, env))
+            if isinstance(node, ast.Compare):
+                left, result = _eval(node.left, env), True
+                for op, right in zip(node.ops, node.comparators):
+                    right = _eval(right, env)
+                    result = np.logical_and(result, _COMPARE[type(op)](left, right))
+                    left = right
+                return result
+            if isinstance(node, ast.BoolOp):
+                combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+                result = _eval(node.values[0], env)
+                for value in node.values[1:]:
+                    result = combine(result, _eval(value, env))
+                return result
+            if isinstance(node, ast.IfExp):
+                return np.where(_eval(node.test, env), _eval(node.body, env), _eval(node.orelse, env))
+            if isinstance(node, ast.Call):
+                if node.func.id == "b":
+                    return env[("b", node.args[0].value)]
+                return _FUNCTIONS[node.func.id](*[_eval(a, env) for a in node.args])
+            if isinstance(node, ast.Name):
+                return env[node.id]
+            return node.value
+
+        def _kernel(*arrays):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return _eval(body, dict(zip(names, arrays)))
+        return _kernel
+
+
+def _squeeze_band(da):
+    for dim in ("band", "bands"):
+        if dim in da.dims and da.sizes[dim] == 1:
+            # Drop the band label and per-band metadata so operands align
+            da = da.squeeze(dim, drop=True)
+            da = da.drop_vars([c for c in da.coords if c not in da.dims and c != "spatial_ref" and da[c].ndim == 0])
+    return da
+
+
+def evaluate(expression, variables, dtype=None):
+    """
+    Evaluates `expression` (an Expression) with `variables` mapping each of
+    its names to a DataArray or number. Single-band operands lose their band
+    dimension, like Image arithmetic. Integer operands are computed in the
+    configured float dtype; an explicit `dtype` also sets the output type.
+    Returns a lazy DataArray.
+    """
+    from .config import compute_dtype
+
+    values = {n: variables[n] for n in expression.names}
+    target = compute_dtype(*[v.dtype for v in values.values() if isinstance(v, xr.DataArray)], dtype=dtype)
+    arrays, constants = [], {}
+    for name, value in values.items():
+        if isinstance(value, xr.DataArray):
+            if value.dtype.kind in "iub":
+                value = value.astype(target)
+            arrays.append((name, _squeeze_band(value)))
+        elif isinstance(value, np.floating):
+            # NumPy float scalars would promote float32 arrays to float64
+            constants[name] = float(value)
+        else:
+            constants[name] = value
+
+    kernel = expression.kernel()
+    order = [name for name, _ in arrays]
+    names = expression.names
+
+    def _apply(*values):
+        env = dict(zip(order, values), **constants)
+        return kernel(*[env[n] for n in names])
+
+    if not arrays:
+        return xr.DataArray(_apply())
+
+    # Infer the output dtype from a one-element evaluation
+    sample = _apply(*[np.ones(1, dtype=da.dtype) for _, da in arrays])
+    result = xr.apply_ufunc(
+        _apply, *[da for _, da in arrays],
+        dask="parallelized",
+        output_dtypes=[np.asarray(sample).dtype],
+        keep_attrs=True,
+    )
+    if dtype is not None:
+        result = result.astype(dtype)
+    return result
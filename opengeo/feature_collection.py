@@ -1,4 +1,5 @@
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 from .feature import Feature
 from .geometry import Geometry
@@ -34,11 +35,65 @@ class FeatureCollection:
             else:
                  raise ValueError(f"Cannot interpret FeatureCollection source: {arg}")
             
+    def _geometries(self, other):
+        """
+        Geometries of `other` (og.Geometry, Feature, FeatureCollection,
+        GeoDataFrame/GeoSeries or shapely geometry) in this collection's CRS.
+        og.Geometry and GeoDataFrames are reprojected from their own CRS;
+        plain shapely geometries are taken to be in this collection's CRS.
+        """
+        crs = None
+        if isinstance(other, FeatureCollection):
+            other = other._gdf
+        elif isinstance(other, Feature):
+            other = other.geometry()
+        if isinstance(other, Geometry):
+            crs, geoms = other.crs, gpd.GeoSeries([other.shapely])
+        elif isinstance(other, (gpd.GeoDataFrame, gpd.GeoSeries)):
+            crs, geoms = other.crs, gpd.GeoSeries(other.geometry if isinstance(other, gpd.GeoDataFrame) else other)
+        else:
+            geoms = gpd.GeoSeries([other])
+        if crs is not None and self._gdf.crs is not None:
+            geoms = geoms.set_crs(crs, allow_override=True).to_crs(self._gdf.crs)
+        return geoms.values
+
     def filterBounds(self, geometry):
-        if hasattr(geometry, 'shapely'):
-             geometry = geometry.shapely
-        filtered = self._gdf[self._gdf.intersects(geometry)]
-        return FeatureCollection(filtered)
+        """
+        Features intersecting `geometry`. Candidates come from the spatial
+        index and only those are tested exactly.
+        """
+        geoms = self._geometries(geometry)
+        index = self._gdf.sindex.query(geoms[0] if len(geoms) == 1 else geoms, predicate='intersects')
+        if index.ndim == 2:
+            index = np.unique(index[1])
+        return FeatureCollection(self._gdf.iloc[np.sort(index)])
+
+    def filterIntersecting(self, other):
+        """
+        Features intersecting any feature of `other` (a FeatureCollection,
+        GeoDataFrame or geometry), from one bulk spatial-index query.
+        """
+        return self.filterBounds(other)
+
+    def spatialJoin(self, other, predicate='intersects', how='inner', **kwargs):
+        """
+        Joins the properties of `other` onto the features they match under
+        `predicate` ('intersects', 'contains', 'within', 'touches', 'crosses',
+        'overlaps', 'covers', 'covered_by' or 'dwithin' with `distance=`).
+        A feature matching several others appears once per match, with the
+        matched row in 'index_right'. Matches come from a bulk STRtree query.
+
+        Args:
+            other: FeatureCollection or GeoDataFrame, reprojected to this
+                collection's CRS if needed.
+            predicate: Spatial predicate.
+            how: 'inner' (matched features only), 'left' or 'right'.
+            **kwargs: Passed to geopandas.sjoin (lsuffix, rsuffix, distance).
+        """
+        right = other._gdf if isinstance(other, FeatureCollection) else other
+        if right.crs is not None and self._gdf.crs is not None and right.crs != self._gdf.crs:
+            right = right.to_crs(self._gdf.crs)
+        return FeatureCollection(gpd.sjoin(self._gdf, right, how=how, predicate=predicate, **kwargs))
 
     def filter(self, expr_or_filter):
         if isinstance(expr_or_filter, str):
@@ -56,17 +111,51 @@ class FeatureCollection:
         cols = [c for c in cols if c in self._gdf.columns]
         return FeatureCollection(self._gdf[cols])
         
-    def map(self, func):
-        new_features = []
-        for i, row in self._gdf.iterrows():
-            geom = Geometry(row.geometry)
-            props = row.drop('geometry').to_dict()
-            feat = Feature(geom, props, id=i)
-            res = func(feat)
-            if isinstance(res, Feature):
-                 new_features.append(res)
-        
-        return FeatureCollection(new_features)
+    def map(self, func, batched=False, batch_size=None, parallel=False, workers=None):
+        """
+        Applies `func` to every feature and collects the returned Features
+        (None results are dropped, as with GEE's dropNulls).
+
+        Args:
+            func: Function of an og.Feature returning an og.Feature or None.
+                With `batched=True` it receives a GeoDataFrame partition
+                instead and returns a GeoDataFrame (or FeatureCollection), so
+                it can work on whole columns at once.
+            batched: Pass partitions of `batch_size` rows instead of features.
+            batch_size: Rows per partition; by default the whole collection
+                (or 4 partitions per worker when parallel).
+            parallel: False, 'threads', 'processes' (or True) for a local
+                pool, or 'dask' to run partitions as dask tasks on the active
+                scheduler (e.g. a distributed cluster). Processes and dask
+                clusters need a picklable `func` (no lambdas).
+            workers: Pool size; defaults to the CPU count.
+        """
+        import functools
+        import os
+
+        gdf = self._gdf
+        if parallel and not batch_size:
+            batch_size = max(-(-len(gdf) // (4 * (workers or os.cpu_count() or 1))), 1)
+        batch_size = batch_size or max(len(gdf), 1)
+        parts = [gdf.iloc[i:i + batch_size] for i in range(0, len(gdf), batch_size)] or [gdf]
+
+        apply = functools.partial(_map_batch if batched else _map_features, func=func)
+        if not parallel:
+            results = [apply(part) for part in parts]
+        elif parallel == 'dask':
+            import dask
+            results = dask.compute(*[dask.delayed(apply)(part) for part in parts])
+        else:
+            from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+            executor = ThreadPoolExecutor if parallel == 'threads' else ProcessPoolExecutor
+            with executor(max_workers=workers) as pool:
+                results = list(pool.map(apply, parts))
+
+        results = [r for r in results if r is not None]
+        if not results:
+            return FeatureCollection(gpd.GeoDataFrame(columns=['geometry'], geometry='geometry', crs=gdf.crs))
+        merged = pd.concat(results) if len(results) > 1 else results[0]
+        return FeatureCollection(gpd.GeoDataFrame(merged, geometry=merged.geometry.name, crs=merged.crs or gdf.crs))
 
     def size(self):
         return len(self._gdf)
@@ -86,3 +175,25 @@ class FeatureCollection:
 
     def __repr__(self):
         return f"og.FeatureCollection({len(self._gdf)} elements)"
+
+
+def _map_features(gdf, func):
+    """Per-feature map over a partition, reading columns once instead of row Series."""
+    crs = gdf.crs.to_string() if gdf.crs is not None else "EPSG:4326"
+    props = gdf.drop(columns=gdf.geometry.name).to_dict('records')
+    ids, geoms, rows = [], [], []
+    for id_, geom, prop in zip(gdf.index, gdf.geometry.values, props):
+        result = func(Feature(Geometry(geom, crs), prop, id=id_))
+        if isinstance(result, Feature):
+            geom = result.geometry()
+            ids.append(id_ if result._id is None else result._id)
+            geoms.append(geom.shapely if isinstance(geom, Geometry) else geom)
+            rows.append(result._properties)
+    return gpd.GeoDataFrame(pd.DataFrame(rows, index=ids), geometry=geoms, crs=gdf.crs)
+
+
+def _map_batch(gdf, func):
+    result = func(gdf)
+    if isinstance(result, FeatureCollection):
+        result = result._gdf
+    return result
@@ -0,0 +1,260 @@
+"""
+One ImageCollection over several STAC catalogs.
+
+The same filters are searched on every catalog concurrently, each through a
+regular ImageCollection so searches are cached per provider.
+Asset keys are normalized to common band names, scenes published by several
+providers are deduplicated by platform, tile and acquisition time, and each
+scene is read from the preferred provider: by default the one whose asset
+host answered fastest. A catalog that fails or times out is dropped from the
+query and the others cover for it.
+"""
+import copy
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from pystac import ItemCollection
+
+from .config import resolve_url
+from .image_collection import ImageCollection
+from .search import sort_item_dicts
+
+# Seconds a catalog that timed out or failed is left out of later queries
+RETRY_AFTER = 300
+
+_HOST_LATENCY = {}
+_UNAVAILABLE = {}
+# Newest first, the order mosaic() layers scenes in
+_DEFAULT_SORT = [{"field": "properties.datetime", "direction": "desc"}]
+
+
+def _common_name(asset):
+    fields = asset.extra_fields
+    bands = fields.get("eo:bands") or fields.get("bands")
+    if bands and len(bands) == 1:
+        return bands[0].get("common_name") or bands[0].get("eo:common_name")
+    return None
+
+
+def normalize_assets(item, aliases=None):
+    """
+    Renames the assets of a pystac Item in place to their common band names
+    (e.g. 'B04' -> 'red') where that name is free, after applying explicit
+    `aliases` ({provider key: name}).
+    """
+    assets = item.assets
+    for key, name in (aliases or {}).items():
+        if key in assets and name not in assets:
+            assets[name] = assets.pop(key)
+    # Cloud-optimized GeoTIFFs get the common name before e.g. JP2 copies
+    for key in sorted(assets, key=lambda k: "geotiff" not in (assets[k].media_type or "")):
+        name = _common_name(assets[key])
+        if name and name != key and name not in assets:
+            assets[name] = assets.pop(key)
+    return item
+
+
+def _tile(properties, bbox):
+    if "s2:mgrs_tile" in properties:
+        return "MGRS-" + properties["s2:mgrs_tile"].lstrip("T")
+    if "mgrs:utm_zone" in properties:
+        # Zero-padded zone, as in s2:mgrs_tile ('05VNK', not '5VNK')
+        return (f"MGRS-{int(properties['mgrs:utm_zone']):02d}"
+                f"{properties.get('mgrs:latitude_band', '')}{properties.get('mgrs:grid_square', '')}")
+    if "landsat:wrs_path" in properties:
+        return f"WRS2-{int(properties['landsat:wrs_path']):03d}{int(properties['landsat:wrs_row']):03d}"
+    if "grid:code" in properties:
+        return properties["grid:code"]
+    # No tiling metadata: the footprint stands in for the tile
+    return tuple(round(v, 2) for v in bbox) if bbox else None
+
+
+def scene_key(item):
+    """(platform, tile, acquisition second) identifying a scene across catalogs."""
+    properties = item.properties
+    when = item.datetime or datetime.fromisoformat(properties["start_datetime"].replace("Z", "+00:00"))
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    platform = str(properties.get("platform", item.collection_id or "")).lower()
+    return platform, _tile(properties, item.bbox), when.astimezone(timezone.utc).replace(microsecond=0).isoformat()
+
+
+def _band_href(items, bands=None):
+    """Href of a band the collection reads, rather than a thumbnail or metadata asset."""
+    for item in items:
+        assets = item.assets
+        if bands:
+            keys = [b for b in bands if b in assets]
+        else:
+            keys = [k for k in assets if "data" in (assets[k].roles or [])] or \
+                   [k for k in assets if "image/tiff" in (assets[k].media_type or "")]
+        if keys:
+            return assets[keys[0]].href
+    return None
+
+
+def host_latency(href, timeout=5):
+    """Seconds for a HEAD request to the host serving `href`, measured once per host."""
+    import requests
+
+    parsed = urlparse(href)
+    host = f"{parsed.scheme}://{parsed.netloc}"
+    if host not in _HOST_LATENCY:
+        start = time.perf_counter()
+        try:
+            # Any answer, even 403 for an unsigned href, measures the round trip
+            requests.head(href, timeout=timeout, allow_redirects=False)
+            _HOST_LATENCY[host] = time.perf_counter() - start
+        except Exception:
+            _HOST_LATENCY[host] = float("inf")
+    return _HOST_LATENCY[host]
+
+
+class FederatedImageCollection(ImageCollection):
+    """
+    An ImageCollection searching several STAC catalogs at once.
+
+    Without an explicit sort, merged scenes are ordered newest first, as
+    mosaic() layers them, so limit(n) and first() return the latest scenes.
+
+    Args:
+        collection_id: Collection ID used on every catalog, or a dict
+            {catalog alias or URL: collection ID} when providers name it
+            differently (e.g. {'ELEMENT84': 'landsat-c2-l2',
+            'USGS': 'landsat-c2l2-sr'}).
+        catalogs: Aliases or URLs to search when `collection_id` is a
+            string. Defaults to every catalog og.ProbeCatalogs finds serving
+            the collection.
+        filters: Initial STAC search parameters.
+        bands: Assets to load, by common band name.
+        parallel_search: Concurrent sub-queries per catalog.
+        prefer: 'fastest' to read duplicated scenes from the provider whose
+            asset host answers fastest, or 'order' for the order catalogs
+            are given in.
+        timeout: Seconds to wait for a catalog before leaving it out.
+        asset_aliases: Optional {catalog: {asset key: band name}} renames
+            applied before the common-name normalization.
+    """
+
+    def __init__(self, collection_id, catalogs=None, filters=None, bands=None, parallel_search=None,
+                 prefer="fastest", timeout=30, asset_aliases=None):
+        if isinstance(collection_id, dict):
+            sources = {resolve_url(c): cid for c, cid in collection_id.items()}
+            name = "+".join(dict.fromkeys(collection_id.values()))
+        else:
+            if catalogs is None:
+                from .probe import ProbeCatalogs
+                catalogs = [r["url"] for r in ProbeCatalogs(collection=collection_id)
+                            if r["ok"] and r["search"] and r["collection"]]
+                if not catalogs:
+                    raise ConnectionError(f"No reachable catalog serves '{collection_id}'.")
+            sources = {resolve_url(c): collection_id for c in catalogs}
+            name = collection_id
+        if prefer not in ("fastest", "order"):
+            raise ValueError("prefer must be 'fastest' or 'order'.")
+
+        super().__init__(name, api_url="federated:" + ",".join(f"{u}#{c}" for u, c in sources.items()),
+                         filters=filters, bands=bands, parallel_search=parallel_search)
+        self._sources = sources
+        self._prefer = prefer
+        self._timeout = timeout
+        self._aliases = {resolve_url(c): a for c, a in (asset_aliases or {}).items()}
+
+    def _clone(self):
+        new_col = copy.copy(self)
+        new_col._filters = copy.deepcopy(self._filters)
+        new_col._bands = copy.deepcopy(self._bands)
+        return new_col
+
+    def _child(self, url):
+        filters = copy.deepcopy(self._filters)
+        filters["collections"] = [self._sources[url]]
+        if filters.get("max_items") and not filters.get("sortby"):
+            # Each catalog must return the same (latest) scenes the merge keeps
+            filters["sortby"] = _DEFAULT_SORT
+        return ImageCollection(self._sources[url], api_url=url, filters=filters, parallel_search=self._parallel)
+
+    def refresh(self):
+        for url in self._sources:
+            self._child(url).refresh()
+            _UNAVAILABLE.pop(url, None)
+        self._items = None
+        self._items_key = None
+        return self
+
+    def _query_all(self, urls):
+        """Searches `urls` concurrently; returns {url: items} for those answering within the timeout."""
+        outcomes = {}
+
+        def _run(url):
+            try:
+                outcomes[url] = self._child(url)._search()
+            except Exception as e:
+                outcomes[url] = e
+
+        # Daemon threads: a catalog that never answers must not hold up the
+        # others, nor the interpreter at exit
+        threads = [threading.Thread(target=_run, args=(url,), daemon=True) for url in urls]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + self._timeout
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+        results = {}
+        for url in urls:
+            outcome = outcomes.get(url)
+            if outcome is None:
+                _UNAVAILABLE[url] = time.monotonic()
+                print(f"Warning: catalog {url} timed out after {self._timeout} s, using the other catalogs.")
+            elif isinstance(outcome, Exception):
+                _UNAVAILABLE[url] = time.monotonic()
+                print(f"Warning: catalog {url} failed ({outcome}), using the other catalogs.")
+            else:
+                _UNAVAILABLE.pop(url, None)
+                results[url] = [normalize_assets(item, self._aliases.get(url)) for item in outcome]
+        return results
+
+    def _fetch_items(self):
+        urls = list(self._sources)
+        # Catalogs that just failed are skipped for a while instead of
+        # costing every query the full timeout
+        available = [url for url in urls if time.monotonic() - _UNAVAILABLE.get(url, float("-inf")) >= RETRY_AFTER]
+        results = self._query_all(available or urls)
+        if not results:
+            raise ConnectionError("None of the federated catalogs answered.")
+
+        ranked = [url for url in urls if url in results]
+        if self._prefer == "fastest":
+            hrefs = {url: _band_href(items, self._bands) for url, items in results.items()}
+            latency = {url: host_latency(href) if href else float("inf") for url, href in hrefs.items()}
+            ranked.sort(key=lambda url: latency[url])
+
+        scenes = {}
+        for url in ranked:
+            for item in results[url]:
+                scenes.setdefault(scene_key(item), item)
+        return ItemCollection(self._ordered(list(scenes.values())))
+
+    def _ordered(self, items):
+        """Applies the collection's sort and limit to the merged items (newest first by default)."""
+        params = self._search_params()
+        sortby = params.get("sortby") or _DEFAULT_SORT
+        dicts = [{"id": i.id, "collection": i.collection_id, "properties": i.properties} for i in items]
+        by_dict = {id(d): item for d, item in zip(dicts, items)}
+        items = [by_dict[id(d)] for d in sort_item_dicts(dicts, sortby)]
+        if "max_items" in params:
+            items = items[:params["max_items"]]
+        return items
+
+    def _iter_items(self):
+        yield from self._search()
+
+    def size(self):
+        # Duplicates are only known once every catalog has answered
+        return len(self._search())
+
+    def __repr__(self):
+        return f"og.FederatedImageCollection('{self._id}', catalogs={list(self._sources)})"
@@ -1,13 +1,21 @@
+import math
 import xarray as xr
 import rioxarray
 import numpy as np
 import stackstac
+from affine import Affine
 from .geometry import Geometry
+from .config import compute_dtype
+from .streaming import grid_transform
+from .reducer import Reducer, band_stat_names
 
 class Image:
     """Wrapper for xarray.DataArray to mimic ee.Image."""
 
     def __init__(self, data):
+        # Optional callable (resolution, chunksize) -> Image that rebuilds this
+        # image on a coarser grid, reading COG overviews instead of full pixels.
+        self._source = None
         if isinstance(data, xr.DataArray):
             self._da = data
         elif isinstance(data, (int, float)):
@@ -18,6 +26,7 @@ class Image:
              # Load from URL/Path?
              # For simplicity, use rioxarray open_rasterio
              self._da = rioxarray.open_rasterio(data, chunks="auto") 
+             self._source = lambda resolution, chunksize=None: Image._open_at_scale(data, resolution, chunksize)
         else:
              print(f"Warning: Image constructor received unknown type: {type(data)}")
              self._da = xr.DataArray(data)
@@ -26,13 +35,100 @@ class Image:
     def _data(self):
         return self._da
 
+    @staticmethod
+    def _open_at_scale(path, resolution, chunksize=None):
+        """Opens `path` from the coarsest overview level that is still finer than `resolution`."""
+        import rasterio
+        with rasterio.open(path) as src:
+            native = abs(src.res[0])
+            factors = src.overviews(1)
+        level = None
+        for i, factor in enumerate(factors):
+            if native * factor <= resolution:
+                level = i
+        chunks = {"x": chunksize, "y": chunksize} if chunksize else "auto"
+        da = rioxarray.open_rasterio(path, chunks=chunks, overview_level=level)
+        image = Image(da)._coarsen_to(resolution)
+        image._source = lambda res, cs=None: Image._open_at_scale(path, res, cs)
+        return image
+
+    def _resolution(self):
+        """Pixel size in CRS units, or None for images without a grid."""
+        if 'x' not in self._da.dims or 'y' not in self._da.dims:
+            return None
+        try:
+            return abs(self._da.rio.resolution()[0])
+        except Exception:
+            return None
+
+    def _scale_to_crs_units(self, scale):
+        # scale is in meters, as in Earth Engine
+        crs = self._da.rio.crs
+        if crs is not None and crs.is_geographic:
+            return scale / 111320.0
+        return scale
+
+    def _coarsen_to(self, resolution):
+        """Lazily block-averages the image to approximately `resolution`."""
+        native = self._resolution()
+        factor = int(resolution / native) if native else 1
+        if factor < 2:
+            return self
+        transform = grid_transform(self._da) * Affine.scale(factor)
+        da = self._da.coarsen(x=factor, y=factor, boundary='trim').mean(keep_attrs=True)
+        # Coordinates moved, so any stored geotransform is stale
+        for attr in ('transform', 'resolution', 'spec'):
+            da.attrs.pop(attr, None)
+        da = da.rio.write_transform(transform)
+        return Image(da)
+
+    def _at_scale(self, resolution, tileScale=1):
+        """
+        Returns this image on a grid of `resolution` CRS units. Images that know
+        their source are rebuilt from COG overviews; others are coarsened lazily.
+        `tileScale` divides the spatial chunk size.
+        """
+        chunksize = None
+        if tileScale > 1 and hasattr(self._da.data, 'chunks') and self._da.chunks:
+            ydim = self._da.dims.index('y')
+            chunksize = max(int(self._da.chunks[ydim][0] // tileScale), 1)
+
+        if self._source is not None:
+            return self._source(resolution, chunksize)
+
+        image = self._coarsen_to(resolution)
+        if chunksize:
+            image = Image(image._da.chunk({'x': chunksize, 'y': chunksize}))
+        return image
+
+    def _for_scale(self, scale=None, tileScale=1):
+        """This image at `scale` meters, or unchanged if that is not coarser than native."""
+        native = self._resolution()
+        if not native:
+            return self
+        resolution = max(self._scale_to_crs_units(scale), native) if scale else native
+        if resolution > native * 1.0001 or tileScale > 1:
+            return self._at_scale(resolution, tileScale)
+        return self
+
+    def _pixel_count(self):
+        return int(np.prod([self._da.sizes[d] for d in ('x', 'y') if d in self._da.dims]))
+
+    def _derive(self, da, op):
+        """Wraps `da` as an Image whose source is `op` applied to this image's source."""
+        image = Image(da)
+        if self._source is not None:
+            source = self._source
+            image._source = lambda resolution, chunksize=None: op(source(resolution, chunksize))
+        return image
+
     def select(self, bands):
         if isinstance(bands, str): bands = [bands]
         # Assuming band dimension exists
         if 'band' in self._da.dims:
-            return Image(self._da.sel(band=bands))
+            return self._derive(self._da.sel(band=bands), lambda img: img.select(bands))
         if 'bands' in self._da.dims:
-             return Image(self._da.sel(bands=bands))
+             return self._derive(self._da.sel(bands=bands), lambda img: img.select(bands))
              
         # If no band dim but variables in Dataset? We handle DataArray primarily.
         return self
@@ -49,22 +145,34 @@ class Image:
         return self 
 
     def clip(self, geometry):
+        """
+        Lazily clips the image to a geometry, keeping every pixel it touches.
+
+        The geometry is reprojected from its CRS (EPSG:4326 for plain shapely
+        geometries) to the image CRS, the image is cut to the geometry's
+        bounding window and only chunks crossing the boundary are masked.
+
+        Raises:
+            ValueError: If the geometry does not overlap the image.
+        """
+        from .masking import clip_to_geometry
+
+        crs = "EPSG:4326"
         if isinstance(geometry, Geometry):
+             crs = geometry.crs
              geometry = geometry.shapely
-        # User rioxarray clip
+        elif isinstance(geometry, dict):
+             from shapely.geometry import shape
+             geometry = shape(geometry)
         # Ensure CRS is set
         if self._da.rio.crs is None:
              # If constant image, clip doesn't make sense unless we conform to geometry grid
-             # Just return self? Or mask?
              print("Warning: Image has no CRS, skipping clip.")
              return self
-             
-        try:
-             clipped = self._da.rio.clip([geometry], all_touched=True, drop=True)
-             return Image(clipped)
-        except Exception as e:
-             print(f"Clip failed: {e}")
-             return self
+
+        import geopandas as gpd
+        geometry = gpd.GeoSeries([geometry], crs=crs).to_crs(self._da.rio.crs).iloc[0]
+        return Image(clip_to_geometry(self._da, geometry))
 
     def mask(self):
         # In GEE returns the mask
@@ -74,6 +182,14 @@ class Image:
         if isinstance(mask, Image): mask = mask._data
         return Image(self._da.where(mask))
 
+    def toFloat(self):
+        """Casts the image to 32-bit float."""
+        return self._derive(self._da.astype(np.float32), lambda img: img.toFloat())
+
+    def toDouble(self):
+        """Casts the image to 64-bit float."""
+        return self._derive(self._da.astype(np.float64), lambda img: img.toDouble())
+
     def add(self, other):
         return self + other
     def subtract(self, other):
@@ -86,6 +202,17 @@ class Image:
     def _prepare_for_math(self, other):
         val = other._data if isinstance(other, Image) else other
         self_da = self._da
+        if isinstance(val, np.floating):
+            # NumPy float scalars would promote float32 arrays to float64
+            val = float(val)
+
+        # Integer images are computed in the configured float dtype
+        dtypes = [a.dtype for a in (self_da, val) if isinstance(a, xr.DataArray)]
+        target = compute_dtype(*dtypes)
+        if self_da.dtype.kind in 'iub':
+            self_da = self_da.astype(target)
+        if isinstance(val, xr.DataArray) and val.dtype.kind in 'iub':
+            val = val.astype(target)
         
         if isinstance(val, xr.DataArray):
             # If both have single band but different names, squeeze to allow math
@@ -118,15 +245,50 @@ class Image:
              da['band'] = names
         elif 'bands' in da.dims:
              da['bands'] = names
-        return Image(da)
+        return self._derive(da, lambda img: img.rename(names))
         
     def reduceRegion(self, reducer='mean', geometry=None, scale=None, bestEffort=False, maxPixels=1e9, tileScale=1):
         """
         Execute reduction over region using Dask for efficiency.
+
+        Args:
+            reducer: og.Reducer, statistic name ('mean', 'max', 'min', 'sum',
+                'count', 'median', 'stdDev', 'variance', 'p90') or list of names.
+                Multiple statistics are computed in one pass and keyed
+                'band_stat'.
+            geometry: Region to reduce over; defaults to the whole image.
+            scale: Nominal pixel size in meters. Coarser scales read COG
+                overviews where the image source allows, otherwise the image
+                is block-averaged lazily.
+            bestEffort: If the region has more than maxPixels pixels at
+                `scale`, use a larger scale that fits instead of failing.
+            maxPixels: Maximum number of pixels to reduce, checked before
+                anything is computed.
+            tileScale: Factor by which to shrink chunks, trading memory for
+                more parallel tasks.
         """
         target = self
         if geometry:
             target = target.clip(geometry)
+
+        native = self._resolution()
+        if native:
+            resolution = max(self._scale_to_crs_units(scale), native) if scale else native
+            pixels = target._pixel_count() * (native / resolution) ** 2
+            if pixels > maxPixels:
+                if not bestEffort:
+                    raise ValueError(
+                        f"Too many pixels in the region. Found {int(pixels)}, but maxPixels allows only {int(maxPixels)}."
+                    )
+                resolution = native * math.ceil(resolution * math.sqrt(pixels / maxPixels) / native)
+            if resolution > native * 1.0001 or tileScale > 1:
+                target = self._at_scale(resolution, tileScale)
+                if geometry:
+                    target = target.clip(geometry)
+        elif target._pixel_count() > maxPixels and not bestEffort:
+            raise ValueError(
+                f"Too many pixels in the region. Found {target._pixel_count()}, but maxPixels allows only {int(maxPixels)}."
+            )
         
         da = target._da
         
@@ -139,55 +301,192 @@ class Image:
             # Nothing to reduce spatially?
             return {"constant": float(da.compute()) if hasattr(da, 'compute') else float(da)}
 
-        # Define reduction mapping
-        reducers = {
-            'mean': xr.DataArray.mean,
-            'max': xr.DataArray.max,
-            'min': xr.DataArray.min,
-            'sum': xr.DataArray.sum,
-            'count': xr.DataArray.count,
-            'median': xr.DataArray.median
-        }
-        
-        if reducer not in reducers:
-            raise ValueError(f"Unsupported reducer: {reducer}")
-            
-        # Apply lazy reduction
-        reduced = reducers[reducer](da, dim=spatial_dims, keep_attrs=True)
-        
-        # Trigger single computation for all bands
-        results = reduced.compute()
+        reducer = Reducer._from(reducer)
+        stats = reducer.getOutputs()
+
+        # Evaluate every statistic in one computation, sharing the reads
+        results = reducer._compute(da, spatial_dims)
         
         dict_res = {}
         
         # Handle band dimension if it exists
         band_dim = None
-        if 'band' in results.dims: band_dim = 'band'
-        elif 'bands' in results.dims: band_dim = 'bands'
+        if 'band' in da.dims: band_dim = 'band'
+        elif 'bands' in da.dims: band_dim = 'bands'
         
         if band_dim:
-            for b in results[band_dim].values:
-                val = results.sel({band_dim: b}).item()
-                dict_res[str(b)] = val
+            bands = da[band_dim].values.tolist()
+            names = band_stat_names(bands, stats)
+            for b in bands:
+                for stat in stats:
+                    dict_res[names[(b, stat)]] = results[stat].sel({band_dim: b}).item()
+        elif len(stats) == 1:
+            dict_res['constant'] = results[stats[0]].item()
         else:
-            dict_res['constant'] = results.item()
+            for stat in stats:
+                dict_res[stat] = results[stat].item()
              
         return dict_res
 
-    def normalizedDifference(self, bands):
+    def reduceRegions(self, collection, reducer='mean', scale=None, tileScale=1):
+        """
+        Applies a reducer over every feature of a FeatureCollection.
+
+        Zones are rasterized onto the image grid chunk by chunk and all
+        statistics for all features are grouped in a single pass over the
+        image, so the cost does not grow with the number of features.
+        A pixel belongs to a feature if its center falls inside it.
+
+        Args:
+            collection: og.FeatureCollection (or GeoDataFrame) of zones.
+                Features without a CRS are taken as EPSG:4326.
+            reducer: og.Reducer, statistic name or list of names. Supports
+                'mean', 'sum', 'count', 'min', 'max', 'stdDev', 'variance',
+                'median' and percentiles such as 'p90'; these are approximated
+                from per-zone histograms refined over two extra reads.
+            scale: Nominal pixel size in meters, as in reduceRegion.
+            tileScale: Factor by which to shrink chunks.
+
+        Returns:
+            og.FeatureCollection with one column per band (single statistic)
+            or per 'band_stat'.
+        """
+        from .feature_collection import FeatureCollection
+        from .zonal import zonal_stats
+
+        gdf = collection._gdf if isinstance(collection, FeatureCollection) else collection
+        if self._da.rio.crs is None:
+            raise ValueError("reduceRegions requires an image with a CRS.")
+
+        da = self._for_scale(scale, tileScale)._da
+        band_dim = 'band' if 'band' in da.dims else 'bands' if 'bands' in da.dims else None
+        if band_dim is None:
+            da = da.expand_dims(band=['constant'])
+            band_dim = 'band'
+        extra = [d for d in da.dims if d not in (band_dim, 'y', 'x')]
+        if extra:
+            raise ValueError(f"reduceRegions expects a single image, found extra dimensions {extra}.")
+        da = da.transpose(band_dim, 'y', 'x')
+
+        zones = gdf.geometry
+        if zones.crs is None:
+            zones = zones.set_crs("EPSG:4326")
+        zones = zones.to_crs(da.rio.crs).reset_index(drop=True)
+
+        reducer = Reducer._from(reducer)
+        stats = reducer.getOutputs()
+        results = zonal_stats(da, zones, stats)
+
+        bands = da[band_dim].values.tolist()
+        names = band_stat_names(bands, stats)
+        out = gdf.copy()
+        for i, b in enumerate(bands):
+            for stat in stats:
+                out[names[(b, stat)]] = results[stat][i]
+        return FeatureCollection(out)
+
+    def sample(self, points, scale=None, properties=None, tileScale=1):
+        """
+        Samples the pixel values under each point.
+
+        Points are reprojected once and looked up with vectorized indexing,
+        so each chunk holding a point is read once.
+
+        Args:
+            points: og.FeatureCollection, GeoDataFrame or list of og.Geometry
+                points (non-point features are sampled at an interior point).
+            scale: Nominal pixel size in meters, as in reduceRegion.
+            properties: Feature properties to keep; all by default.
+            tileScale: Factor by which to shrink chunks.
+
+        Returns:
+            geopandas.GeoDataFrame with one column per band; points outside
+            the image get NaN.
+        """
+        from .sampling import points_frame, sample_points
+
+        gdf = points_frame(points)
+        da = self._for_scale(scale, tileScale)._da
+        band_dim = 'band' if 'band' in da.dims else 'bands' if 'bands' in da.dims else None
+        if band_dim is None:
+            da = da.expand_dims(band=['constant'])
+            band_dim = 'band'
+        values = sample_points(da, gdf).transpose('point', band_dim).compute()
+
+        if properties is not None:
+            gdf = gdf[[c for c in properties if c in gdf.columns] + [gdf.geometry.name]]
+        out = gdf.copy()
+        for i, b in enumerate(values[band_dim].values.tolist()):
+            out[str(b)] = values.values[:, i]
+        return out
+
+    def expression(self, expression, map=None, dtype=None):
+        """
+        Evaluates a band-math formula as one fused per-chunk operation.
+
+        Example: `image.expression("2.5 * (NIR - RED) / (NIR + 6 * RED - 7.5 * BLUE + 1)",
+        {"NIR": image.select("nir"), "RED": image.select("red"), "BLUE": image.select("blue")})`
+
+        Args:
+            expression: Formula using +, -, *, /, **, %, comparisons,
+                `a if cond else b`, and abs, sqrt, exp, log, log10, sin, cos,
+                tan, arctan2, where, min, max.
+            map: Dict of variable names to og.Image or numbers. Other names
+                refer to bands of this image, as does `b('name')` or `b(0)`.
+            dtype: Output dtype; defaults to the configured float dtype,
+                widened if an input is wider.
+        """
+        from .expression import Expression, evaluate
+
+        parsed = Expression(expression)
+        map = map or {}
+        band_dim = 'band' if 'band' in self._da.dims else 'bands' if 'bands' in self._da.dims else None
+        bands = self._da[band_dim].values.tolist() if band_dim else []
+
+        variables = {}
+        for name in parsed.names:
+            if isinstance(name, tuple):
+                key = name[1]
+                if isinstance(key, int) and not isinstance(key, bool):
+                    if not 0 <= key < len(bands):
+                        raise ValueError(f"Band index {key} out of range for image with bands {bands}.")
+                    key = bands[key]
+                name_value = key
+            else:
+                name_value = name
+            if not isinstance(name, tuple) and name in map:
+                value = map[name]
+                variables[name] = value._da if isinstance(value, Image) else value
+            elif name_value in bands:
+                variables[name] = self._da.sel({band_dim: [name_value]})
+            else:
+                raise ValueError(f"Unknown variable '{name_value}' in expression: not in map or image bands {bands}.")
+
+        result = evaluate(parsed, variables, dtype=dtype)
+        if any(isinstance(v, Image) for v in map.values()):
+            return Image(result)
+        return self._derive(result, lambda img: img.expression(expression, map, dtype))
+
+    def normalizedDifference(self, bands, dtype=None):
         if len(bands) != 2:
             raise ValueError("normalizedDifference requires exactly 2 bands.")
-        b1 = self.select(bands[0])
-        b2 = self.select(bands[1])
-        # Force float to avoid integer division issues
-        return (b1 - b2) / (b1 + b2)
+        # One fused kernel instead of three intermediate arrays
+        b1, b2 = f"b({bands[0]!r})", f"b({bands[1]!r})"
+        return self.expression(f"({b1} - {b2}) / ({b1} + {b2})", dtype=dtype)
 
     def to_file(self, path, vmin=None, vmax=None, palette=None, **kwargs):
         """
         Saves the image to a file. 
-        If path ends in .tif, saves as GeoTIFF.
+        If path ends in .tif, saves as a Cloud-Optimized GeoTIFF, streaming
+        chunks to disk in parallel (see opengeo.export.write_geotiff for the
+        options: cog, compress, blocksize, overviews, resampling, nodata,
+        progress).
         If path ends in .jpg or .png, saves as a rendered image.
         """
+        if path.lower().endswith(('.tif', '.tiff')):
+            from .export import write_geotiff
+            return write_geotiff(self._da, path, **kwargs)
+
         da = self._da
         if 'band' in da.dims:
             if da.sizes['band'] == 1:
@@ -202,26 +501,51 @@ class Image:
                 # RGB
                 pass
 
-        if path.lower().endswith(('.tif', '.tiff')):
-            da.rio.to_raster(path, **kwargs)
+        import matplotlib.pyplot as plt
+        # Normalize for visualization if not RGB
+        is_rgb = (len(da.shape) == 3 and (da.shape[0] == 3 or da.shape[-1] == 3))
+        
+        plt.figure(figsize=(10, 10))
+        if is_rgb:
+            # Handle (C, H, W) to (H, W, C) for matplotlib if needed
+            if da.shape[0] == 3:
+                da = da.transpose('y', 'x', 'band') if 'band' in da.dims else da.transpose('y', 'x', 'bands')
+            da.plot.imshow(vmin=vmin, vmax=vmax)
         else:
-            import matplotlib.pyplot as plt
-            # Normalize for visualization if not RGB
-            is_rgb = (len(da.shape) == 3 and (da.shape[0] == 3 or da.shape[-1] == 3))
-            
-            plt.figure(figsize=(10, 10))
-            if is_rgb:
-                # Handle (C, H, W) to (H, W, C) for matplotlib if needed
-                if da.shape[0] == 3:
-                    da = da.transpose('y', 'x', 'band') if 'band' in da.dims else da.transpose('y', 'x', 'bands')
-                da.plot.imshow(vmin=vmin, vmax=vmax)
-            else:
-                da.plot.imshow(cmap=palette or 'viridis', vmin=vmin, vmax=vmax)
-            
-            plt.axis('off')
-            plt.savefig(path, bbox_inches='tight', pad_inches=0)
-            plt.close()
-            print(f"Image saved to {path}")
+            da.plot.imshow(cmap=palette or 'viridis', vmin=vmin, vmax=vmax)
+        
+        plt.axis('off')
+        plt.savefig(path, bbox_inches='tight', pad_inches=0)
+        plt.close()
+        print(f"Image saved to {path}")
+
+    def to_zarr(self, store, time=None, name=None, mode=None, compression="zstd", level=5, consolidated=True):
+        """
+        Writes the image to a Zarr store with chunks matching its dask chunks
+        and consolidated metadata.
+
+        Args:
+            store: Path or zarr store.
+            time: Optional time label (e.g. '2024-01'). The image is written
+                as that time step, and by default appended to the store if it
+                exists, leaving earlier time steps untouched.
+            name: Variable name in the store; defaults to 'data'.
+            mode: 'w-' (create), 'w' (overwrite) or 'a' (append); defaults
+                to 'a' when `time` is given, 'w-' otherwise.
+            compression: 'zstd', 'lz4', 'zlib', 'gzip', a numcodecs codec or None.
+            level: Compression level.
+            consolidated: Write consolidated metadata.
+        """
+        from .export import write_zarr
+
+        da = self._da
+        if time is not None:
+            import pandas as pd
+            da = da.expand_dims(time=[pd.Timestamp(time).to_datetime64()])
+        if mode is None:
+            mode = "a" if time is not None else "w-"
+        return write_zarr(da, store, name=name, mode=mode, compression=compression, level=level,
+                          consolidated=consolidated)
 
     def getInfo(self):
         # Metadata
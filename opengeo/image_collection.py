@@ -1,16 +1,90 @@
-from pystac_client import Client
+import pystac
+from pystac import ItemCollection
 import stackstac
 import xarray as xr
 import numpy as np
 import copy
 from .image import Image
+from .reducer import Reducer, stack_stats
 from .geometry import Geometry
-from .config import get_stac_api
+from .config import get_stac_api, get_dtype, compute_dtype
+from .cache import get_cache, canonical_json
+from .client import get_client, sign
+from .signing import SignedReader
+from .search import iter_item_dicts
+from .sampling import points_frame, sample_points
+from .streaming import footprints, ordered_mosaic, stream_reduce
+
+def _raster_bands(item, asset_key):
+    assets = item.assets if hasattr(item, "assets") else item.get("assets", {})
+    asset = assets.get(asset_key)
+    if asset is None:
+        return None
+    fields = asset.extra_fields if hasattr(asset, "extra_fields") else asset
+    bands = fields.get("raster:bands")
+    return bands[0] if bands and len(bands) == 1 else None
+
+
+def _stack(items, assets=None, **kwargs):
+    """
+    stackstac.stack in the configured float dtype.
+
+    stackstac only applies raster:bands scale/offset in float64, so for
+    narrower dtypes raw values are loaded and rescaled here, per scene and
+    band, as one lazy elementwise step in the target dtype.
+    """
+    kwargs.setdefault("dtype", get_dtype())
+    kwargs.setdefault("reader", SignedReader)
+    dtype = np.dtype(kwargs["dtype"])
+    fill_value = kwargs.get("fill_value", np.nan)
+    if isinstance(fill_value, (int, float)) and (dtype.kind == "f" or not np.isnan(fill_value)):
+        # stackstac checks Python scalars as int64/float64, which would
+        # reject e.g. NaN for float32 or 0 for uint16
+        kwargs["fill_value"] = dtype.type(fill_value)
+    if not kwargs.get("rescale", True) or dtype == np.float64 or dtype.kind != "f":
+        return stackstac.stack(items, assets=assets, **kwargs)
+
+    kwargs["rescale"] = False
+    da = stackstac.stack(items, assets=assets, **kwargs)
+    by_id = {(i.id if hasattr(i, "id") else i["id"]): i for i in items}
+    scale = np.ones((da.sizes["time"], da.sizes["band"]), dtype=dtype)
+    offset = np.zeros_like(scale)
+    for t, item_id in enumerate(da.coords["id"].values):
+        for b, asset_key in enumerate(da.coords["band"].values):
+            raster = _raster_bands(by_id[item_id], asset_key)
+            if raster:
+                scale[t, b] = raster.get("scale", 1)
+                offset[t, b] = raster.get("offset", 0)
+    if (scale == 1).all() and (offset == 0).all():
+        return da
+    with xr.set_options(keep_attrs=True):
+        return da * xr.DataArray(scale, dims=("time", "band")) + xr.DataArray(offset, dims=("time", "band"))
+
+
+def _masked(da, fill_value):
+    """
+    Masks an explicit integer `fill_value` as missing for reductions. The
+    stack is cast to the configured float dtype first, so masking does not
+    upcast to float64.
+    """
+    if fill_value is None or (isinstance(fill_value, float) and np.isnan(fill_value)):
+        return da
+    return da.astype(compute_dtype(da.dtype)).where(da != fill_value)
 
 class ImageCollection:
-    """Wrapper for STAC search + stackstac to mimic ee.ImageCollection."""
+    """Wrapper for STAC search + stackstac to mimic ee.ImageCollection.
+
+    Args:
+        collection_id: STAC collection ID (or another ImageCollection to copy).
+        api_url: STAC API URL, defaults to the one set by og.Initialize().
+        filters: Initial STAC search parameters.
+        bands: Assets to load.
+        parallel_search: Number of concurrent sub-queries used to page through
+            large searches. The date range (or the search area, if no date
+            range is set) is split and results are merged by item ID.
+    """
 
-    def __init__(self, collection_id, api_url=None, filters=None, bands=None):
+    def __init__(self, collection_id, api_url=None, filters=None, bands=None, parallel_search=None):
         self._id = collection_id
         if isinstance(collection_id, ImageCollection):
              # Copy constructor logic if passed an instance
@@ -18,6 +92,9 @@ class ImageCollection:
              self._api = collection_id._api
              self._filters = copy.deepcopy(collection_id._filters)
              self._bands = copy.deepcopy(collection_id._bands)
+             self._parallel = collection_id._parallel
+             self._items = collection_id._items
+             self._items_key = collection_id._items_key
              return
 
         self._api = api_url or get_stac_api()
@@ -28,15 +105,37 @@ class ImageCollection:
             "bbox": None
         }
         self._bands = bands # Assets
+        self._parallel = parallel_search
+        # Memoized search results and the key they were fetched for
+        self._items = None
+        self._items_key = None
 
     def _clone(self):
         # Helper to create a copy
-        return ImageCollection(
+        new_col = ImageCollection(
             self._id, 
             api_url=self._api, 
             filters=copy.deepcopy(self._filters),
-            bands=copy.deepcopy(self._bands)
+            bands=copy.deepcopy(self._bands),
+            parallel_search=self._parallel
         )
+        # Carry the cached results forward; _search() drops them if the
+        # filters of the clone end up differing.
+        new_col._items = self._items
+        new_col._items_key = self._items_key
+        return new_col
+
+    def _cache_key(self):
+        """Normalized key of everything that determines the search results."""
+        return canonical_json({"api": self._api, "filters": self._search_params(), "bands": self._bands})
+
+    def refresh(self):
+        """Drop memoized search results so the next call re-queries the catalog."""
+        params = self._search_params()
+        get_cache().invalidate(self._api, "search", params)
+        self._items = None
+        self._items_key = None
+        return self
 
     def filterDate(self, start, end):
         new_col = self._clone()
@@ -59,6 +158,28 @@ class ImageCollection:
         new_col._filters.update(kwargs)
         return new_col
 
+    def sort(self, property, ascending=True):
+        """
+        Sorts the collection by an item property (e.g. 'eo:cloud_cover' or
+        'datetime'). Pushed down to the API's sort extension when available.
+        """
+        new_col = self._clone()
+        if property in ("id", "collection") or property.startswith("properties."):
+            field = property
+        else:
+            field = f"properties.{property}"
+        new_col._filters["sortby"] = [{"field": field, "direction": "asc" if ascending else "desc"}]
+        return new_col
+
+    def limit(self, max, property=None, ascending=True):
+        """
+        Limits the collection to `max` items, optionally sorting by `property`
+        first. The limit is applied by the API, so only `max` items are fetched.
+        """
+        new_col = self.sort(property, ascending) if property else self._clone()
+        new_col._filters["max_items"] = int(max)
+        return new_col
+
     def select(self, bands):
         new_col = self._clone()
         if isinstance(bands, str): bands = [bands]
@@ -66,24 +187,70 @@ class ImageCollection:
         return new_col
 
     def _search(self):
-        # Check for MS Planetary Computer
-        modifier = None
-        if "planetarycomputer" in self._api:
-            try:
-                import planetary_computer
-                modifier = planetary_computer.sign_inplace
-            except ImportError:
-                 print("Warning: accessing Microsoft Planetary Computer but 'planetary-computer' package is not installed.")
-        
-        client = Client.open(self._api, modifier=modifier)
+        key = self._cache_key()
+        if self._items is not None and self._items_key == key:
+            return self._items
+
+        self._items = self._fetch_items()
+        self._items_key = key
+        return self._items
+
+    def _search_params(self):
         # remove None values
-        params = {k: v for k, v in self._filters.items() if v is not None}
-        
-        search = client.search(**params)
-        return search.item_collection()
+        return {k: v for k, v in self._filters.items() if v is not None}
+
+    def _fetch_items(self):
+        params = self._search_params()
+
+        def _query():
+            features = list(iter_item_dicts(get_client(self._api), params, workers=self._parallel or 1))
+            return {"type": "FeatureCollection", "features": features}
+
+        # Items stay unsigned, on disk and in memory: hrefs are signed when
+        # read (see signing.SignedReader), so tokens cannot expire in between
+        return ItemCollection.from_dict(get_cache().fetch(self._api, "search", params, _query))
+
+    def iterItems(self, signed=False):
+        """
+        Yields the collection's STAC items as result pages arrive, so work can
+        start before a large search completes. The full result is memoized
+        once the iteration finishes.
+
+        Args:
+            signed: Yield copies with signed asset hrefs, for opening them
+                directly. By default hrefs are unsigned (opengeo signs them
+                when reading), so Planetary Computer assets answer 403 if
+                opened as is; og.AssetUrls also signs them.
+        """
+        for item in self._iter_items():
+            yield sign(self._api, item.clone()) if signed else item
+
+    def _iter_items(self):
+        key = self._cache_key()
+        if self._items is not None and self._items_key == key:
+            yield from self._items
+            return
+
+        params = self._search_params()
+        cache = get_cache()
+        cached = cache.get(cache.key(self._api, "search", params))
+        if cached is not None or cache.offline:
+            yield from self._search()
+            return
+
+        features = []
+        for feature in iter_item_dicts(get_client(self._api), params, workers=self._parallel or 1):
+            features.append(feature)
+            yield pystac.Item.from_dict(feature)
+
+        collection = {"type": "FeatureCollection", "features": features}
+        cache.set(cache.key(self._api, "search", params), collection, api=self._api)
+        self._items = ItemCollection.from_dict(collection)
+        self._items_key = key
 
-    def _to_xarray(self, **kwargs):
-        items = self._search()
+    def _to_xarray(self, items=None, **kwargs):
+        if items is None:
+            items = self._search()
         if len(items) == 0:
             raise ValueError(f"No images found in collection '{self._id}' with current filters.")
         
@@ -94,58 +261,211 @@ class ImageCollection:
                  bounds_latlon = self._filters["intersects"].bounds
              except: pass
         
-        # Load stack. 
-        da = stackstac.stack(
-             items, 
-             assets=self._bands, 
-             bounds_latlon=bounds_latlon,
-             **kwargs
-        )
-        return da
+        kwargs.setdefault("bounds_latlon", bounds_latlon)
+        return _stack(items, self._bands, **kwargs)
 
-    def mean(self, **kwargs):
+    def _with_source(self, image, method, *args, **kwargs):
+        """Lets `image` be rebuilt at a coarser resolution (reading COG overviews)."""
+        def _source(resolution, chunksize=None):
+            options = dict(kwargs, resolution=resolution)
+            if chunksize:
+                options["chunksize"] = chunksize
+            return getattr(self, method)(*args, **options)
+        image._source = _source
+        return image
+
+    def _reduce_time(self, stat, streaming=False, batch_size=4, bins=64, passes=2, **kwargs):
         da = self._to_xarray(**kwargs)
-        # Reduce time dimension
-        return Image(da.mean(dim="time", keep_attrs=True))
+        if streaming:
+            # Fold time slices chunk by chunk instead of holding the time axis
+            reduced = stream_reduce(
+                da, [stat], batch_size=batch_size, bins=bins, passes=passes,
+                nodata=kwargs.get("fill_value", np.nan)
+            )
+            image = Image(reduced.squeeze("stat", drop=True))
+        else:
+            # Reduce time dimension
+            reduced = Reducer(stat)._reduce(_masked(da, kwargs.get("fill_value")), "time")
+            image = Image(reduced[stat])
+        return self._with_source(
+            image, "_reduce_time", stat, streaming=streaming, batch_size=batch_size,
+            bins=bins, passes=passes, **kwargs
+        )
+
+    def reduce(self, reducer, streaming=False, batch_size=4, bins=64, passes=2, **kwargs):
+        """
+        Applies a (combined) reducer over time, e.g.
+        `col.reduce(og.Reducer.mean().combine(og.Reducer.stdDev()))`.
 
-    def median(self, **kwargs):
+        All statistics share one graph and one read of the scenes; with
+        several statistics the output bands are named 'band_stat'. With
+        `streaming=True` they are folded in a single streaming pass.
+        """
+        reducer = Reducer._from(reducer)
+        stats = reducer.getOutputs()
         da = self._to_xarray(**kwargs)
-        return Image(da.median(dim="time", keep_attrs=True))
+        if streaming:
+            reduced = stream_reduce(
+                da, stats, batch_size=batch_size, bins=bins, passes=passes,
+                nodata=kwargs.get("fill_value", np.nan)
+            )
+            results = {s: reduced.sel(stat=s, drop=True) for s in stats}
+        else:
+            results = reducer._reduce(_masked(da, kwargs.get("fill_value")), "time")
+        image = Image(stack_stats(results, "band"))
+        return self._with_source(
+            image, "reduce", reducer, streaming=streaming, batch_size=batch_size,
+            bins=bins, passes=passes, **kwargs
+        )
+
+    def mean(self, streaming=False, **kwargs):
+        """
+        Per-pixel mean over time. With `streaming=True` time slices are folded
+        in batches (`batch_size`) so memory stays bounded by the chunk size.
+        """
+        return self._reduce_time("mean", streaming, **kwargs)
+
+    def median(self, streaming=False, **kwargs):
+        """
+        Per-pixel median over time. With `streaming=True` an approximate
+        median is computed from refined per-pixel histograms (`bins`,
+        `passes`) without loading the full time axis of a chunk.
+        """
+        return self._reduce_time("median", streaming, **kwargs)
         
-    def min(self, **kwargs):
-        da = self._to_xarray(**kwargs)
-        return Image(da.min(dim="time", keep_attrs=True))
+    def min(self, streaming=False, **kwargs):
+        return self._reduce_time("min", streaming, **kwargs)
 
-    def max(self, **kwargs):
-        da = self._to_xarray(**kwargs)
-        return Image(da.max(dim="time", keep_attrs=True))
+    def max(self, streaming=False, **kwargs):
+        return self._reduce_time("max", streaming, **kwargs)
         
-    def mosaic(self, **kwargs):
-        # Mosaic by taking max (common simple mosaic) or last.
-        # stackstac.mosaic is more sophisticated if available.
-        # Fallback to mean/median/max
-        return self.max(**kwargs) 
+    def mosaic(self, sort=None, ascending=True, **kwargs):
+        """
+        First-valid-pixel mosaic of the collection.
+
+        Scenes are layered newest first, or ordered by the `sort` item
+        property (e.g. 'eo:cloud_cover'). Each chunk stops reading once all
+        of its pixels are filled and skips scenes that don't cover it.
+        """
+        items = list(self._search())
+        if sort is None:
+            def _date(item):
+                return str(item.datetime or item.properties.get("start_datetime") or "")
+            items.sort(key=_date, reverse=True)
+        else:
+            present = [i for i in items if i.properties.get(sort) is not None]
+            missing = [i for i in items if i.properties.get(sort) is None]
+            present.sort(key=lambda i: i.properties[sort], reverse=not ascending)
+            items = present + missing
+
+        da = self._to_xarray(items=items, sortby_date=False, **kwargs)
+        fps = footprints(items, da.attrs["crs"]) if "crs" in da.attrs else None
+        image = Image(ordered_mosaic(da, fps, nodata=kwargs.get("fill_value", np.nan)))
+        return self._with_source(image, "mosaic", sort=sort, ascending=ascending, **kwargs)
 
     def first(self, **kwargs):
         # Return first image
         try:
-             client = Client.open(self._api)
-             params = {k: v for k, v in self._filters.items() if v is not None}
-             params['max_items'] = 1
-             search = client.search(**params)
-             items = list(search.items())
-             if not items: return None
-             da = stackstac.stack(items[0], assets=self._bands, **kwargs)
+             if self._items is not None and self._items_key == self._cache_key():
+                 items = self._items
+             else:
+                 items = self.limit(1)._search()
+             if len(items) == 0: return None
+             da = _stack([items[0]], self._bands, **kwargs)
              return Image(da.squeeze("time"))
         except Exception as e:
              print(f"Error fetching first image: {e}")
              return None
         
     def size(self):
+        if self._items is not None and self._items_key == self._cache_key():
+            return len(self._items)
+
+        # Use the API's numberMatched count instead of paging through results
+        params = self._search_params()
+        cache = get_cache()
+        cached = cache.get(cache.key(self._api, "search", params))
+        if cached is None and not cache.offline:
+            def _query():
+                count_params = {k: v for k, v in params.items() if k not in ("sortby", "max_items")}
+                return get_client(self._api).search(**count_params).matched()
+
+            matched = cache.fetch(self._api, "matched", params, _query)
+            if matched is not None:
+                return min(matched, params["max_items"]) if "max_items" in params else matched
         return len(self._search())
     
+    def getRegion(self, points, scale=None, **kwargs):
+        """
+        Extracts the pixel time series at each point, like ee.ImageCollection.getRegion.
+
+        The stack is limited to the points' extent and sampled with one
+        vectorized lookup, so every tile holding a point is read once per
+        scene. Rows where a scene has no data at the point are dropped.
+
+        Args:
+            points: og.FeatureCollection, GeoDataFrame or list of og.Geometry points.
+            scale: Pixel size in the stack CRS units (meters for UTM scenes).
+            **kwargs: Passed to stackstac.stack.
+
+        Returns:
+            pandas.DataFrame with columns point, id, longitude, latitude,
+            time and one column per band.
+        """
+        import pandas as pd
+
+        gdf = points_frame(points)
+        lonlat = gdf.geometry.to_crs("EPSG:4326")
+        if scale is not None:
+            kwargs.setdefault("resolution", scale)
+        if "bounds_latlon" not in kwargs and len(gdf):
+            # Pad so points on the edge still fall inside a pixel
+            minx, miny, maxx, maxy = lonlat.total_bounds
+            kwargs["bounds_latlon"] = (minx - 1e-3, miny - 1e-3, maxx + 1e-3, maxy + 1e-3)
+
+        da = self._to_xarray(**kwargs)
+        values = sample_points(da, gdf).transpose("time", "point", "band").compute()
+
+        n_time, n_point, n_band = values.shape
+        frame = pd.DataFrame(values.values.reshape(-1, n_band), columns=[str(b) for b in values.band.values])
+        frame.insert(0, "time", np.repeat(values.time.values, n_point))
+        frame.insert(0, "latitude", np.tile(lonlat.y.values, n_time))
+        frame.insert(0, "longitude", np.tile(lonlat.x.values, n_time))
+        frame.insert(0, "id", np.repeat(values.id.values, n_point))
+        frame.insert(0, "point", np.tile(gdf.index.values, n_time))
+        return frame[frame.iloc[:, 5:].notna().any(axis=1)].reset_index(drop=True)
+
+    def to_zarr(self, store, name=None, mode="a", compression="zstd", level=5, consolidated=True, **kwargs):
+        """
+        Writes the (time, band, y, x) stack to a Zarr store, one time step per
+        chunk, with consolidated metadata.
+
+        With mode='a' (the default) an existing store only receives the scenes
+        (by item id) it does not have yet, so re-running an export after new
+        scenes arrive appends them without rewriting history. Scenes older
+        than the store's last time step are rejected with a ValueError, since
+        appending them would leave the time axis out of order.
+
+        Args:
+            store: Path or zarr store.
+            name: Variable name in the store; defaults to 'data'.
+            mode: 'a' (append), 'w-' (create) or 'w' (overwrite).
+            compression: 'zstd', 'lz4', 'zlib', 'gzip', a numcodecs codec or None.
+            level: Compression level.
+            consolidated: Write consolidated metadata.
+            **kwargs: Passed to stackstac.stack (resolution, epsg, chunksize, ...).
+
+        Returns:
+            Number of time steps written.
+        """
+        from .export import write_zarr
+
+        da = self._to_xarray(**kwargs)
+        return write_zarr(da, store, name=name, mode=mode, compression=compression, level=level,
+                          consolidated=consolidated)
+
     def getInfo(self):
-        return [i.to_dict() for i in self._search()]
+        return [sign(self._api, i.to_dict()) for i in self._search()]
 
     def __repr__(self):
         return f"og.ImageCollection({self._id}, filters={self._filters})"
@@ -18,6 +18,10 @@ class Map(leafmap.Map):
         if 'zoom' not in kwargs:
             kwargs['zoom'] = 2
         super().__init__(**kwargs)
+        # Tile server layers behind this map's layers, unregistered on removal
+        self._served = []
+        if hasattr(self, 'observe'):
+            self.observe(self._on_layers_changed, names=['layers'])
 
     def addLayer(self, ee_object, vis_params=None, name=None, shown=True, opacity=1):
         """
@@ -25,7 +29,7 @@ class Map(leafmap.Map):
         
         Args:
             ee_object: The object to add (Image, ImageCollection, etc.)
-            vis_params: Dictionary of visualization parameters (min, max, palette, bands)
+            vis_params: Dictionary of visualization parameters (min, max, palette, bands, gamma)
             name: Layer name
             shown: Whether the layer is visible
             opacity: Layer opacity
@@ -36,7 +40,18 @@ class Map(leafmap.Map):
         if name is None:
             name = "Layer " + str(len(self.layers))
 
-        if isinstance(ee_object, Image):
+        if isinstance(ee_object, Image) and ee_object._da.rio.crs is not None:
+            # Tiles are rendered on demand from the lazy image, so only what
+            # is on screen is ever computed
+            from .tiles import get_tile_server
+            server = get_tile_server()
+            url = server.add(ee_object, vis_params)
+            self.add_tile_layer(url, name=name, attribution="OpenGeo", opacity=opacity, shown=shown)
+            # The URL template is <server>/tiles/<layer id>/{z}/{x}/{y}.png
+            layer = next((l for l in self.layers if getattr(l, 'url', None) == url), None)
+            self._track(layer, server, url.rsplit('/', 4)[1])
+
+        elif isinstance(ee_object, Image):
             da = ee_object._data
             
             # Handle band selection in vis_params
@@ -84,11 +99,82 @@ class Map(leafmap.Map):
             return self.addLayer(ee_object.mosaic(), vis_params, name, shown, opacity)
             
         elif isinstance(ee_object, (Feature, FeatureCollection)):
-            # TODO: add_gdf support
-            pass
+            if isinstance(ee_object, Feature):
+                ee_object = FeatureCollection(ee_object)
+            self._add_vector_layer(ee_object, vis_params, name, shown, opacity)
             
         return self
 
+    @staticmethod
+    def _vector_style(vis_params, opacity=1):
+        """Leaflet path style from GEE-style vis_params (color, fillColor, width)."""
+        def _hex(value):
+            value = str(value)
+            if len(value.lstrip('#')) in (6, 8) and all(c in '0123456789abcdefABCDEF' for c in value.lstrip('#')):
+                return '#' + value.lstrip('#')
+            return value
+
+        color = _hex(vis_params.get('color', '3388ff'))
+        fill = _hex(vis_params.get('fillColor', color))
+        fill_opacity = vis_params.get('fillOpacity', 0.2)
+        if fill.startswith('#') and len(fill) == 9:
+            # GEE-style RRGGBBAA
+            fill_opacity = int(fill[7:], 16) / 255
+            fill = fill[:7]
+        if color.startswith('#') and len(color) == 9:
+            color = color[:7]
+        return {
+            'color': color,
+            'weight': vis_params.get('width', 2),
+            'opacity': opacity,
+            'fillColor': fill,
+            'fillOpacity': fill_opacity * opacity,
+        }
+
+    def _add_vector_layer(self, collection, vis_params, name, shown, opacity):
+        """
+        Draws a FeatureCollection as a GeoJSON layer holding only the features
+        in view, simplified for the current zoom, and refreshed as the map
+        moves. Backends without viewport events get the whole collection.
+        """
+        style = self._vector_style(vis_params, opacity)
+        if not hasattr(self, 'observe'):
+            self.add_gdf(collection._gdf, layer_name=name, style=style)
+            return
+
+        import json
+        from ipyleaflet import GeoJSON
+        from .tiles import get_tile_server
+
+        server = get_tile_server()
+        layer_id = server.add_vector(collection)
+        layer = GeoJSON(data={'type': 'FeatureCollection', 'features': []}, style=style, name=name, visible=shown)
+
+        def _refresh(change=None):
+            if not self.bounds:
+                return
+            (south, west), (north, east) = self.bounds
+            layer.data = json.loads(server.viewport(layer_id, int(round(self.zoom)), (west, south, east, north)))
+
+        self.observe(_refresh, names=['bounds'])
+        self.add_layer(layer)
+        self._track(layer, server, layer_id, _refresh)
+        _refresh()
+
+    def _track(self, layer, server, layer_id, refresh=None):
+        """Remembers the tile server layer behind a map layer, to unregister it when the layer is removed."""
+        if layer is not None and hasattr(self, 'observe'):
+            self._served.append((layer, server, layer_id, refresh))
+
+    def _on_layers_changed(self, change):
+        current = change['new']
+        for entry in [e for e in self._served if not any(e[0] is l for l in current)]:
+            layer, server, layer_id, refresh = entry
+            if refresh is not None:
+                self.unobserve(refresh, names=['bounds'])
+            server.remove(layer_id)
+            self._served.remove(entry)
+
     def centerObject(self, obj, zoom=None):
         """Centers the map on an object."""
         from .geometry import Geometry
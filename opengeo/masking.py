@@ -0,0 +1,100 @@
+"""
+Lazy geometry clipping of dask-backed images.
+
+The array is first sliced to the geometry's bounding window, so chunks
+outside it are never read. Each remaining spatial chunk is then classified
+against the geometry: chunks fully inside are passed through untouched,
+chunks fully outside become constant fill without reading their source,
+and only chunks crossing the boundary get a rasterized mask.
+"""
+import numpy as np
+import dask.array as dsa
+from affine import Affine
+from shapely.geometry import box
+from shapely.prepared import prep
+
+from .config import compute_dtype
+from .streaming import grid_transform
+
+
+def _window(transform, bounds, height, width):
+    inverse = ~transform
+    minx, miny, maxx, maxy = bounds
+    cols, rows = zip(*[inverse * (x, y) for x in (minx, maxx) for y in (miny, maxy)])
+    # An edge on a pixel boundary does not pull in the pixel beyond it (as in
+    # rioxarray's clip); the tolerance absorbs float error in the inverse
+    # transform, and a degenerate geometry still gets its pixel
+    eps = 1e-6
+    r0 = int(np.floor(min(rows) + eps))
+    c0 = int(np.floor(min(cols) + eps))
+    r1 = max(int(np.ceil(max(rows) - eps)), r0 + 1)
+    c1 = max(int(np.ceil(max(cols) - eps)), c0 + 1)
+    return max(r0, 0), min(r1, height), max(c0, 0), min(c1, width)
+
+
+def _with_transform(da, transform):
+    if "transform" in da.attrs:
+        da.attrs["transform"] = transform
+    if "spatial_ref" in da.coords:
+        da = da.rio.write_transform(transform)
+    return da
+
+
+def _mask_block(block, transform, geom, fill):
+    from rasterio.features import geometry_mask
+
+    outside = geometry_mask([geom], out_shape=block.shape[-2:], transform=transform, all_touched=True)
+    return np.where(outside, fill, block)
+
+
+def clip_to_geometry(da, geom):
+    """
+    Clips a (..., y, x) DataArray to a shapely geometry in the array's CRS.
+    Pixels touched by the geometry are kept, the rest are set to the nodata
+    value (NaN unless one is set). Raises ValueError if they do not overlap.
+    """
+    transform = grid_transform(da)
+    r0, r1, c0, c1 = _window(transform, geom.bounds, da.sizes["y"], da.sizes["x"])
+    if r1 <= r0 or c1 <= c0:
+        raise ValueError("No data found in bounds: the geometry does not overlap the image.")
+
+    window = da.isel(y=slice(r0, r1), x=slice(c0, c1))
+    transform = transform * Affine.translation(c0, r0)
+    window = _with_transform(window.copy(), transform)
+
+    fill = window.rio.nodata if window.rio.nodata is not None else np.nan
+    dtype = window.dtype
+    if isinstance(fill, float) and np.isnan(fill) and not np.issubdtype(dtype, np.floating):
+        dtype = compute_dtype(dtype)
+
+    arr = window.data
+    if not isinstance(arr, dsa.Array):
+        return window.copy(data=_mask_block(np.asarray(arr, dtype=dtype), transform, geom, fill))
+
+    y_axis, x_axis = window.get_axis_num("y"), window.get_axis_num("x")
+    offsets = [np.concatenate([[0], np.cumsum(c)]) for c in arr.chunks]
+    prepared = prep(geom)
+    blocks = {}
+    for index in np.ndindex(*arr.numblocks):
+        block = arr.blocks[index]
+        y0, y1 = offsets[y_axis][index[y_axis]], offsets[y_axis][index[y_axis] + 1]
+        x0, x1 = offsets[x_axis][index[x_axis]], offsets[x_axis][index[x_axis] + 1]
+        block_transform = transform * Affine.translation(x0, y0)
+        left, top = block_transform * (0, 0)
+        right, bottom = block_transform * (x1 - x0, y1 - y0)
+        bounds = box(min(left, right), min(top, bottom), max(left, right), max(top, bottom))
+        if prepared.contains(bounds):
+            blocks[index] = block.astype(dtype)
+        elif not prepared.intersects(bounds):
+            blocks[index] = dsa.full(block.shape, fill, dtype=dtype, chunks=block.shape)
+        else:
+            blocks[index] = block.astype(dtype).map_blocks(
+                _mask_block, transform=block_transform, geom=geom, fill=fill, dtype=dtype
+            )
+
+    def _nest(prefix):
+        if len(prefix) == arr.ndim:
+            return blocks[prefix]
+        return [_nest(prefix + (i,)) for i in range(arr.numblocks[len(prefix)])]
+
+    return window.copy(data=dsa.block(_nest(())))
@@ -0,0 +1,138 @@
+"""
+Concurrent health and latency checks of STAC catalogs.
+
+Every catalog's landing page is fetched in a thread pool without retries,
+so a degraded mirror shows up as slow or down instead of being hidden by
+backoff. Successful results go to the search cache, shared by every process
+using the same cache directory, and are reused until they are `max_age`
+seconds old; failures are always re-checked.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import get_cache
+from .catalogs import STAC_CATALOGS
+from .config import resolve_url
+
+_SEARCH_CONFORMANCE = "item-search"
+
+
+def _alias(url):
+    for alias, info in STAC_CATALOGS.items():
+        if info["url"].rstrip("/") == url.rstrip("/"):
+            return alias
+    return None
+
+
+def _result(url, error=None):
+    return {
+        "url": url, "alias": _alias(url), "ok": False, "status": None, "latency": None,
+        "conformance": [], "search": False, "collection": None, "error": error, "checked": time.time(),
+    }
+
+
+def probe_catalog(url, collection=None, timeout=5, session=None):
+    """
+    Checks a single STAC API: landing-page latency, conformance classes and
+    whether it serves `collection`.
+
+    Returns:
+        Dict with url, alias, ok, status, latency (seconds, None if down),
+        conformance, search (item search supported), collection (True/False,
+        or None if not checked), error and checked (epoch seconds).
+    """
+    import requests
+
+    session = session or requests.Session()
+    url = resolve_url(url)
+    result = _result(url)
+    try:
+        start = time.perf_counter()
+        response = session.get(url, timeout=timeout, headers={"Accept": "application/json"})
+        result["latency"] = time.perf_counter() - start
+        result["status"] = response.status_code
+        response.raise_for_status()
+        landing = response.json()
+
+        conformance = landing.get("conformsTo")
+        if not conformance:
+            # Older APIs only list their conformance classes at /conformance
+            found = session.get(url.rstrip("/") + "/conformance", timeout=timeout)
+            conformance = found.json().get("conformsTo") if found.status_code == 200 else None
+        result["conformance"] = conformance or []
+        result["search"] = any(_SEARCH_CONFORMANCE in c for c in result["conformance"])
+
+        if collection:
+            found = session.get(f"{url.rstrip('/')}/collections/{collection}", timeout=timeout)
+            result["collection"] = found.status_code == 200
+        result["ok"] = True
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def ProbeCatalogs(catalogs=None, collection=None, timeout=5, workers=16, max_age=300, refresh=False):
+    """
+    Concurrently checks STAC catalogs and returns their health, fastest first.
+
+    Args:
+        catalogs: Aliases or URLs to check (default: every public API in
+            og.Catalogs()).
+        collection: Also check whether each catalog serves this collection.
+        timeout: Seconds before a catalog counts as down.
+        workers: Number of catalogs checked at once.
+        max_age: Seconds a cached result of a reachable catalog is reused
+            for (at most the search cache TTL). Failed checks are never
+            cached.
+        refresh: Ignore cached results.
+
+    Returns:
+        List of dicts (see `probe_catalog`): reachable catalogs sorted by
+        latency, then the unreachable ones.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    if catalogs is None:
+        catalogs = [alias for alias, info in STAC_CATALOGS.items() if info["type"] == "APIPublic"]
+    urls = list(dict.fromkeys(resolve_url(c) for c in catalogs))
+
+    cache = get_cache()
+    results, pending = {}, []
+    for url in urls:
+        cached = None if refresh else cache.get(cache.key(url, "probe", {"collection": collection}))
+        if cached is not None and (cache.offline or time.time() - cached["checked"] <= max_age):
+            results[url] = cached
+        elif cache.offline:
+            results[url] = _result(url, "Offline mode: no cached probe result")
+        else:
+            pending.append(url)
+
+    if pending:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(pending), pool_maxsize=workers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        with ThreadPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+            probed = pool.map(lambda u: probe_catalog(u, collection, timeout, session), pending)
+            for url, result in zip(pending, probed):
+                results[url] = result
+                # Failures are not cached: one transient error must not mark
+                # a catalog down for every process sharing the cache
+                if result["ok"]:
+                    cache.set(cache.key(url, "probe", {"collection": collection}), result, api=url)
+        session.close()
+
+    ordered = [results[url] for url in urls]
+    return sorted(ordered, key=lambda r: (not r["ok"], r["latency"] if r["latency"] is not None else float("inf")))
+
+
+def fastest_catalog(catalogs=None, collection=None, **kwargs):
+    """
+    The lowest-latency reachable catalog supporting item search and, if
+    given, serving `collection`; None if there is none.
+    """
+    for result in ProbeCatalogs(catalogs, collection=collection, **kwargs):
+        if result["ok"] and result["search"] and (collection is None or result["collection"]):
+            return result
+    return None
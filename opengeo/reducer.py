@@ -0,0 +1,149 @@
+import dask
+import xarray as xr
+
+
+class Reducer:
+    """
+    Set of statistics evaluated together, to mimic ee.Reducer.
+
+    Reducers combine like in Earth Engine, e.g.
+    `og.Reducer.mean().combine(og.Reducer.stdDev())`, and every statistic of
+    a combined reducer is computed from the same read of the data.
+    """
+
+    def __init__(self, stats):
+        if isinstance(stats, str):
+            stats = [stats]
+        self._stats = list(stats)
+
+    @classmethod
+    def mean(cls):
+        return cls("mean")
+
+    @classmethod
+    def median(cls):
+        return cls("median")
+
+    @classmethod
+    def min(cls):
+        return cls("min")
+
+    @classmethod
+    def max(cls):
+        return cls("max")
+
+    @classmethod
+    def minMax(cls):
+        return cls(["min", "max"])
+
+    @classmethod
+    def sum(cls):
+        return cls("sum")
+
+    @classmethod
+    def count(cls):
+        return cls("count")
+
+    @classmethod
+    def stdDev(cls):
+        return cls("stdDev")
+
+    @classmethod
+    def variance(cls):
+        return cls("variance")
+
+    @classmethod
+    def percentile(cls, percentiles):
+        if isinstance(percentiles, (int, float)):
+            percentiles = [percentiles]
+        return cls([f"p{p:g}" for p in percentiles])
+
+    def combine(self, reducer2, sharedInputs=True):
+        """
+        Returns a reducer computing the statistics of both reducers in one pass.
+        Inputs are always shared; the argument exists for Earth Engine parity.
+        """
+        other = Reducer._from(reducer2)
+        return Reducer(self._stats + [s for s in other._stats if s not in self._stats])
+
+    @staticmethod
+    def _from(reducer):
+        """Accepts a Reducer, a statistic name or a list of names."""
+        if isinstance(reducer, Reducer):
+            return reducer
+        return Reducer(reducer)
+
+    def getOutputs(self):
+        return list(self._stats)
+
+    def _reduce(self, da, dims):
+        """Lazily computes every statistic of `da` over `dims`; returns {stat: DataArray}."""
+        from .config import compute_dtype
+
+        if isinstance(dims, str):
+            dims = [dims]
+        # Integer data is averaged in the configured float dtype, not float64
+        data = da
+        da = da.astype(compute_dtype(da.dtype)) if da.dtype.kind in "iub" else da
+        out = {}
+        for stat in self._stats:
+            if stat == "mean":
+                out[stat] = da.mean(dim=dims, keep_attrs=True)
+            elif stat == "min":
+                out[stat] = data.min(dim=dims, keep_attrs=True)
+            elif stat == "max":
+                out[stat] = data.max(dim=dims, keep_attrs=True)
+            elif stat == "sum":
+                out[stat] = data.sum(dim=dims, keep_attrs=True)
+            elif stat == "count":
+                out[stat] = data.count(dim=dims, keep_attrs=True)
+            elif stat == "median":
+                out[stat] = da.median(dim=dims, keep_attrs=True)
+            elif stat == "stdDev":
+                out[stat] = da.std(dim=dims, keep_attrs=True)
+            elif stat == "variance":
+                out[stat] = da.var(dim=dims, keep_attrs=True)
+            elif stat.startswith("p") and stat[1:].replace(".", "", 1).isdigit():
+                whole = da.chunk({d: -1 for d in dims}) if da.chunks is not None else da
+                out[stat] = whole.quantile(float(stat[1:]) / 100, dim=dims, keep_attrs=True).drop_vars("quantile")
+            else:
+                raise ValueError(f"Unsupported reducer: {stat}")
+        return out
+
+    def _compute(self, da, dims):
+        """Evaluates all statistics in a single dask computation."""
+        lazy = self._reduce(da, dims)
+        values = dask.compute(*lazy.values())
+        return dict(zip(lazy.keys(), values))
+
+    def __repr__(self):
+        return f"og.Reducer({', '.join(self._stats)})"
+
+
+def band_stat_names(bands, stats):
+    """Output names keyed like Earth Engine: the band name for single-statistic reducers, else band_stat."""
+    if len(stats) == 1:
+        return {(b, stats[0]): str(b) for b in bands}
+    return {(b, s): f"{b}_{s}" for b in bands for s in stats}
+
+
+def stack_stats(results, band_dim):
+    """Concatenates {stat: DataArray} along the band dimension with band_stat names."""
+    stats = list(results)
+    if band_dim is None:
+        if len(stats) == 1:
+            return results[stats[0]]
+        return xr.concat(
+            [results[s].expand_dims(band=[s]) for s in stats], dim="band"
+        )
+    bands = results[stats[0]][band_dim].values.tolist()
+    names = band_stat_names(bands, stats)
+    parts = []
+    for s in stats:
+        part = results[s].copy()
+        part[band_dim] = [names[(b, s)] for b in bands]
+        parts.append(part)
+    combined = xr.concat(parts, dim=band_dim, coords="minimal", compat="override")
+    # Interleave as band_stat1, band_stat2, ... per band
+    order = [names[(b, s)] for b in bands for s in stats]
+    return combined.sel({band_dim: order})
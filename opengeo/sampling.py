@@ -0,0 +1,70 @@
+"""
+Pixel values at many points with vectorized indexing.
+
+All points are projected once, turned into pixel indices and gathered with
+a single pointwise `isel`, which dask splits by chunk: every chunk holding
+at least one point is read once per time step, and no other chunk is read.
+"""
+import numpy as np
+import geopandas as gpd
+import xarray as xr
+
+from .streaming import grid_transform
+
+
+def points_frame(points):
+    """
+    Returns a GeoDataFrame of points from an og.FeatureCollection, a
+    GeoDataFrame/GeoSeries, an og.Geometry or a list of og.Geometry points.
+    Inputs without a CRS are taken as EPSG:4326.
+    """
+    from .feature_collection import FeatureCollection
+    from .geometry import Geometry
+
+    if isinstance(points, FeatureCollection):
+        gdf = points._gdf
+    elif isinstance(points, gpd.GeoDataFrame):
+        gdf = points
+    elif isinstance(points, gpd.GeoSeries):
+        gdf = gpd.GeoDataFrame(geometry=points)
+    elif isinstance(points, Geometry):
+        gdf = gpd.GeoDataFrame(geometry=gpd.GeoSeries([points.shapely]).explode(index_parts=False), crs=points.crs)
+    elif isinstance(points, (list, tuple)):
+        geoms = [p.shapely if isinstance(p, Geometry) else p for p in points]
+        gdf = gpd.GeoDataFrame(geometry=geoms)
+    else:
+        raise ValueError(f"Cannot interpret points: {type(points)}")
+
+    if gdf.crs is None:
+        gdf = gdf.set_crs("EPSG:4326")
+    if len(gdf) and not (gdf.geom_type == "Point").all():
+        # Polygons and lines are sampled at a representative point, which
+        # unlike the centroid always lies on the geometry
+        gdf = gdf.set_geometry(gdf.geometry.representative_point())
+    return gdf
+
+
+def sample_points(da, gdf):
+    """
+    Lazily gathers the pixels of `da` (..., y, x) under each point of `gdf`.
+
+    Returns a DataArray whose 'y' and 'x' dimensions are replaced by a
+    'point' dimension aligned with the rows of `gdf`; points outside the
+    image are NaN.
+    """
+    proj = gdf.geometry.to_crs(da.rio.crs)
+    inverse = ~grid_transform(da)
+    cols, rows = inverse * (proj.x.values, proj.y.values)
+    cols = np.floor(cols).astype(np.int64)
+    rows = np.floor(rows).astype(np.int64)
+    inside = (rows >= 0) & (rows < da.sizes["y"]) & (cols >= 0) & (cols < da.sizes["x"])
+
+    index = np.flatnonzero(inside)
+    values = da.isel(
+        y=xr.DataArray(rows[inside], dims="point"),
+        x=xr.DataArray(cols[inside], dims="point")
+    )
+    values = values.drop_vars(["x", "y"], errors="ignore").assign_coords(point=index)
+    if len(index) < len(gdf):
+        values = values.reindex(point=np.arange(len(gdf)))
+    return values
@@ -0,0 +1,176 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from shapely.geometry import box, shape, mapping
+
+
+def _parse_datetime(value):
+    value = value.strip()
+    if value in ("", ".."):
+        return None
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _format_datetime(dt):
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _split_datetime(value, parts):
+    if not isinstance(value, str) or "/" not in value:
+        return None
+    start_s, end_s = value.split("/", 1)
+    try:
+        start, end = _parse_datetime(start_s), _parse_datetime(end_s)
+    except ValueError:
+        return None
+    if start is None or end is None or end <= start:
+        return None
+
+    step = (end - start) / parts
+    edges = [start_s] + [_format_datetime(start + step * i) for i in range(1, parts)] + [end_s]
+    return [f"{edges[i]}/{edges[i + 1]}" for i in range(parts)]
+
+
+def _split_area(params, parts):
+    if params.get("intersects") is not None:
+        geom = params["intersects"]
+        if isinstance(geom, dict):
+            geom = shape(geom)
+        elif hasattr(geom, "shapely"):
+            geom = geom.shapely
+        minx, miny, maxx, maxy = geom.bounds
+    elif params.get("bbox") is not None:
+        geom = None
+        minx, miny, maxx, maxy = params["bbox"]
+    else:
+        return None
+    if maxx <= minx:
+        return None
+
+    width = (maxx - minx) / parts
+    pieces = []
+    for i in range(parts):
+        strip = box(minx + i * width, miny, minx + (i + 1) * width, maxy)
+        if geom is None:
+            pieces.append({"bbox": list(strip.bounds)})
+        else:
+            part = geom.intersection(strip)
+            if not part.is_empty:
+                pieces.append({"intersects": mapping(part)})
+    return pieces
+
+
+def split_params(params, parts):
+    """
+    Splits one STAC search into up to `parts` sub-searches covering the same results.
+
+    Bounded datetime ranges are cut into equal intervals; otherwise the search
+    area is cut into vertical strips. Searches that depend on global ordering
+    or a result cap (sortby, max_items) are never split.
+    """
+    if parts <= 1 or "sortby" in params or "max_items" in params:
+        return [params]
+
+    ranges = _split_datetime(params.get("datetime"), parts)
+    if ranges:
+        return [dict(params, datetime=r) for r in ranges]
+
+    areas = _split_area(params, parts)
+    if areas:
+        return [dict(params, **area) for area in areas]
+    return [params]
+
+
+def _sort_value(item, field):
+    if field.startswith("properties."):
+        field = field[len("properties."):]
+    if field in item and field != "properties":
+        return item[field]
+    return item.get("properties", {}).get(field)
+
+
+def sort_item_dicts(items, sortby):
+    """Sorts item dictionaries client-side by a STAC sortby specification."""
+    items = list(items)
+    for rule in reversed(sortby):
+        field = rule["field"]
+        present = [i for i in items if _sort_value(i, field) is not None]
+        missing = [i for i in items if _sort_value(i, field) is None]
+        present.sort(key=lambda i: _sort_value(i, field), reverse=rule.get("direction") == "desc")
+        items = present + missing
+    return items
+
+
+def supports_sort(client):
+    from pystac_client.conformance import ConformanceClasses
+    return client.conforms_to(ConformanceClasses.SORT)
+
+
+def iter_item_dicts(client, params, workers=1):
+    """
+    Yields item dictionaries for a search as result pages arrive.
+
+    With `workers > 1` the search is split into sub-queries that are paged
+    concurrently on a thread pool; duplicates across sub-queries (items on a
+    split boundary) are dropped by item id. If the API does not implement the
+    sort extension, sortby and max_items are applied client-side.
+    """
+    if "sortby" in params and not supports_sort(client):
+        unsorted = {k: v for k, v in params.items() if k not in ("sortby", "max_items")}
+        items = sort_item_dicts(iter_item_dicts(client, unsorted, workers), params["sortby"])
+        yield from items[:params.get("max_items")]
+        return
+
+    subqueries = split_params(params, workers)
+    if len(subqueries) == 1:
+        for page in client.search(**subqueries[0]).pages_as_dicts():
+            yield from page.get("features", [])
+        return
+
+    pages = queue.Queue(maxsize=4 * len(subqueries))
+    stop = threading.Event()
+    done = object()
+
+    def _run(sub):
+        try:
+            for page in client.search(**sub).pages_as_dicts():
+                if stop.is_set():
+                    break
+                pages.put(page.get("features", []))
+        except Exception as e:
+            pages.put(e)
+        finally:
+            pages.put(done)
+
+    seen = set()
+    remaining = len(subqueries)
+    executor = ThreadPoolExecutor(max_workers=min(workers, len(subqueries)))
+    try:
+        for sub in subqueries:
+            executor.submit(_run, sub)
+        while remaining:
+            page = pages.get()
+            if page is done:
+                remaining -= 1
+                continue
+            if isinstance(page, Exception):
+                raise page
+            for item in page:
+                if item["id"] not in seen:
+                    seen.add(item["id"])
+                    yield item
+    finally:
+        stop.set()
+        # Unblock workers waiting on a full queue so they can exit
+        while remaining:
+            try:
+                if pages.get(timeout=0.1) is done:
+                    remaining -= 1
+            except queue.Empty:
+                pass
+        executor.shutdown(wait=False)
@@ -0,0 +1,206 @@
+"""
+Lazy, cached signing of Microsoft Planetary Computer asset hrefs.
+
+Planetary Computer assets live in Azure Blob Storage and need a SAS token
+per storage container. Tokens are requested once per container, kept until
+shortly before they expire, and shared by every reader in the process.
+Search results stay unsigned: hrefs are signed when a file is opened for
+reading, so long dask jobs never read with a token fetched at search time,
+and a reader whose token runs out mid-compute re-signs and retries.
+"""
+import os
+import re
+import threading
+import time
+import warnings
+from datetime import datetime
+from urllib.parse import urlparse
+
+from stackstac.nodata_reader import NodataReader, exception_matches, nodata_for_window
+from stackstac.rio_reader import AutoParallelRioReader
+
+TOKEN_URL = "https://planetarycomputer.microsoft.com/api/sas/v1/token"
+
+# Tokens expiring within this many seconds are renewed before use
+REFRESH_MARGIN = 300
+
+_LOCK = threading.Lock()
+_TOKENS = {}
+_FETCH_LOCKS = {}
+_UNSIGNABLE = set()
+
+# Query string of a SAS-signed href, as quoted in GDAL and stackstac messages
+_SAS_QUERY = re.compile(r"\?[^\s'\"]*sig=[^\s'\"]*")
+
+
+def _container(href):
+    """(storage account, container) of an unsigned Azure Blob href, else None."""
+    parsed = urlparse(href)
+    if not parsed.netloc.endswith(".blob.core.windows.net") or "sig=" in parsed.query:
+        return None
+    container = parsed.path.lstrip("/").split("/", 1)[0]
+    return (parsed.netloc.split(".", 1)[0], container) if container else None
+
+
+def _fetch_token(account, container):
+    from .client import get_session, get_timeout
+
+    headers = {}
+    if os.environ.get("PC_SDK_SUBSCRIPTION_KEY"):
+        headers["Ocp-Apim-Subscription-Key"] = os.environ["PC_SDK_SUBSCRIPTION_KEY"]
+    response = get_session().get(f"{TOKEN_URL}/{account}/{container}", headers=headers, timeout=get_timeout())
+    response.raise_for_status()
+    body = response.json()
+    expiry = datetime.fromisoformat(body["msft:expiry"].replace("Z", "+00:00")).timestamp()
+    return body["token"], expiry
+
+
+def get_token(account, container, refresh=False):
+    """
+    SAS token for a storage container and its expiry (epoch seconds), from
+    the cache unless it is missing, about to expire or `refresh` is set.
+    """
+    key = (account, container)
+    with _LOCK:
+        seen = _TOKENS.get(key)
+        if seen is not None and not refresh and seen[1] - time.time() > REFRESH_MARGIN:
+            return seen
+        fetch_lock = _FETCH_LOCKS.setdefault(key, threading.Lock())
+    # One request per container, however many readers need it at once
+    with fetch_lock:
+        with _LOCK:
+            current = _TOKENS.get(key)
+        if current is not None and current is not seen and current[1] - time.time() > REFRESH_MARGIN:
+            # Renewed by another thread while this one waited
+            return current
+        current = _fetch_token(account, container)
+        with _LOCK:
+            _TOKENS[key] = current
+        return current
+
+
+def _sign(href):
+    """Signed href and the expiry of its token; (href, None) if it needs no signing."""
+    key = _container(href)
+    if key is None or key in _UNSIGNABLE:
+        return href, None
+    try:
+        token, expiry = get_token(*key)
+    except Exception as e:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+        if status is not None and 400 <= status < 500 and status != 429:
+            # Not a Planetary Computer container: read it as is from now on
+            _UNSIGNABLE.add(key)
+            return href, None
+        raise
+    return f"{href}{'&' if '?' in href else '?'}{token}", expiry
+
+
+def sign_href(href):
+    """Signs an asset href if it needs a Planetary Computer token; other hrefs are returned unchanged."""
+    return _sign(href)[0]
+
+
+def invalidate(href=None):
+    """Drops the cached token for `href`'s container, or every token."""
+    with _LOCK:
+        if href is None:
+            _TOKENS.clear()
+        else:
+            _TOKENS.pop(_container(href), None)
+
+
+def sign_inplace(obj):
+    """
+    Signs the asset hrefs of a pystac Item or ItemCollection, or of item
+    dictionaries / FeatureCollections, in place with cached tokens.
+    """
+    if isinstance(obj, dict):
+        if obj.get("type") == "FeatureCollection":
+            for feature in obj.get("features", []):
+                sign_inplace(feature)
+        else:
+            for asset in obj.get("assets", {}).values():
+                asset["href"] = sign_href(asset["href"])
+    elif hasattr(obj, "assets"):
+        for asset in obj.assets.values():
+            asset.href = sign_href(asset.href)
+    else:
+        for item in obj:
+            sign_inplace(item)
+    return obj
+
+
+def _is_auth_error(error):
+    message = f"{error} {error.__cause__}"
+    return any(s in message for s in ("403", "AuthenticationFailed", "AuthorizationFailure", "Signature"))
+
+
+class SignedReader(AutoParallelRioReader):
+    """
+    stackstac reader that signs its href when the file is first opened and
+    re-signs it when the token nears expiry or the storage rejects it.
+
+    The signed href is only used to open the file: `url`, pickled state,
+    warnings and errors carry the unsigned one, so tokens don't leak into
+    logs and tracebacks.
+    """
+
+    def __init__(self, *, url, errors_as_nodata=(), **kwargs):
+        # Errors read as nodata are handled here rather than by stackstac,
+        # whose warnings would quote the signed href
+        super().__init__(url=url, **kwargs)
+        self._href = url
+        self._expiry = None
+        self._errors_as_nodata = errors_as_nodata
+
+    def _fail(self, error, window=None):
+        """Nodata for an error in errors_as_nodata, else `error` re-raised without its token."""
+        message = _SAS_QUERY.sub("", str(error))
+        if error.__cause__ is not None and exception_matches(error.__cause__, self._errors_as_nodata):
+            warnings.warn(message)
+            if window is None:
+                return NodataReader(dtype=self.dtype, fill_value=self.fill_value)
+            return nodata_for_window(window, self.fill_value, self.dtype)
+        if message == str(error):
+            raise error
+        # The cause quotes the signed href too
+        raise RuntimeError(message) from None
+
+    def _open(self):
+        # stackstac opens self.url: it holds the signed href only while opening
+        self.url, self._expiry = _sign(self._href)
+        try:
+            return super()._open()
+        except RuntimeError as e:
+            return self._fail(e)
+        finally:
+            self.url = self._href
+
+    def __getstate__(self):
+        # Ship the unsigned href: the receiving worker signs with its own
+        # token cache and keeps tracking the expiry
+        return dict(super().__getstate__(), url=self._href, errors_as_nodata=self._errors_as_nodata)
+
+    def _reopen(self):
+        # The old handle is dropped rather than closed: other threads may
+        # still be reading from it
+        with self._dataset_lock:
+            self._dataset = None
+
+    def read(self, window, **kwargs):
+        if self._expiry is not None and self._expiry - time.time() < REFRESH_MARGIN:
+            self._reopen()
+        try:
+            return super().read(window, **kwargs)
+        except RuntimeError as e:
+            # GDAL reports failed block reads without the HTTP status, so an
+            # expired token is recognized by its expiry time
+            if self._expiry is None or not (_is_auth_error(e) or self._expiry <= time.time()):
+                return self._fail(e, window)
+        invalidate(self._href)
+        self._reopen()
+        try:
+            return super().read(window, **kwargs)
+        except RuntimeError as e:
+            return self._fail(e, window)
@@ -0,0 +1,456 @@
+"""
+Chunk-streaming kernels over (time, band, y, x) stacks.
+
+Each output chunk folds the time slices of its spatial window one batch
+after another instead of holding the whole time axis, which keeps peak
+memory at a few chunks no matter how many scenes are stacked. The reads
+are ordinary graph inputs of the fold, so any dask scheduler (including
+dask.distributed) can place, spill and account for them. On the local
+schedulers a mosaic additionally pulls its time slices on demand so it can
+stop reading once a chunk is filled.
+"""
+import numpy as np
+import dask.array as dsa
+from dask.base import tokenize
+import xarray as xr
+from shapely.geometry import box, shape
+from shapely.ops import transform as shapely_transform
+
+
+def footprints(items, crs):
+    """Projects the footprints of STAC items into `crs` as shapely geometries."""
+    from pyproj import Transformer
+
+    project = Transformer.from_crs("EPSG:4326", crs, always_xy=True).transform
+    result = []
+    for item in items:
+        geom = item.geometry if hasattr(item, "geometry") else item.get("geometry")
+        result.append(shapely_transform(project, shape(geom)) if geom else None)
+    return result
+
+
+def grid_transform(da):
+    """
+    Affine transform of the pixel grid of `da`. stackstac labels pixels by
+    their top-left corner, so its own transform is preferred over one
+    inferred from the coordinates (which assumes pixel centers).
+    """
+    transform = da.attrs.get("transform")
+    if transform is not None:
+        return transform
+    return da.rio.transform()
+
+
+def _chunk_bounds(stack, y0, y1, x0, x1):
+    transform = stack.attrs.get("transform")
+    if transform is None:
+        return None
+    left, top = transform * (x0, y0)
+    right, bottom = transform * (x1, y1)
+    return box(min(left, right), min(top, bottom), max(left, right), max(top, bottom))
+
+
+def _tasks_are_pickled():
+    """True when the active dask scheduler runs tasks in other processes (dask.distributed, processes)."""
+    import dask.base
+    import dask.local
+    import dask.threaded
+
+    return dask.base.get_scheduler() not in (None, dask.threaded.get, dask.local.get_sync)
+
+
+def _as_dask(stack, batch_size=1):
+    """The stack's dask array with at least `batch_size` time slices per chunk."""
+    arr = stack.data
+    if not isinstance(arr, dsa.Array):
+        return dsa.from_array(arr, chunks=(batch_size,) + arr.shape[1:])
+    if max(arr.chunks[0]) < batch_size:
+        arr = arr.rechunk({0: batch_size})
+    return arr
+
+
+def _stage(name, dsk, dependencies, grid):
+    """Dask collection over the tasks `dsk`, keyed (name, *index) on a grid of `grid` blocks."""
+    from dask.highlevelgraph import HighLevelGraph
+
+    graph = HighLevelGraph.from_collections(name, dsk, dependencies=dependencies)
+    return dsa.Array(graph, name, tuple((1,) * n for n in grid), meta=np.empty((0,) * len(grid), dtype=object))
+
+
+def _output(name, dsk, dependencies, chunks, dtype):
+    """Dask array over the tasks `dsk`, whose output blocks are keyed (name, *block index)."""
+    from dask.highlevelgraph import HighLevelGraph
+
+    graph = HighLevelGraph.from_collections(name, dsk, dependencies=dependencies)
+    return dsa.Array(graph, name, chunks, dtype=dtype, meta=np.empty((0,) * len(chunks), dtype=dtype))
+
+
+def map_time_blocks(stack, kernel, dtype, extra=None):
+    """
+    Lazily applies `kernel` to every spatial block of a (time, band, y, x) stack.
+
+    `kernel(read, bounds, shape)` returns a numpy block of shape
+    (*extra, band, y, x). `read(t)` computes the block's window of time step
+    `t` on demand and `bounds` is the window's box in the stack CRS (or None).
+    Returns a dask array with one task per output block.
+
+    The reads are not graph dependencies: each task holds the whole input
+    graph and computes its window synchronously inside the task. That is
+    what lets kernels skip or stop reading, and it is only suitable for the
+    local threaded and synchronous schedulers; `ordered_mosaic` checks
+    `_tasks_are_pickled()` and folds graph inputs instead otherwise.
+    """
+    arr = stack.data
+    if not isinstance(arr, dsa.Array):
+        arr = dsa.from_array(arr, chunks=(1,) + arr.shape[1:])
+    extra = tuple(extra or ())
+    chunks = tuple((n,) for n in extra) + arr.chunks[1:]
+    n_extra = len(extra)
+
+    def _block(template, block_info=None):
+        (b0, b1), (y0, y1), (x0, x1) = block_info[None]["array-location"][n_extra:]
+        window = arr[:, b0:b1, y0:y1, x0:x1]
+
+        def read(t):
+            # Nested synchronous compute: see the scheduler note above
+            return np.asarray(window[t].compute(scheduler="synchronous"))
+
+        return kernel(read, _chunk_bounds(stack, y0, y1, x0, x1), template.shape)
+
+    template = dsa.zeros(extra + arr.shape[1:], chunks=chunks, dtype=bool)
+    return dsa.map_blocks(_block, template, dtype=dtype, meta=np.array((), dtype=dtype))
+
+
+def _as_dataarray(data, stack, extra_dims=None, extra_coords=None):
+    coords = {k: v for k, v in stack.coords.items() if "time" not in v.dims}
+    coords.update(extra_coords or {})
+    dims = tuple(extra_dims or ()) + stack.dims[1:]
+    return xr.DataArray(data, dims=dims, coords=coords, attrs=stack.attrs)
+
+
+def _is_valid(values, nodata):
+    return ~np.isnan(values) if isinstance(nodata, float) and np.isnan(nodata) else values != nodata
+
+
+def _fold_mosaic(state, batch, steps, nodata):
+    """Layers the time slices `steps` of a batch under the pixels already filled."""
+    if state is None:
+        out, filled = np.full(batch.shape[1:], nodata, dtype=batch.dtype), np.zeros(batch.shape[1:], dtype=bool)
+    else:
+        out, filled = state[0].copy(), state[1].copy()
+    for t in steps:
+        valid = _is_valid(batch[t], nodata) & ~filled
+        out[valid] = batch[t][valid]
+        filled |= valid
+    return out, filled
+
+
+def _mosaic_result(state, shape, dtype, nodata):
+    return np.full(shape, nodata, dtype=dtype) if state is None else state[0]
+
+
+def ordered_mosaic(stack, item_footprints=None, nodata=np.nan):
+    """
+    First-valid-pixel mosaic of a (time, band, y, x) stack in priority order.
+
+    Time steps whose footprint (from `item_footprints`, aligned with the
+    time axis) misses a chunk are never read for it. On the local
+    schedulers each chunk reads its time steps one at a time and stops as
+    soon as every pixel is filled. When the active scheduler pickles tasks
+    (dask.distributed, processes; checked when the mosaic is built), the
+    covering time steps are folded as graph inputs instead, without the
+    early stop.
+    """
+    out_dtype = stack.dtype
+
+    def _covers(t, bounds):
+        if item_footprints is None or bounds is None:
+            return True
+        fp = item_footprints[t]
+        return fp is None or fp.intersects(bounds)
+
+    if _tasks_are_pickled():
+        arr = _as_dask(stack)
+        offsets = [np.concatenate([[0], np.cumsum(c)]) for c in arr.chunks]
+        name = "ordered-mosaic-" + tokenize(
+            arr.name, nodata, [None if fp is None else fp.wkb for fp in item_footprints or []]
+        )
+        dsk = {}
+        for b, y, x in np.ndindex(tuple(len(c) for c in arr.chunks[1:])):
+            bounds = _chunk_bounds(stack, offsets[2][y], offsets[2][y + 1], offsets[3][x], offsets[3][x + 1])
+            state = None
+            for ti in range(len(arr.chunks[0])):
+                t0 = offsets[0][ti]
+                steps = [t - t0 for t in range(t0, offsets[0][ti + 1]) if _covers(t, bounds)]
+                if steps:
+                    dsk[(name + "-fold", ti, b, y, x)] = (_fold_mosaic, state, (arr.name, ti, b, y, x), steps, nodata)
+                    state = (name + "-fold", ti, b, y, x)
+            shape = (arr.chunks[1][b], arr.chunks[2][y], arr.chunks[3][x])
+            dsk[(name, b, y, x)] = (_mosaic_result, state, shape, out_dtype, nodata)
+        return _as_dataarray(_output(name, dsk, [arr], arr.chunks[1:], out_dtype), stack)
+
+    n_time = stack.sizes["time"]
+
+    def _kernel(read, bounds, shape):
+        out = np.full(shape, nodata, dtype=out_dtype)
+        filled = np.zeros(shape, dtype=bool)
+        for t in range(n_time):
+            if not _covers(t, bounds):
+                continue
+            piece = read(t)
+            valid = _is_valid(piece, nodata) & ~filled
+            out[valid] = piece[valid]
+            filled |= valid
+            if filled.all():
+                break
+        return out
+
+    data = map_time_blocks(stack, _kernel, out_dtype)
+    return _as_dataarray(data, stack)
+
+
+STREAMING_STATS = ("count", "sum", "mean", "variance", "stdDev", "min", "max", "median")
+
+
+def _parse_stat(stat):
+    """Returns the quantile for 'median'/'pNN' statistics, else None."""
+    if stat == "median":
+        return 0.5
+    if stat.startswith("p") and stat[1:].replace(".", "", 1).isdigit():
+        return float(stat[1:]) / 100
+    if stat not in STREAMING_STATS:
+        raise ValueError(f"Unsupported streaming statistic: {stat}")
+    return None
+
+
+def stream_reduce(stack, stats, batch_size=4, bins=64, passes=2, nodata=np.nan, dtype=None):
+    """
+    Reduces a (time, band, y, x) stack over time with online algorithms.
+
+    Every spatial chunk folds its time slices `batch_size` at a time into
+    accumulators: Welford/Chan updates for mean and variance, running
+    count, sum, min and max. Median and percentiles ('p10', 'p90', ...) come
+    from per-pixel histograms with `bins` bins that are refined over
+    `passes` extra reads, so their error is at most (max - min) / bins ** passes.
+    Peak memory per chunk is a batch of slices plus 2 * bins 16-bit counters
+    per pixel and quantile, independent of the number of scenes.
+
+    The reads are graph inputs of the folds, so this runs on any dask
+    scheduler, which places the reads and accounts for their memory. Each
+    refinement pass reads the stack through its own (cloned) read tasks, so
+    no pass keeps another's slices in memory.
+
+    Accumulators are float64 within a task; results are returned in the
+    configured float dtype (or `dtype`), with a leading 'stat' dimension.
+    """
+    from dask.graph_manipulation import clone
+    from .config import compute_dtype
+
+    out_dtype = compute_dtype(stack.dtype, dtype=dtype)
+    stats = list(stats)
+    quantiles = {s: _parse_stat(s) for s in stats}
+    quantiles = {s: q for s, q in quantiles.items() if q is not None}
+    n_time = stack.sizes["time"]
+    count_dtype = np.uint16 if n_time < np.iinfo(np.uint16).max else np.uint32
+
+    arr = _as_dask(stack, batch_size)
+    n_batch = len(arr.chunks[0])
+    grid = tuple(len(c) for c in arr.chunks[1:])
+    keys = list(np.ndindex(grid))
+    token = tokenize(arr.name, stats, bins, passes, nodata, out_dtype)
+
+    name = "stream-moments-" + token
+    dsk = {}
+    for key in keys:
+        state = None
+        for ti in range(n_batch):
+            dsk[(name, ti) + key] = (_fold_moments, state, (arr.name, ti) + key, nodata)
+            state = (name, ti) + key
+    moments = _stage(name, dsk, [arr], (n_batch,) + grid)
+    dependencies = [moments]
+
+    windows = None
+    if quantiles:
+        name = "stream-windows-0-" + token
+        dsk = {(name, 0) + key: (_start_windows, (moments.name, n_batch - 1) + key, quantiles) for key in keys}
+        windows = _stage(name, dsk, [moments], (1,) + grid)
+        for p in range(passes):
+            # Each pass reads through its own copies of the read tasks, so the
+            # slices of one pass are released instead of being kept for the next
+            again = clone(arr, seed=p)
+            name = f"stream-hist-{p}-{token}"
+            dsk = {}
+            for key in keys:
+                state = (_start_pass, (windows.name, 0) + key, bins, count_dtype)
+                for ti in range(n_batch):
+                    dsk[(name, ti) + key] = (_fold_hist, state, (again.name, ti) + key, nodata, bins)
+                    state = (name, ti) + key
+            hist = _stage(name, dsk, [windows, again], (n_batch,) + grid)
+            name = f"stream-windows-{p + 1}-{token}"
+            dsk = {(name, 0) + key: (_end_pass, (hist.name, n_batch - 1) + key, bins) for key in keys}
+            windows = _stage(name, dsk, [hist], (1,) + grid)
+        dependencies.append(windows)
+
+    name = "stream-reduce-" + token
+    dsk = {(name, 0) + key: (_finish_stats, (moments.name, n_batch - 1) + key,
+                             None if windows is None else (windows.name, 0) + key, stats, out_dtype)
+           for key in keys}
+    data = _output(name, dsk, dependencies, ((len(stats),),) + arr.chunks[1:], out_dtype)
+    return _as_dataarray(data, stack, extra_dims=("stat",), extra_coords={"stat": stats})
+
+
+def _load(batch, nodata):
+    """A time batch as float64 with nodata as NaN."""
+    x = np.array(batch, dtype=np.float64)
+    if not (isinstance(nodata, float) and np.isnan(nodata)):
+        x[x == nodata] = np.nan
+    return x
+
+
+def _fold_moments(state, batch, nodata):
+    """Folds a time batch into running count, mean, M2, min and max with Chan's parallel update."""
+    x = _load(batch, nodata)
+    if state is None:
+        shape = x.shape[1:]
+        state = {"count": np.zeros(shape, dtype=np.int64), "mean": np.zeros(shape), "m2": np.zeros(shape),
+                 "min": np.full(shape, np.inf), "max": np.full(shape, -np.inf)}
+    valid = ~np.isnan(x)
+    n_b = valid.sum(axis=0)
+    if not n_b.any():
+        return state
+    count, mean = state["count"], state["mean"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_b = np.where(n_b > 0, np.nansum(x, axis=0) / np.maximum(n_b, 1), 0.0)
+        m2_b = np.nansum((x - mean_b) ** 2, axis=0)
+        n = count + n_b
+        delta = mean_b - mean
+        safe_n = np.maximum(n, 1)
+        return {
+            "count": n,
+            "mean": mean + delta * n_b / safe_n,
+            "m2": state["m2"] + m2_b + delta ** 2 * count * n_b / safe_n,
+            "min": np.fmin(state["min"], np.nanmin(np.where(valid, x, np.inf), axis=0)),
+            "max": np.fmax(state["max"], np.nanmax(np.where(valid, x, -np.inf), axis=0)),
+        }
+
+
+def _start_windows(moments, quantiles):
+    return _quantile_windows(quantiles, moments["count"].ravel(), moments["min"].ravel(), moments["max"].ravel())
+
+
+def _start_pass(windows, bins, count_dtype):
+    """Copies of the search windows with empty histograms for the next refinement pass."""
+    state, weights, has_data = windows
+    fresh = {}
+    for key, st in state.items():
+        st = dict(st, width=(st["hi"] - st["lo"]) / bins)
+        st["hist"] = np.zeros((bins, st["lo"].size), dtype=count_dtype)
+        st["below"] = np.zeros(st["lo"].size, dtype=np.int64)
+        fresh[key] = st
+    return fresh, weights, has_data
+
+
+def _fold_hist(windows, batch, nodata, bins):
+    """Adds a time batch to the histogram of every search window."""
+    # The histograms are large and belong to this chunk's pass alone, so
+    # they are updated in place rather than copied for every batch
+    state = windows[0]
+    x = _load(batch, nodata)
+    npix = x[0].size
+    pix = np.arange(npix)
+    for values in x.reshape(len(x), npix):
+        ok = ~np.isnan(values)
+        for st in state.values():
+            lo, hi = st["lo"], st["hi"]
+            st["below"] += ok & (values < lo)
+            inside = ok & (values >= lo) & (values < hi)
+            idx = ((values[inside] - lo[inside]) / st["width"][inside]).astype(np.int64)
+            st["hist"][np.clip(idx, 0, bins - 1), pix[inside]] += 1
+    return windows
+
+
+def _end_pass(windows, bins):
+    for st in windows[0].values():
+        _narrow_window(st, bins)
+    return windows
+
+
+def _finish_stats(moments, windows, stats, dtype):
+    """(stat, band, y, x) block of the requested statistics from the folded accumulators."""
+    count, mean, m2 = moments["count"], moments["mean"], moments["m2"]
+    empty = count == 0
+    results = {}
+    if windows is not None:
+        results.update({s: v.reshape(count.shape) for s, v in _quantile_estimates(*windows).items()})
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Population variance, as ee.Reducer.variance()
+        variance = np.where(count > 0, m2 / np.maximum(count, 1), np.nan)
+    results["count"] = count.astype(np.float64)
+    results["sum"] = np.where(empty, np.nan, mean * count)
+    results["mean"] = np.where(empty, np.nan, mean)
+    results["variance"] = variance
+    results["stdDev"] = np.sqrt(variance)
+    results["min"] = np.where(empty, np.nan, moments["min"])
+    results["max"] = np.where(empty, np.nan, moments["max"])
+    return np.stack([results[s] for s in stats]).astype(dtype)
+
+
+def _quantile_windows(quantiles, count, vmin, vmax):
+    """
+    Initial search windows, one per quantile and side, for histogram
+    quantiles over flat arrays of per-element count, min and max.
+    Returns (state, weights, has_data).
+    """
+    has_data = count > 0
+    lo = np.where(has_data, vmin, 0.0)
+    hi = np.where(has_data, vmax, 1.0)
+    # Widen the top edge a hair so the maximum falls inside the last bin
+    hi = hi + np.maximum(np.abs(hi), 1.0) * 1e-9
+
+    # Quantiles between two order statistics interpolate linearly like
+    # numpy, so each quantile tracks the ranks on both sides.
+    state = {}
+    weights = {}
+    for stat, q in quantiles.items():
+        rank = q * np.maximum(count - 1, 0)
+        weights[stat] = rank - np.floor(rank)
+        for side, target in (("floor", np.floor(rank)), ("ceil", np.ceil(rank))):
+            state[(stat, side)] = {"target": target, "lo": lo, "hi": hi, "estimate": lo}
+    return state, weights, has_data
+
+
+def _narrow_window(st, bins):
+    """
+    Narrows a search window to the bin of its (bins, n) histogram `hist`
+    holding the target rank; `below` counts the values under the window.
+    """
+    n = st["hist"].shape[1]
+    idx = np.arange(n)
+    # Walk the bins to find the one whose cumulative count passes the target rank
+    cum = st["below"].copy()
+    before = st["below"].copy()
+    j = np.full(n, bins - 1)
+    found = np.zeros(n, dtype=bool)
+    for b in range(bins):
+        nxt = cum + st["hist"][b]
+        hit = ~found & (nxt > st["target"])
+        j[hit] = b
+        before[hit] = cum[hit]
+        found |= hit
+        cum = nxt
+    before[~found] = (cum - st["hist"][bins - 1])[~found]
+    in_bin = st["hist"][j, idx].astype(np.float64)
+    frac = np.where(in_bin > 0, (st["target"] - before + 0.5) / np.maximum(in_bin, 1), 0.5)
+    new_lo = st["lo"] + j * st["width"]
+    st["estimate"] = new_lo + np.clip(frac, 0, 1) * st["width"]
+    st["lo"], st["hi"] = new_lo, new_lo + st["width"]
+    del st["hist"]
+
+
+def _quantile_estimates(state, weights, has_data):
+    """Interpolated quantiles from refined windows; NaN where there is no data."""
+    results = {}
+    for stat, weight in weights.items():
+        low, high = state[(stat, "floor")]["estimate"], state[(stat, "ceil")]["estimate"]
+        results[stat] = np.where(has_data, low + weight * (high - low), np.nan)
+    return results
@@ -0,0 +1,516 @@
+"""
+On-demand XYZ tiles for lazy images.
+
+A small HTTP server renders web-mercator PNG tiles straight from an Image's
+dask graph: each request reads only the pixels under that tile, at low zoom
+from a coarser grid (COG overviews when the image knows its source), applies
+the visualization parameters and keeps the encoded PNG in an LRU cache. Maps
+therefore draw in seconds however large the image is.
+
+Feature collections are served the same way as GeoJSON tiles: features are
+found through an STRtree, simplified to the zoom's pixel size (once per
+feature and zoom), clipped to the requested area and serialized with their
+properties, so the browser only ever receives what is on screen.
+"""
+import math
+import struct
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import numpy as np
+
+TILE_SIZE = 256
+_ORIGIN = math.pi * 6378137.0
+
+
+def encode_png(rgba):
+    """Encodes an (h, w, 4) uint8 array as an RGBA PNG."""
+    height, width = rgba.shape[:2]
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(height, -1)
+
+    def _chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + _chunk(b"IHDR", header)
+            + _chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + _chunk(b"IEND", b""))
+
+
+_EMPTY_TILE = encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+
+def tile_bounds(z, x, y):
+    """Web-mercator (EPSG:3857) bounds of tile z/x/y."""
+    size = 2 * _ORIGIN / 2 ** z
+    minx = -_ORIGIN + x * size
+    maxy = _ORIGIN - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+def tile_resolution(z, lat=0.0):
+    """Ground size in meters of a zoom-z pixel at latitude `lat` (the equator by default)."""
+    return 2 * _ORIGIN / 2 ** z / TILE_SIZE * math.cos(math.radians(lat))
+
+
+_NAMED_COLORS = {
+    "black": "000000", "white": "ffffff", "red": "ff0000", "green": "008000", "blue": "0000ff",
+    "yellow": "ffff00", "cyan": "00ffff", "magenta": "ff00ff", "orange": "ffa500", "purple": "800080",
+    "brown": "a52a2a", "gray": "808080", "grey": "808080", "darkgreen": "006400", "lime": "00ff00",
+    "navy": "000080", "pink": "ffc0cb",
+}
+
+
+def _color(value):
+    if isinstance(value, str):
+        code = _NAMED_COLORS.get(value.lower(), value).lstrip("#")
+        if len(code) == 6 and all(c in "0123456789abcdefABCDEF" for c in code):
+            return tuple(int(code[i:i + 2], 16) for i in (0, 2, 4))
+        from matplotlib.colors import to_rgb
+        return tuple(int(round(c * 255)) for c in to_rgb(value))
+    return tuple(int(c) for c in value[:3])
+
+
+def palette_lut(palette):
+    """
+    256-entry RGB lookup table from a palette: a list of colors (hex with or
+    without '#', or names), a comma-separated string of them, or a
+    matplotlib colormap name.
+    """
+    if isinstance(palette, str) and "," in palette:
+        palette = [c.strip() for c in palette.split(",")]
+    if isinstance(palette, str):
+        try:
+            palette = [_color(palette)]
+        except ValueError:
+            import matplotlib
+            cmap = matplotlib.colormaps[palette]
+            return (cmap(np.linspace(0, 1, 256))[:, :3] * 255).round().astype(np.uint8)
+    colors = np.array([_color(c) for c in palette], dtype=float)
+    if len(colors) == 1:
+        return np.repeat(colors.astype(np.uint8), 256, axis=0)
+    stops = np.linspace(0, 1, len(colors))
+    ramp = np.linspace(0, 1, 256)
+    return np.stack([np.interp(ramp, stops, colors[:, i]) for i in range(3)], axis=1).round().astype(np.uint8)
+
+
+def render(values, vis_params):
+    """
+    Renders a (band, h, w) float array (1 or 3 bands, NaN for no data) to
+    RGBA following Earth Engine's vis_params: min, max (scalars or per band),
+    gamma and palette (single band only).
+    """
+    n_band = values.shape[0]
+    vmin = np.asarray(vis_params.get("min", 0), dtype=np.float32).reshape(-1, 1, 1)
+    vmax = np.asarray(vis_params.get("max", 1), dtype=np.float32).reshape(-1, 1, 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scaled = np.clip((values - vmin) / (vmax - vmin), 0, 1)
+    gamma = vis_params.get("gamma")
+    if gamma is not None:
+        scaled = scaled ** (1 / np.asarray(gamma, dtype=np.float32).reshape(-1, 1, 1))
+    valid = np.isfinite(values).all(axis=0)
+    levels = np.nan_to_num(scaled * 255).round().astype(np.uint8)
+
+    rgba = np.zeros(values.shape[1:] + (4,), dtype=np.uint8)
+    if n_band == 1:
+        palette = vis_params.get("palette")
+        if palette is not None:
+            rgba[..., :3] = palette_lut(palette)[levels[0]]
+        else:
+            rgba[..., :3] = levels[0][..., None]
+    else:
+        rgba[..., :3] = np.moveaxis(levels[:3], 0, -1)
+    rgba[..., 3] = np.where(valid, 255, 0)
+    return rgba
+
+
+class TileCache:
+    """Thread-safe LRU of encoded tiles, bounded by total size in bytes."""
+
+    def __init__(self, max_size=256 * 1024 ** 2):
+        self.max_size = max_size
+        self._tiles = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is None:
+                self.misses += 1
+                return None
+            self._tiles.move_to_end(key)
+            self.hits += 1
+            return tile
+
+    def set(self, key, tile):
+        with self._lock:
+            if key in self._tiles:
+                self._size -= len(self._tiles.pop(key))
+            self._tiles[key] = tile
+            self._size += len(tile)
+            while self._size > self.max_size and self._tiles:
+                _, old = self._tiles.popitem(last=False)
+                self._size -= len(old)
+
+    def discard(self, layer_id):
+        with self._lock:
+            for key in [k for k in self._tiles if k[0] == layer_id]:
+                self._size -= len(self._tiles.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+            self._size = 0
+
+
+def _center_latitude(da):
+    """Latitude of the center of a georeferenced DataArray, or 0 (the equator) if unknown."""
+    try:
+        _, south, _, north = da.rio.transform_bounds("EPSG:4326")
+    except Exception:
+        return 0.0
+    return max(min((south + north) / 2, 85.0), -85.0) if np.isfinite([south, north]).all() else 0.0
+
+
+class _Layer:
+    """An image prepared for tiling: bands selected, plus one grid per zoom level."""
+
+    def __init__(self, image, vis_params):
+        vis_params = dict(vis_params or {})
+        bands = vis_params.get("bands")
+        if isinstance(bands, str):
+            bands = [b.strip() for b in bands.split(",")]
+        da = image._da
+        band_dim = next((d for d in ("band", "bands") if d in da.dims), "band")
+        if not bands and band_dim in da.dims and da.sizes[band_dim] not in (1, 3):
+            # Earth Engine draws the first band when no band choice is given
+            bands = [da[band_dim].values[0].item()]
+        if bands:
+            image = image.select(bands)
+        if "time" in image._da.dims:
+            raise ValueError("Cannot tile an image with a time dimension; reduce or mosaic it first.")
+
+        self.image = image
+        self.band_dim = band_dim
+        self.vis_params = vis_params
+        self._lat = _center_latitude(image._da)
+        self._levels = {}
+        self._lock = threading.Lock()
+
+    def at_zoom(self, z):
+        """(DataArray, transform, crs) on a grid matching the ground resolution of zoom z."""
+        from .streaming import grid_transform
+
+        with self._lock:
+            level = self._levels.get(z)
+            if level is None:
+                # One grid per zoom, at the image's own latitude: it does not
+                # depend on which tile happens to be requested first
+                image = self.image._for_scale(tile_resolution(z, self._lat))
+                da = image._da
+                if self.band_dim not in da.dims:
+                    da = da.expand_dims(self.band_dim)
+                da = da.transpose(self.band_dim, "y", "x")
+                level = (da, grid_transform(da), da.rio.crs)
+                self._levels[z] = level
+        return level
+
+
+_EMPTY_GEOJSON = b'{"type":"FeatureCollection","features":[]}'
+
+
+class _VectorLayer:
+    """A feature collection prepared for tiling: web-mercator geometries, an STRtree and per-zoom simplifications."""
+
+    def __init__(self, gdf, max_features=10000):
+        import json
+        import shapely
+
+        if gdf.crs is None:
+            gdf = gdf.set_crs("EPSG:4326")
+        gdf = gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty]
+        self._geoms = np.asarray(gdf.geometry.to_crs("EPSG:3857").values, dtype=object)
+        self._tree = shapely.STRtree(self._geoms)
+        bounds = shapely.bounds(self._geoms)
+        self._extent = np.maximum(bounds[:, 2] - bounds[:, 0], bounds[:, 3] - bounds[:, 1])
+        self._is_point = shapely.get_type_id(self._geoms) == 0
+        columns = gdf.drop(columns=gdf.geometry.name)
+        # pandas writes no records at all for a frame without columns
+        records = (json.loads(columns.to_json(orient="records", date_format="iso", default_handler=str))
+                   if len(columns.columns) else [{}] * len(gdf))
+        self._properties = np.array([json.dumps(r) for r in records], dtype=object)
+        self._ids = np.array([json.dumps(i, default=str) for i in gdf.index.tolist()], dtype=object)
+        self.max_features = max_features
+        self._simplified = {}
+        self._lock = threading.Lock()
+
+    def _at_zoom(self, z, ids, pixel):
+        import shapely
+
+        with self._lock:
+            simplified = self._simplified.setdefault(z, np.full(len(self._geoms), None, dtype=object))
+            missing = ids[np.equal(simplified[ids], None)]
+            if len(missing):
+                simplified[missing] = shapely.simplify(self._geoms[missing], pixel / 2, preserve_topology=True)
+            return simplified[ids]
+
+    def features(self, z, bounds):
+        """GeoJSON bytes of the features within web-mercator `bounds`, simplified for zoom z and clipped to them."""
+        import shapely
+        from pyproj import Transformer
+
+        pixel = 2 * _ORIGIN / 2 ** z / TILE_SIZE
+        ids = np.sort(self._tree.query(shapely.box(*bounds)))
+        if self.max_features and len(ids) > self.max_features:
+            # Too dense to draw: keep the largest features, as vector tilers do
+            ids = np.sort(ids[np.argpartition(-self._extent[ids], self.max_features)[:self.max_features]])
+        if not len(ids):
+            return _EMPTY_GEOJSON
+        # Features smaller than half a pixel would vanish at this zoom, so
+        # they are drawn as a point inside them instead
+        tiny = (self._extent[ids] < pixel / 2) & ~self._is_point[ids]
+        geoms = np.empty(len(ids), dtype=object)
+        geoms[~tiny] = self._at_zoom(z, ids[~tiny], pixel)
+        geoms[tiny] = shapely.point_on_surface(self._geoms[ids[tiny]])
+        geoms = shapely.clip_by_rect(geoms, *bounds)
+        keep = ~shapely.is_empty(geoms)
+        ids, geoms = ids[keep], geoms[keep]
+        if not len(ids):
+            return _EMPTY_GEOJSON
+
+        # Degrees rounded to a tenth of a pixel keep the payload small
+        decimals = max(int(math.ceil(-math.log10(360 / 2 ** z / TILE_SIZE / 10))), 0)
+        to_lonlat = Transformer.from_crs("EPSG:3857", "EPSG:4326", always_xy=True)
+
+        def _project(coords):
+            lon, lat = to_lonlat.transform(coords[:, 0], coords[:, 1])
+            return np.round(np.column_stack([lon, lat]), decimals)
+
+        geometries = shapely.to_geojson(shapely.transform(geoms, _project))
+        features = ",".join(
+            f'{{"type":"Feature","id":{self._ids[i]},'
+            f'"properties":{self._properties[i]},"geometry":{g}}}'
+            for i, g in zip(ids, geometries)
+        )
+        return f'{{"type":"FeatureCollection","features":[{features}]}}'.encode("utf-8")
+
+
+def _tile_range(z, bounds):
+    """Tiles (x0, y0, x1, y1) covering lon/lat `bounds` at zoom z."""
+    west, south, east, north = bounds
+    n = 2 ** z
+
+    def _tile(lon, lat):
+        lat = min(max(lat, -85.0511), 85.0511)
+        x = int((lon + 180) / 360 * n)
+        y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+        return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+    if east < west:
+        west, east = -180, 180
+    x0, y0 = _tile(west, north)
+    x1, y1 = _tile(east, south)
+    return x0, y0, x1, y1
+
+
+def render_tile(layer, z, x, y):
+    """Renders tile z/x/y of `layer` to PNG bytes, reading only the pixels it covers."""
+    from rasterio.transform import from_bounds
+    from rasterio.warp import reproject, transform_bounds, Resampling
+    from affine import Affine
+    from .masking import _window
+
+    da, transform, crs = layer.at_zoom(z)
+    bounds = tile_bounds(z, x, y)
+    try:
+        src_bounds = transform_bounds("EPSG:3857", crs, *bounds, densify_pts=21)
+    except Exception:
+        return _EMPTY_TILE
+    r0, r1, c0, c1 = _window(transform, src_bounds, da.sizes["y"], da.sizes["x"])
+    if r1 <= r0 or c1 <= c0:
+        return _EMPTY_TILE
+    # One pixel of margin so nearest-neighbour sampling at the tile edge has a source
+    r0, c0 = max(r0 - 1, 0), max(c0 - 1, 0)
+    r1, c1 = min(r1 + 1, da.sizes["y"]), min(c1 + 1, da.sizes["x"])
+
+    window = da.isel(y=slice(r0, r1), x=slice(c0, c1))
+    values = np.asarray(window.values, dtype=np.float32)
+    nodata = window.rio.nodata
+    if nodata is not None and not np.isnan(nodata):
+        values[values == nodata] = np.nan
+
+    tile = np.full((values.shape[0], TILE_SIZE, TILE_SIZE), np.nan, dtype=np.float32)
+    reproject(
+        values, tile,
+        src_transform=transform * Affine.translation(c0, r0), src_crs=crs, src_nodata=np.nan,
+        dst_transform=from_bounds(*bounds, TILE_SIZE, TILE_SIZE), dst_crs="EPSG:3857", dst_nodata=np.nan,
+        resampling=Resampling.nearest,
+    )
+    if not np.isfinite(tile).any():
+        return _EMPTY_TILE
+    return encode_png(render(tile, layer.vis_params))
+
+
+class TileServer:
+    """
+    Local HTTP server for XYZ tiles of registered images, at
+    `{url}/tiles/{layer_id}/{z}/{x}/{y}.png`, and GeoJSON tiles of registered
+    feature collections, at `{url}/vector/{layer_id}/{z}/{x}/{y}.geojson`.
+
+    The server starts on first use in a daemon thread. Behind a proxy (e.g.
+    jupyter-server-proxy) pass the public `url` under which the port is
+    reachable from the browser.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, cache_size=256 * 1024 ** 2, url=None):
+        self.host = host
+        self.port = port
+        self.cache = TileCache(cache_size)
+        self._url = url
+        self._layers = {}
+        self._server = None
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        self.start()
+        return (self._url or f"http://{self.host}:{self.port}").rstrip("/")
+
+    def start(self):
+        with self._lock:
+            if self._server is not None:
+                return self
+            server = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def log_message(self, *args):
+                    pass
+
+                def do_GET(self):
+                    parts = self.path.split("?")[0].strip("/").split("/")
+                    routes = {"tiles": (".png", server.tile, "image/png"),
+                              "vector": (".geojson", server.vector_tile, "application/geo+json")}
+                    if len(parts) != 5 or parts[0] not in routes or not parts[4].endswith(routes[parts[0]][0]):
+                        return self.send_error(404)
+                    suffix, handler, content_type = routes[parts[0]]
+                    try:
+                        z, x, y = int(parts[2]), int(parts[3]), int(parts[4][:-len(suffix)])
+                    except ValueError:
+                        return self.send_error(404)
+                    try:
+                        body = handler(parts[1], z, x, y)
+                    except KeyError:
+                        return self.send_error(404, "Unknown layer")
+                    except Exception as e:
+                        print(f"Warning: tile {z}/{x}/{y} failed: {e}")
+                        return self.send_error(500)
+                    self.send_response(200)
+                    self.send_header("Content-Type", content_type)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.send_header("Access-Control-Allow-Origin", "*")
+                    self.send_header("Cache-Control", "max-age=3600")
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+            self._server.daemon_threads = True
+            self.port = self._server.server_address[1]
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        with self._lock:
+            if self._server is not None:
+                self._server.shutdown()
+                self._server.server_close()
+                self._server = None
+
+    def add(self, image, vis_params=None):
+        """Registers an og.Image with its vis_params and returns its tile URL template."""
+        layer_id = uuid.uuid4().hex[:12]
+        self._layers[layer_id] = _Layer(image, vis_params)
+        return f"{self.url}/tiles/{layer_id}/{{z}}/{{x}}/{{y}}.png"
+
+    def add_vector(self, collection, max_features=10000):
+        """
+        Registers an og.FeatureCollection (or GeoDataFrame) for GeoJSON tiles
+        and viewport queries, and returns its layer id. At most `max_features`
+        (the largest) are returned per tile or view.
+        """
+        gdf = collection._gdf if hasattr(collection, "_gdf") else collection
+        layer_id = uuid.uuid4().hex[:12]
+        self._layers[layer_id] = _VectorLayer(gdf, max_features)
+        return layer_id
+
+    def remove(self, layer_id):
+        """Unregisters a layer and drops its cached tiles."""
+        self._layers.pop(layer_id, None)
+        self.cache.discard(layer_id)
+
+    def tile(self, layer_id, z, x, y):
+        """PNG bytes of tile z/x/y of a registered layer, from the cache when possible."""
+        layer = self._layers[layer_id]
+        key = (layer_id, z, x, y)
+        body = self.cache.get(key)
+        if body is None:
+            body = render_tile(layer, z, x, y)
+            self.cache.set(key, body)
+        return body
+
+    def vector_tile(self, layer_id, z, x, y):
+        """GeoJSON bytes of tile z/x/y of a registered feature collection."""
+        layer = self._layers[layer_id]
+        key = (layer_id, z, x, y, "geojson")
+        body = self.cache.get(key)
+        if body is None:
+            # A few pixels of margin hide the clipped edges under the neighbouring tile
+            pixel = 2 * _ORIGIN / 2 ** z / TILE_SIZE
+            minx, miny, maxx, maxy = tile_bounds(z, x, y)
+            body = layer.features(z, (minx - 4 * pixel, miny - 4 * pixel, maxx + 4 * pixel, maxy + 4 * pixel))
+            self.cache.set(key, body)
+        return body
+
+    def viewport(self, layer_id, z, bounds):
+        """
+        GeoJSON bytes of a registered feature collection for a map view:
+        lon/lat `bounds` (west, south, east, north) at zoom z. The view is
+        widened to whole tiles plus a tile of margin, so small pans hit the
+        cache and clipped edges stay off screen.
+        """
+        layer = self._layers[layer_id]
+        x0, y0, x1, y1 = _tile_range(z, bounds)
+        n = 2 ** z
+        x0, y0, x1, y1 = max(x0 - 1, 0), max(y0 - 1, 0), min(x1 + 1, n - 1), min(y1 + 1, n - 1)
+        key = (layer_id, z, x0, y0, x1, y1, "view")
+        body = self.cache.get(key)
+        if body is None:
+            minx, _, _, maxy = tile_bounds(z, x0, y0)
+            _, miny, maxx, _ = tile_bounds(z, x1, y1)
+            body = layer.features(z, (minx, miny, maxx, maxy))
+            self.cache.set(key, body)
+        return body
+
+    def __repr__(self):
+        return f"og.TileServer(url={self._url or f'http://{self.host}:{self.port}'!r}, layers={len(self._layers)})"
+
+
+_SERVER = TileServer()
+
+
+def get_tile_server():
+    """Internal helper returning the process-wide tile server."""
+    return _SERVER
+
+
+def configure_tile_server(host="127.0.0.1", port=0, cache_size=256 * 1024 ** 2, url=None):
+    """Replaces the process-wide tile server, e.g. to bind a fixed port or set a proxy URL."""
+    global _SERVER
+    _SERVER.stop()
+    _SERVER = TileServer(host=host, port=port, cache_size=cache_size, url=url)
+    return _SERVER
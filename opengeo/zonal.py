@@ -0,0 +1,230 @@
+"""
+Grouped (zonal) statistics of an image over many geometries in one pass.
+
+Zones are rasterized onto the image grid inside each chunk's task, so the
+image is read once no matter how many zones there are, and chunks that no
+zone touches are never read at all. Per-zone partial results are merged
+with the same Chan updates used by the streaming reducers, and median and
+percentiles come from per-zone histograms refined over extra reads, as in
+the streaming reducers, so memory is bounded by the number of zones rather
+than the number of pixels.
+"""
+import numpy as np
+import dask
+import dask.array as dsa
+import shapely
+from affine import Affine
+from shapely.geometry import box
+
+from .streaming import (_narrow_window, _parse_stat, _quantile_estimates, _quantile_windows,
+                        grid_transform)
+
+ZONAL_STATS = ("count", "sum", "mean", "variance", "stdDev", "min", "max")
+
+
+def overlap_layers(geoms):
+    """
+    Assigns geometries to layers so that no two geometries in a layer overlap.
+    Zones sharing only an edge stay in the same layer; a pixel is then
+    claimed by the zone containing its center, as in Earth Engine.
+    """
+    layers = np.zeros(len(geoms), dtype=np.int64)
+    left, right = geoms.sindex.query(geoms.values, predicate="intersects")
+    keep = left < right
+    left, right = left[keep], right[keep]
+    if len(left):
+        values = geoms.values
+        touching = shapely.touches(values[left], values[right])
+        left, right = left[~touching], right[~touching]
+    if not len(left):
+        return layers
+
+    neighbors = {}
+    for a, b in zip(left, right):
+        neighbors.setdefault(b, []).append(a)
+    for i in sorted(neighbors):
+        used = {layers[j] for j in neighbors[i]}
+        layer = 0
+        while layer in used:
+            layer += 1
+        layers[i] = layer
+    return layers
+
+
+def _block_zones(transform, shape, geoms, layers):
+    """Yields (selected zones, flat 1-based labels, inside mask) per overlap layer of a block."""
+    from rasterio.features import rasterize
+
+    for layer in np.unique(layers):
+        sel = np.flatnonzero(layers == layer)
+        labels = rasterize(
+            zip([geoms[i] for i in sel], range(1, len(sel) + 1)),
+            out_shape=shape, transform=transform, fill=0, dtype="int32"
+        ).ravel()
+        inside = labels > 0
+        if inside.any():
+            yield sel, labels, inside
+
+
+def _block_stats(block, transform, geoms, ids, layers):
+    """Per-zone partial statistics of one (band, y, x) block."""
+    block = np.asarray(block, dtype=np.float64)
+    n_band, h, w = block.shape
+    parts = []
+    for sel, labels, inside in _block_zones(transform, (h, w), geoms, layers):
+        k = len(sel)
+        count = np.zeros((n_band, k))
+        mean = np.zeros((n_band, k))
+        m2 = np.zeros((n_band, k))
+        vmin = np.full((n_band, k), np.inf)
+        vmax = np.full((n_band, k), -np.inf)
+        for b in range(n_band):
+            v = block[b].ravel()
+            ok = inside & ~np.isnan(v)
+            lab = labels[ok] - 1
+            v = v[ok]
+            count[b] = np.bincount(lab, minlength=k)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean[b] = np.bincount(lab, v, minlength=k) / np.maximum(count[b], 1)
+            m2[b] = np.bincount(lab, (v - mean[b][lab]) ** 2, minlength=k)
+            np.minimum.at(vmin[b], lab, v)
+            np.maximum.at(vmax[b], lab, v)
+        parts.append((ids[sel], count, mean, m2, vmin, vmax))
+    return parts
+
+
+def _block_hist(block, transform, geoms, ids, layers, windows, bins):
+    """
+    Per-zone histograms of one (band, y, x) block over the quantile search
+    windows {key: (lo, width)}, each (band, zone) for the block's zones.
+    """
+    block = np.asarray(block, dtype=np.float64)
+    n_band, h, w = block.shape
+    parts = []
+    for sel, labels, inside in _block_zones(transform, (h, w), geoms, layers):
+        k = len(sel)
+        counts = {}
+        for key, (lo, width) in windows.items():
+            below = np.zeros((n_band, k), dtype=np.int64)
+            hist = np.zeros((n_band, k, bins), dtype=np.int64)
+            for b in range(n_band):
+                v = block[b].ravel()
+                ok = inside & ~np.isnan(v)
+                lab = labels[ok] - 1
+                v = v[ok]
+                start = lo[b, sel][lab]
+                step = width[b, sel][lab]
+                below[b] = np.bincount(lab[v < start], minlength=k)
+                within = (v >= start) & (v < start + bins * step)
+                idx = np.clip(((v[within] - start[within]) / step[within]).astype(np.int64), 0, bins - 1)
+                hist[b] = np.bincount(lab[within] * bins + idx, minlength=k * bins).reshape(k, bins)
+            counts[key] = (below, hist)
+        parts.append((ids[sel], counts))
+    return parts
+
+
+def zonal_stats(da, geoms, stats, bins=64, passes=2):
+    """
+    Computes `stats` of a (band, y, x) DataArray for every geometry in the
+    GeoSeries `geoms` (already in the image CRS). Returns {stat: array of
+    shape (band, zone)}; zones without valid pixels get NaN (count 0).
+
+    Median and percentiles ('p90', ...) come from per-zone histograms with
+    `bins` bins refined over `passes` extra reads of the zones' chunks, so
+    their error is at most (max - min) / bins ** passes per zone.
+    """
+    quantiles = {s: _parse_stat(s) for s in stats}
+    for s in stats:
+        if quantiles[s] is None and s not in ZONAL_STATS:
+            raise ValueError(f"Unsupported zonal statistic: {s}")
+    quantiles = {s: q for s, q in quantiles.items() if q is not None}
+
+    arr = da.data
+    if not isinstance(arr, dsa.Array):
+        arr = dsa.from_array(arr, chunks=arr.shape)
+    transform = grid_transform(da)
+    layers = overlap_layers(geoms)
+    values = geoms.values
+    sindex = geoms.sindex
+    offsets = [np.concatenate([[0], np.cumsum(c)]) for c in arr.chunks]
+
+    jobs = []
+    blocks = arr.to_delayed()
+    for bi in range(len(arr.chunks[0])):
+        for yi in range(len(arr.chunks[1])):
+            for xi in range(len(arr.chunks[2])):
+                y0, y1 = offsets[1][yi], offsets[1][yi + 1]
+                x0, x1 = offsets[2][xi], offsets[2][xi + 1]
+                left, top = transform * (x0, y0)
+                right, bottom = transform * (x1, y1)
+                bounds = box(min(left, right), min(top, bottom), max(left, right), max(top, bottom))
+                hits = sindex.query(bounds, predicate="intersects")
+                if not len(hits):
+                    # No zone touches this chunk, so it is never read
+                    continue
+                jobs.append((
+                    slice(offsets[0][bi], offsets[0][bi + 1]), blocks[bi, yi, xi],
+                    transform * Affine.translation(x0, y0), [values[i] for i in hits], hits, layers[hits]
+                ))
+
+    n_band, n_zones = arr.shape[0], len(geoms)
+    count = np.zeros((n_band, n_zones))
+    mean = np.zeros((n_band, n_zones))
+    m2 = np.zeros((n_band, n_zones))
+    vmin = np.full((n_band, n_zones), np.inf)
+    vmax = np.full((n_band, n_zones), -np.inf)
+
+    tasks = [dask.delayed(_block_stats)(*job[1:]) for job in jobs]
+    for (band, *_), parts in zip(jobs, dask.compute(*tasks)):
+        for ids, n_b, mean_b, m2_b, min_b, max_b in parts:
+            n_a = count[band, ids]
+            n = n_a + n_b
+            safe_n = np.maximum(n, 1)
+            delta = mean_b - mean[band, ids]
+            mean[band, ids] += delta * n_b / safe_n
+            m2[band, ids] += m2_b + delta ** 2 * n_a * n_b / safe_n
+            count[band, ids] = n
+            vmin[band, ids] = np.fmin(vmin[band, ids], min_b)
+            vmax[band, ids] = np.fmax(vmax[band, ids], max_b)
+
+    empty = count == 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = np.where(empty, np.nan, m2 / np.maximum(count, 1))
+    results = {
+        "count": count,
+        "sum": np.where(empty, np.nan, mean * count),
+        "mean": np.where(empty, np.nan, mean),
+        "variance": variance,
+        "stdDev": np.sqrt(variance),
+        "min": np.where(empty, np.nan, vmin),
+        "max": np.where(empty, np.nan, vmax),
+    }
+    if quantiles:
+        results.update(_zonal_quantiles(jobs, count, vmin, vmax, quantiles, bins, passes))
+    return {s: results[s] for s in stats}
+
+
+def _zonal_quantiles(jobs, count, vmin, vmax, quantiles, bins, passes):
+    """Per-zone quantiles by histograms refined over `passes` reads, with (band, zone) counters only."""
+    shape = count.shape
+    state, weights, has_data = _quantile_windows(quantiles, count.ravel(), vmin.ravel(), vmax.ravel())
+    for _ in range(passes):
+        for st in state.values():
+            st["width"] = (st["hi"] - st["lo"]) / bins
+            st["hist"] = np.zeros((bins,) + shape, dtype=np.int64)
+            st["below"] = np.zeros(shape, dtype=np.int64)
+        tasks = []
+        for band, block, block_transform, geoms, hits, layers in jobs:
+            windows = {key: (st["lo"].reshape(shape)[band][:, hits], st["width"].reshape(shape)[band][:, hits])
+                       for key, st in state.items()}
+            tasks.append(dask.delayed(_block_hist)(block, block_transform, geoms, hits, layers, windows, bins))
+        for (band, *_), parts in zip(jobs, dask.compute(*tasks)):
+            for ids, counts in parts:
+                for key, (below, hist) in counts.items():
+                    state[key]["below"][band, ids] += below
+                    state[key]["hist"][:, band, ids] += hist.transpose(2, 0, 1)
+        for st in state.values():
+            st["hist"] = st["hist"].reshape(bins, -1)
+            st["below"] = st["below"].ravel()
+            _narrow_window(st, bins)
+    return {stat: value.reshape(shape) for stat, value in _quantile_estimates(state, weights, has_data).items()}
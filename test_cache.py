@@ -0,0 +1,123 @@
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+from opengeo import cache as cache_module
+from opengeo.cache import SearchCache, configure_cache
+from opengeo.client import get_client
+from opengeo.image_collection import ImageCollection
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+from stac_standin import StacStandIn, make_scenes  # noqa: E402
+
+API = "https://stac.example.com/v1"
+
+
+def _cache(**kwargs):
+    return SearchCache(path=os.path.join(tempfile.mkdtemp(), "stac_cache.sqlite"), **kwargs)
+
+
+def _counting(value):
+    calls = []
+
+    def _query():
+        calls.append(1)
+        return value
+    return _query, calls
+
+
+def test_ttl_expiry():
+    cache = _cache(ttl=0.2)
+    query, calls = _counting({"features": [1]})
+    assert cache.fetch(API, "search", {"a": 1}, query) == {"features": [1]}
+    assert cache.fetch(API, "search", {"a": 1}, query) == {"features": [1]}
+    assert len(calls) == 1
+    time.sleep(0.3)
+    assert cache.get(cache.key(API, "search", {"a": 1})) is None
+    cache.fetch(API, "search", {"a": 1}, query)
+    assert len(calls) == 2
+    print("Cached responses expire after the TTL.")
+
+
+def test_lru_eviction_by_size():
+    payload = ["x" * 100]
+    cache = _cache(max_size=2.5 * len('["' + "x" * 100 + '"]'))
+    keys = {name: cache.key(API, "search", {"name": name}) for name in "abc"}
+    cache.set(keys["a"], payload)
+    time.sleep(0.01)
+    cache.set(keys["b"], payload)
+    time.sleep(0.01)
+    # Reading 'a' makes 'b' the least recently used entry
+    assert cache.get(keys["a"]) == payload
+    time.sleep(0.01)
+    cache.set(keys["c"], payload)
+    assert cache.get(keys["b"]) is None
+    assert cache.get(keys["a"]) == payload and cache.get(keys["c"]) == payload
+    print("The least recently used entries are evicted over the size limit.")
+
+
+def test_offline_mode():
+    path = os.path.join(tempfile.mkdtemp(), "stac_cache.sqlite")
+    SearchCache(path=path).set(SearchCache.key(API, "search", {"a": 1}), {"features": []})
+    # Stale entries are still served offline; misses raise instead of querying
+    offline = SearchCache(path=path, ttl=0, offline=True)
+    time.sleep(0.01)
+    query, calls = _counting({"features": [1]})
+    assert offline.fetch(API, "search", {"a": 1}, query) == {"features": []}
+    with pytest.raises(ConnectionError):
+        offline.fetch(API, "search", {"a": 2}, query)
+    assert not calls
+    print("Offline mode serves stale entries and never queries.")
+
+
+def test_null_is_a_miss():
+    cache = _cache()
+    query, calls = _counting(None)
+    assert cache.fetch(API, "matched", {"a": 1}, query) is None
+    # A stored null reads back as a miss, so the query runs again
+    assert cache.get(cache.key(API, "matched", {"a": 1})) is None
+    assert cache.fetch(API, "matched", {"a": 1}, query) is None
+    assert len(calls) == 2
+    print("Cached nulls are misses.")
+
+
+def test_collection_memoization_and_refresh():
+    root = tempfile.mkdtemp()
+    previous = cache_module._CACHE
+    configure_cache(path=os.path.join(root, "stac_cache.sqlite"))
+    try:
+        with StacStandIn(root, make_scenes(root, n_scenes=6, size=64)) as server:
+            get_client(server.url)
+            server.reset_counters()
+            col = ImageCollection("synthetic", api_url=server.url)
+            assert len(col._search()) == 6
+            searched = server.requests
+            assert searched > 0
+
+            # Memoized on the collection and its clones, then on disk for new ones
+            assert col._search() is col._search() and col.size() == 6
+            assert len(col.select(["red"])._search()) == 6
+            assert len(ImageCollection("synthetic", api_url=server.url)._search()) == 6
+            assert server.requests == searched
+
+            # A different search is a new query
+            assert len(col.filterDate("2023-01-01", "2023-01-03")._search()) == 3
+            assert server.requests > searched
+
+            # refresh() drops both the memoized and the cached result
+            server.reset_counters()
+            assert len(col.refresh()._search()) == 6
+            assert server.requests == searched
+    finally:
+        cache_module._CACHE = previous
+    print("Collections memoize searches until refreshed.")
+
+
+if __name__ == "__main__":
+    test_ttl_expiry()
+    test_lru_eviction_by_size()
+    test_offline_mode()
+    test_null_is_a_miss()
+    test_collection_memoization_and_refresh()
@@ -0,0 +1,86 @@
+import dask.array as dsa
+import numpy as np
+import rioxarray  # noqa: F401  (registers the .rio accessor)
+import xarray as xr
+from shapely.geometry import Polygon, box
+from opengeo.masking import _window, clip_to_geometry
+
+RES = 10.0
+LEFT, TOP = 500000.0, 4000400.0
+
+
+def _image(read=None):
+    # 2-band 40x40 image in 10x10 chunks; `read` collects the chunks loaded
+    values = np.random.default_rng(0).normal(100.0, 20.0, size=(2, 40, 40))
+
+    def _record(block, block_info=None):
+        read.append(tuple(block_info[None]["chunk-location"]))
+        return block
+
+    arr = dsa.from_array(values, chunks=(1, 10, 10))
+    if read is not None:
+        arr = arr.map_blocks(_record, dtype=arr.dtype)
+    da = xr.DataArray(arr, dims=("band", "y", "x"), coords={
+        "band": ["b1", "b2"],
+        "x": LEFT + RES * (np.arange(40) + 0.5), "y": TOP - RES * (np.arange(40) + 0.5)})
+    return da.rio.write_crs("EPSG:32633")
+
+
+def _point(row, col):
+    return LEFT + col * RES, TOP - row * RES
+
+
+def _masked_blocks(result):
+    return sum(name.startswith("_mask_block") for name in result.data.dask.layers)
+
+
+def _check_against_clip(geom):
+    read = []
+    result = clip_to_geometry(_image(read), geom)
+    expected = _image().compute().rio.clip([geom], all_touched=True, drop=True)
+    np.testing.assert_array_equal(result["x"].values, expected["x"].values)
+    np.testing.assert_array_equal(result["y"].values, expected["y"].values)
+    np.testing.assert_array_equal(result.values, expected.values)
+    return result, read
+
+
+def test_clip_rectangle():
+    # Edges halfway through pixels: the 2x2 chunks in the middle are inside,
+    # the ring of chunks around them crosses the boundary
+    (x0, y1), (x1, y0) = _point(5.5, 5.5), _point(34.5, 34.5)
+    result, read = _check_against_clip(box(x0, y0, x1, y1))
+    assert result.shape == (2, 30, 30)
+    assert _masked_blocks(result) == 2 * 12
+    print("Rectangle clip matches rio.clip.")
+
+
+def test_clip_rotated_polygon():
+    # Square rotated by 45 degrees, vertices off pixel edges: the corner
+    # chunks of its window lie entirely outside it and are filled without
+    # being read
+    geom = Polygon([_point(20, 1.3), _point(1.3, 20), _point(20, 38.7), _point(38.7, 20)])
+    result, read = _check_against_clip(geom)
+    assert result.shape == (2, 38, 38) and np.isnan(result.values).any()
+    corners = {(0, 0), (0, 3), (3, 0), (3, 3)}
+    assert read and not corners & {loc[1:] for loc in read}
+    assert 0 < _masked_blocks(result) < 2 * 16
+    print("Rotated polygon clip matches rio.clip.")
+
+
+def test_window_epsilon():
+    # Edges within float error of a pixel boundary don't pull in the next pixel
+    transform = _image().rio.transform()
+    (x0, y1), (x1, y0) = _point(2, 3), _point(12, 17)
+    assert _window(transform, (x0 + 1e-9, y0 - 1e-9, x1 - 1e-9, y1 + 1e-9), 40, 40) == (2, 12, 3, 17)
+    assert _window(transform, (x0 - 1e-9, y0 + 1e-9, x1 + 1e-9, y1 - 1e-9), 40, 40) == (2, 12, 3, 17)
+    # ... but edges clearly past it do
+    assert _window(transform, (x0 - 0.1, y0, x1, y1), 40, 40) == (2, 12, 2, 17)
+    # A degenerate geometry still gets its pixel
+    assert _window(transform, (x0 + 5, y1 - 5, x0 + 5, y1 - 5), 40, 40) == (2, 3, 3, 4)
+    print("Clip windows absorb float error on pixel edges.")
+
+
+if __name__ == "__main__":
+    test_clip_rectangle()
+    test_clip_rotated_polygon()
+    test_window_epsilon()
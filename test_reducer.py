@@ -0,0 +1,28 @@
+import numpy as np
+import xarray as xr
+import opengeo as og
+
+
+def _stack():
+    # Small in-memory (time, band, y, x) stack, chunked like a stackstac array
+    values = np.arange(5 * 2 * 4 * 4, dtype="float32").reshape(5, 2, 4, 4)
+    da = xr.DataArray(values, dims=("time", "band", "y", "x"), coords={"band": ["red", "nir"]})
+    return da.chunk({"time": 1, "band": 1, "y": 2, "x": 2}), values
+
+
+def test_temporal_percentile():
+    da, values = _stack()
+    col = og.ImageCollection("in-memory", api_url="http://localhost")
+    col._to_xarray = lambda **kwargs: da
+
+    image = col.reduce(og.Reducer.percentile([10, 90]))
+    result = image._da.compute()
+    expected = np.percentile(values, [10, 90], axis=0)
+    assert list(result["band"].values) == ["red_p10", "red_p90", "nir_p10", "nir_p90"]
+    np.testing.assert_allclose(result.sel(band=["red_p10", "nir_p10"]).values, expected[0], rtol=1e-6)
+    np.testing.assert_allclose(result.sel(band=["red_p90", "nir_p90"]).values, expected[1], rtol=1e-6)
+    print("Temporal percentiles match numpy.")
+
+
+if __name__ == "__main__":
+    test_temporal_percentile()
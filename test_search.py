@@ -0,0 +1,81 @@
+import os
+import sys
+import tempfile
+
+from pystac_client import Client
+from shapely.geometry import Polygon, shape
+from opengeo.search import iter_item_dicts, sort_item_dicts, split_params
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+from stac_standin import StacStandIn, make_scenes  # noqa: E402
+
+# 12 scenes one day apart from 2023-01-01, cycling over a 2x2 tile grid
+SCENES = make_scenes(tempfile.mkdtemp(), n_scenes=12, size=64)
+EXTENT = [min(s["bbox"][0] for s in SCENES), min(s["bbox"][1] for s in SCENES),
+          max(s["bbox"][2] for s in SCENES), max(s["bbox"][3] for s in SCENES)]
+
+
+def _ids(items):
+    return [item["id"] for item in items]
+
+
+def test_split_params():
+    params = {"collections": ["synthetic"], "datetime": "2023-01-01T00:00:00Z/2023-01-09T00:00:00Z",
+              "bbox": EXTENT}
+    parts = split_params(params, 4)
+    assert [p["datetime"] for p in parts] == [
+        "2023-01-01T00:00:00Z/2023-01-03T00:00:00Z", "2023-01-03T00:00:00Z/2023-01-05T00:00:00Z",
+        "2023-01-05T00:00:00Z/2023-01-07T00:00:00Z", "2023-01-07T00:00:00Z/2023-01-09T00:00:00Z"]
+
+    # Open-ended ranges are split by area: strips covering the bbox or geometry
+    params = dict(params, datetime="2023-01-01T00:00:00Z/..")
+    strips = [p["bbox"] for p in split_params(params, 3)]
+    assert len(strips) == 3 and strips[0][0] == EXTENT[0] and strips[-1][2] == EXTENT[2]
+    assert all(a[2] == b[0] for a, b in zip(strips, strips[1:]))
+    minx, miny, maxx, maxy = EXTENT
+    geom = Polygon([(minx, miny), (maxx, miny), ((minx + maxx) / 2, maxy)])
+    pieces = split_params(dict(params, bbox=None, intersects=geom.__geo_interface__), 3)
+    assert abs(sum(shape(p["intersects"]).area for p in pieces) - geom.area) < 1e-12
+
+    # Global order or a result cap can't be split; nothing to split on either
+    assert split_params(dict(params, sortby=[{"field": "datetime", "direction": "asc"}]), 4) == [
+        dict(params, sortby=[{"field": "datetime", "direction": "asc"}])]
+    assert len(split_params(dict(params, max_items=5), 4)) == 1
+    assert split_params({"collections": ["synthetic"]}, 4) == [{"collections": ["synthetic"]}]
+    print("Searches are split by date, then by area.")
+
+
+def test_split_search_dedupes():
+    with StacStandIn(tempfile.mkdtemp(), SCENES) as server:
+        client = Client.open(server.url)
+        # Date splits meet on scene timestamps, area strips cut through tiles:
+        # boundary scenes are returned by two sub-queries
+        for params in ({"collections": ["synthetic"], "datetime": "2023-01-01T00:00:00Z/2023-01-09T00:00:00Z"},
+                       {"collections": ["synthetic"], "bbox": EXTENT}):
+            expected = _ids(iter_item_dicts(client, params))
+            for workers in (2, 4):
+                ids = _ids(iter_item_dicts(client, params, workers=workers))
+                assert len(ids) == len(set(ids)), (params, workers)
+                assert sorted(ids) == sorted(expected), (params, workers)
+        assert len(expected) == len(SCENES)
+    print("Split searches return every item once.")
+
+
+def test_sort_fallback():
+    with StacStandIn(tempfile.mkdtemp(), SCENES) as server:
+        client = Client.open(server.url)
+        client.remove_conforms_to("SORT")
+        sortby = [{"field": "properties.eo:cloud_cover", "direction": "desc"}]
+        params = {"collections": ["synthetic"], "bbox": EXTENT, "sortby": sortby, "max_items": 5}
+        items = list(iter_item_dicts(client, params, workers=3))
+
+    expected = sorted(SCENES, key=lambda s: s["cloud"], reverse=True)[:5]
+    assert _ids(items) == [s["id"] for s in expected]
+    assert _ids(sort_item_dicts(items[::-1], sortby)) == _ids(items)
+    print("Sorting falls back to the client when the API can't sort.")
+
+
+if __name__ == "__main__":
+    test_split_params()
+    test_split_search_dedupes()
+    test_sort_fallback()
@@ -0,0 +1,92 @@
+import warnings
+
+import dask
+import numpy as np
+import xarray as xr
+from opengeo.streaming import ordered_mosaic, stream_reduce
+
+
+def _stack(seed=0, shape=(7, 2, 12, 12)):
+    # Small in-memory (time, band, y, x) stack with gaps and one empty pixel
+    rng = np.random.default_rng(seed)
+    values = rng.gamma(2.0, 3.0, size=shape)
+    values[rng.random(shape) < 0.3] = np.nan
+    values[:, :, 0, 0] = np.nan
+    da = xr.DataArray(values, dims=("time", "band", "y", "x"))
+    return da.chunk({"time": 1, "band": 1, "y": 5, "x": 5}), values
+
+
+def test_streaming_moments():
+    da, values = _stack()
+    stats = ["count", "sum", "mean", "variance", "stdDev", "min", "max"]
+    # A batch size that does not divide the time axis exercises the Chan merge of uneven batches
+    result = stream_reduce(da, stats, batch_size=3, dtype="float64").compute()
+
+    with warnings.catch_warnings():
+        # All-NaN pixels
+        warnings.simplefilter("ignore", RuntimeWarning)
+        expected = {
+            "count": np.sum(~np.isnan(values), axis=0).astype(float),
+            "sum": np.where(np.isnan(values).all(axis=0), np.nan, np.nansum(values, axis=0)),
+            "mean": np.nanmean(values, axis=0),
+            "variance": np.nanvar(values, axis=0),
+            "stdDev": np.nanstd(values, axis=0),
+            "min": np.nanmin(values, axis=0),
+            "max": np.nanmax(values, axis=0),
+        }
+    for stat in stats:
+        np.testing.assert_allclose(result.sel(stat=stat).values, expected[stat], rtol=1e-10, err_msg=stat)
+    print("Streaming moments match numpy.")
+
+
+def test_streaming_quantiles():
+    da, values = _stack(seed=1)
+    bins, passes = 16, 3
+    result = stream_reduce(da, ["median", "p10", "p90"], batch_size=2, bins=bins, passes=passes,
+                           dtype="float64").compute()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        expected = np.nanpercentile(values, [50, 10, 90], axis=0)
+        bound = (np.nanmax(values, axis=0) - np.nanmin(values, axis=0)) / bins ** passes
+    for stat, exp in zip(["median", "p10", "p90"], expected):
+        got = result.sel(stat=stat).values
+        assert np.array_equal(np.isnan(got), np.isnan(exp)), stat
+        ok = ~np.isnan(exp)
+        # Documented error: at most (max - min) / bins ** passes per pixel
+        assert np.all(np.abs(got[ok] - exp[ok]) <= bound[ok] * (1 + 1e-6) + 1e-12), stat
+    print("Streaming quantiles are within the refinement bound of numpy.")
+
+
+def test_streaming_reads_are_graph_inputs():
+    da, _ = _stack()
+    result = stream_reduce(da, ["median"], batch_size=1)
+    # The input chunks are dependencies of the output, not computed inside its tasks
+    assert da.data.name in result.data.dask.layers
+    with dask.config.set(scheduler="processes"):
+        mosaic = ordered_mosaic(da)
+    assert da.data.name in mosaic.data.dask.layers
+    print("Streaming reads are graph inputs.")
+
+
+def test_mosaic_fallback_matches():
+    da, values = _stack(seed=2)
+    expected = np.full(values.shape[1:], np.nan)
+    for t in range(values.shape[0]):
+        expected = np.where(np.isnan(expected), values[t], expected)
+
+    local = ordered_mosaic(da).compute(scheduler="threads").values
+    with dask.config.set(scheduler="processes"):
+        # Built for a scheduler that pickles tasks; computed locally here
+        folded = ordered_mosaic(da)
+    folded = folded.compute(scheduler="sync").values
+    np.testing.assert_array_equal(local, expected)
+    np.testing.assert_array_equal(folded, expected)
+    print("Early-stop and graph-input mosaics match.")
+
+
+if __name__ == "__main__":
+    test_streaming_moments()
+    test_streaming_quantiles()
+    test_streaming_reads_are_graph_inputs()
+    test_mosaic_fallback_matches()
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+import rioxarray  # noqa: F401  (registers the .rio accessor)
+import xarray as xr
+from opengeo.export import write_zarr
+
+
+def _scenes(ids, dates, seed=0):
+    # Small (time, band, y, x) stack labelled like a stackstac array
+    values = np.random.default_rng(seed).random((len(ids), 1, 4, 4)).astype("float32")
+    da = xr.DataArray(
+        values, dims=("time", "band", "y", "x"),
+        coords={"time": pd.to_datetime(dates).values, "id": ("time", ids), "band": ["red"],
+                "x": 500000.0 + 10 * np.arange(4) + 5, "y": 4000000.0 - 10 * np.arange(4) - 5},
+    )
+    return da.rio.write_crs("EPSG:32633").chunk({"time": 1})
+
+
+def test_append_by_item_id(tmp_path):
+    store = str(tmp_path / "stack.zarr")
+    assert write_zarr(_scenes(["a", "b"], ["2024-01-01", "2024-01-06"]), store, mode="a") == 2
+
+    # 'c' shares b's timestamp (adjacent tile of the same datatake), 'b' is already stored
+    batch = _scenes(["b", "c", "d"], ["2024-01-06", "2024-01-06", "2024-01-11"], seed=1)
+    assert write_zarr(batch, store, mode="a") == 2
+    stored = xr.open_zarr(store)
+    assert stored["id"].values.tolist() == ["a", "b", "c", "d"]
+    np.testing.assert_array_equal(stored["data"].sel(time="2024-01-06").isel(time=1).values,
+                                  batch.isel(time=1).values)
+    assert stored["time"].to_index().is_monotonic_increasing
+    assert stored.sel(time=slice("2024-01-05", "2024-01-12")).sizes["time"] == 3
+
+    # A late-ingested scene older than the store's last step is rejected, not appended out of order
+    with pytest.raises(ValueError, match="older than the store's last time step"):
+        write_zarr(_scenes(["e", "f"], ["2024-01-03", "2024-01-16"]), store, mode="a")
+    assert xr.open_zarr(store)["id"].values.tolist() == ["a", "b", "c", "d"]
+    print("Zarr appends match scenes by item id and keep time sorted.")
+
+
+def test_append_by_time_without_ids(tmp_path):
+    store = str(tmp_path / "stack.zarr")
+    first = _scenes(["a", "b"], ["2024-01-01", "2024-01-06"]).drop_vars("id")
+    write_zarr(first, store, mode="a")
+    batch = _scenes(["x", "y"], ["2024-01-06", "2024-01-11"]).drop_vars("id")
+    assert write_zarr(batch, store, mode="a") == 1
+    assert xr.open_zarr(store).sizes["time"] == 3
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+
+    test_append_by_item_id(Path(tempfile.mkdtemp()))
+    test_append_by_time_without_ids(Path(tempfile.mkdtemp()))
@@ -0,0 +1,87 @@
+import warnings
+
+import dask.array as dsa
+import geopandas as gpd
+import numpy as np
+import rioxarray  # noqa: F401  (registers the .rio accessor)
+import xarray as xr
+from shapely.geometry import Polygon, box
+from opengeo.zonal import overlap_layers, zonal_stats
+
+RES = 10.0
+LEFT, TOP = 500000.0, 4000240.0
+
+
+def _image(read=None):
+    # 2-band 24x24 image in 8x8 chunks, with gaps; `read` collects the chunks loaded
+    rng = np.random.default_rng(0)
+    values = rng.normal(100.0, 20.0, size=(2, 24, 24))
+    values[rng.random(values.shape) < 0.1] = np.nan
+
+    def _record(block, block_info=None):
+        read.append(tuple(block_info[None]["chunk-location"]))
+        return block
+
+    arr = dsa.from_array(values, chunks=(1, 8, 8))
+    if read is not None:
+        arr = arr.map_blocks(_record, dtype=arr.dtype)
+    da = xr.DataArray(arr, dims=("band", "y", "x"), coords={
+        "band": ["b1", "b2"],
+        "x": LEFT + RES * (np.arange(24) + 0.5), "y": TOP - RES * (np.arange(24) + 0.5)})
+    return da.rio.write_crs("EPSG:32633")
+
+
+def _cells(row0, col0, row1, col1):
+    # Box whose edges run along pixel edges, so no pixel center is ambiguous
+    return box(LEFT + col0 * RES, TOP - row1 * RES, LEFT + col1 * RES, TOP - row0 * RES)
+
+
+def _zones():
+    cx, cy, r = LEFT + 60, TOP - 180, 35
+    return gpd.GeoSeries([
+        _cells(2, 2, 10, 10),
+        _cells(6, 6, 14, 14),   # overlaps the first zone
+        _cells(6, 14, 14, 20),  # shares an edge with the second
+        Polygon([(cx - r, cy), (cx, cy + r), (cx + r, cy), (cx, cy - r)]),  # rotated square
+        box(LEFT - 1000, TOP - 1000, LEFT - 500, TOP - 500),  # off the image
+    ], crs="EPSG:32633")
+
+
+def test_overlap_layers():
+    layers = overlap_layers(_zones())
+    assert layers[0] != layers[1]
+    # Sharing an edge with the second zone is no overlap: the third needs no layer of its own
+    assert layers[2] == 0 and (layers[3:] == 0).all()
+    print("Overlapping zones are split into layers.")
+
+
+def test_zonal_stats_match_clip():
+    read = []
+    da, zones = _image(read), _zones()
+    bins, passes = 16, 2
+    stats = zonal_stats(da, zones, ["count", "mean", "stdDev", "median"], bins=bins, passes=passes)
+
+    reference = _image().compute()
+    for z, geom in enumerate(zones.iloc[:4]):
+        clipped = reference.rio.clip([geom], drop=True, all_touched=False).values
+        for b in range(2):
+            v = clipped[b][~np.isnan(clipped[b])]
+            assert stats["count"][b, z] == v.size, (b, z)
+            np.testing.assert_allclose(stats["mean"][b, z], v.mean(), rtol=1e-10)
+            np.testing.assert_allclose(stats["stdDev"][b, z], v.std(), rtol=1e-10)
+            bound = (v.max() - v.min()) / bins ** passes
+            assert abs(stats["median"][b, z] - np.percentile(v, 50)) <= bound * (1 + 1e-6), (b, z)
+
+    # The zone off the image has no pixels
+    assert (stats["count"][:, 4] == 0).all()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        assert np.isnan(stats["mean"][:, 4]).all() and np.isnan(stats["median"][:, 4]).all()
+    # The bottom-right chunk touches no zone and is never read
+    assert read and not any(loc[1:] == (2, 2) for loc in read)
+    print("Zonal statistics match per-zone clips.")
+
+
+if __name__ == "__main__":
+    test_overlap_layers()
+    test_zonal_stats_match_clip()